@@ -7,57 +7,78 @@ Usage examples inside container:
   # Ingest dataset
   docker run image ingest prices_pvpc --backfill-day 2025-09-10
 
+  # Ingest every dataset of a schedule in one process
+  docker run image ingest --schedule minute_complete_20
+
   # Compaction
   docker run image compact --dataset prices_pvpc --month 2025-09 --dry-run
 
+  # Replay curated from RAW (no ESIOS calls)
+  docker run image replay gen_mix --range 2025-09-01:2025-09-30
+
   # QC month
   docker run image qc --dataset prices_pvpc --month 2025-09
 
-Any other first token will be treated as a python module/script path.
+Any other first token will be treated as a python script path.
+
+The target script runs in this same interpreter (runpy, as ``__main__``)
+instead of a child ``python`` process: one interpreter start per job. This
+module only imports the standard library so the dispatch itself is cheap;
+pandas/pyarrow/requests are loaded by the target script when it needs them.
 """
 from __future__ import annotations
 import os
+import runpy
 import sys
-import subprocess
-
-BASE_CMD = [sys.executable]
 
 SCRIPTS = {
     "ingest": "pipelines/ingest/main.py",
     "compact": "pipelines/ingest/compact.py",
+    "replay": "pipelines/ingest/replay.py",
     "qc": "scripts/qc_month.py",
 }
 
+
+def run_script(script: str, argv: list[str]) -> int:
+    """Ejecuta ``script`` como ``python script argv...`` dentro del proceso actual."""
+    if not os.path.isfile(script):
+        print(f"[entrypoint] Script not found: {script}", file=sys.stderr)
+        return 127
+    # Igual que el intérprete: argv[0] = script y su carpeta primero en sys.path
+    sys.argv = [script] + argv
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    return 0
+
+
 def main():
     args = sys.argv[1:]
     if not args:
         # Show simple help
-        print("Usage: ingest|compact|qc [args...]  OR provide a python script path")
+        print("Usage: ingest|compact|replay|qc [args...]  OR provide a python script path")
         print("Examples:")
         print("  ingest interconn --backfill-day 2025-09-09")
+        print("  ingest --schedule minute_complete_20")
         print("  compact --dataset interconn --month 2025-09 --dry-run")
+        print("  replay gen_mix --range 2025-09-01:2025-09-30")
         sys.exit(0)
 
     first = args[0]
-    if first in SCRIPTS:
-        script = SCRIPTS[first]
-        cmd = BASE_CMD + [script] + args[1:]
-    else:
-        # treat as direct script or module path
-        script = first
-        cmd = BASE_CMD + [script] + args[1:]
+    # Modo conocido o ruta directa a un script
+    script = SCRIPTS.get(first, first)
 
     # Propagate ESIOS_TOKEN presence info
     if "ESIOS_TOKEN" not in os.environ:
         print("[entrypoint] WARNING: ESIOS_TOKEN not set in environment.", file=sys.stderr)
 
-    # Execute
-    try:
-        completed = subprocess.run(cmd, check=False)
-        sys.exit(completed.returncode)
-    except FileNotFoundError:
-        print(f"[entrypoint] Script not found: {script}", file=sys.stderr)
-        sys.exit(127)
+    sys.exit(run_script(script, args[1:]))
+
 
 if __name__ == "__main__":
     main()
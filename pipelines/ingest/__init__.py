@@ -2,21 +2,51 @@
 
 Typical usage:
     from pipelines.ingest import run_ingest
+    run_ingest("prices_spot", io_mode="local")
+
+    # Several datasets in one process (shared config / HTTP client / fsspec)
+    from pipelines.ingest import load_cfg, run_datasets, schedule_datasets
+    cfg = load_cfg()
+    run_datasets(schedule_datasets(cfg, "minute_complete_20"), cfg=cfg)
 
 But normally you call CLI:
     python pipelines/ingest/main.py <dataset>
+    python pipelines/ingest/main.py --schedule minute_complete_20   # o --all
 
 Exports:
-    load_cfg, resolve_window, EsiosClient, normalize helpers (limited)
+    run_ingest, run_datasets, schedule_datasets, load_cfg, resolve_window,
+    EsiosClient, AsyncEsiosClient, normalize helpers (limited)
 """
 
-from .esios_client import EsiosClient
-from .main import load_cfg  # re-export
-from .utils import now_utc, resolve_window
+from __future__ import annotations
+
+import importlib
+
+# Exportaciones perezosas (PEP 562): importar cualquier submódulo
+# (p.ej. pipelines.ingest.utils desde compact.py) no arrastra main,
+# requests ni aiohttp. Se resuelven en el primer acceso al atributo.
+_EXPORTS = {
+    "run_ingest": "main",
+    "run_datasets": "main",
+    "schedule_datasets": "main",
+    "load_cfg": "main",
+    "resolve_window": "utils",
+    "now_utc": "utils",
+    "EsiosClient": "esios_client",
+    "AsyncEsiosClient": "esios_async",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # siguientes accesos sin pasar por __getattr__
+    return value
+
 
-__all__ = [
-    "load_cfg",
-    "resolve_window",
-    "now_utc",
-    "EsiosClient",
-]
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
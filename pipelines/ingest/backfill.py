@@ -0,0 +1,182 @@
+"""Backfill paralelo y reanudable.
+
+El rango se divide en shards (las ventanas del planner) que se reparten en un
+pool de procesos. Cada shard terminado se anota en un manifest de checkpoint
+junto al curated (``curated/<table>/_checkpoints/backfill_<dataset>.json``);
+al relanzar, los días ya completados se saltan.
+
+El manifest solo lo escribe el proceso coordinador, así que no hay carreras
+entre workers. Lo mismo con el catálogo de la tabla (``catalog``): cada shard
+devuelve sus entradas y las aplica el coordinador.
+"""
+
+from __future__ import annotations
+
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+from .catalog import apply_writes, collect_writes
+from .main import _log, build_client, run_backfill_range
+from .planner import plan_backfill
+from .utils import curated_table_root, read_json, write_json_atomic
+
+
+def checkpoint_path(cfg, dataset: str, local: bool = False) -> str:
+    table = cfg["datasets"][dataset]["curated_table"]
+    root = curated_table_root(cfg, table, local)
+    return f"{root}/_checkpoints/backfill_{dataset}.json"
+
+
+class BackfillCheckpoint:
+    def __init__(self, path: str, dataset: str):
+        self.path = path
+        self.dataset = dataset
+        self.completed: set[str] = set()
+
+    def load(self) -> set[str]:
+        data = read_json(self.path, default={})
+        self.completed = set(data.get("completed", []))
+        return self.completed
+
+    def mark(self, days):
+        self.completed.update(str(d) for d in days)
+        write_json_atomic(
+            self.path,
+            {
+                "dataset": self.dataset,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+                "completed": sorted(self.completed),
+            },
+        )
+
+    def reset(self):
+        self.completed = set()
+        write_json_atomic(self.path, {"dataset": self.dataset, "completed": []})
+
+
+def _days(first: date, last: date):
+    d = first
+    while d <= last:
+        yield d
+        d += timedelta(days=1)
+
+
+def _contiguous_runs(days) -> list[tuple[date, date]]:
+    """``(primero, último)`` de cada tramo de días consecutivos (los huecos ya están hechos)."""
+    runs: list[tuple[date, date]] = []
+    for d in days:
+        if runs and d == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], d)
+        else:
+            runs.append((d, d))
+    return runs
+
+
+def _run_shard(cfg, dataset, first_day, last_day, local, run_id, workers):
+    # Con limitador en memoria cada proceso tiene su propio bucket: repartimos el
+    # presupuesto entre workers para mantener el rate global.
+    defaults = dict(cfg.get("defaults", {}))
+    backend = (defaults.get("rate_limiter") or {}).get("backend", "local")
+    if workers > 1 and backend == "local":
+        defaults["rate_limit_per_sec"] = float(defaults.get("rate_limit_per_sec", 1)) / workers
+    cfg = {**cfg, "defaults": defaults}
+    client = build_client(cfg)
+    try:
+        with collect_writes() as catalog_writes:
+            stats = run_backfill_range(
+                client, cfg, dataset, first_day, last_day, local=local, run_id=run_id
+            )
+        return {**stats, "catalog": catalog_writes}
+    finally:
+        client.close()
+
+
+def run_backfill_parallel(
+    cfg,
+    dataset: str,
+    start_d: date,
+    end_d: date,
+    local: bool = False,
+    workers: int = 1,
+    resume: bool = True,
+    run_id: str | None = None,
+):
+    """Ejecuta el backfill repartiendo shards en ``workers`` procesos.
+
+    Devuelve stats agregadas (mismas claves que ``run_backfill_range`` más
+    ``skipped_days`` y ``failed_shards``).
+    """
+    run_id = run_id or str(uuid.uuid4())
+    ds = cfg["datasets"][dataset]
+    ckpt = BackfillCheckpoint(checkpoint_path(cfg, dataset, local), dataset)
+    if resume:
+        ckpt.load()
+    else:
+        ckpt.reset()
+
+    stats = {
+        "days": 0,
+        "chunks": 0,
+        "api_calls": 0,
+        "raw_rows": 0,
+        "curated_rows": 0,
+        "skipped_days": 0,
+        "failed_shards": 0,
+    }
+    shards = []
+    for chunk in plan_backfill(
+        start_d, end_d, ds.get("granularity", "hour"), cfg.get("defaults", {}).get("backfill_planner")
+    ):
+        pending = [d for d in _days(chunk.first_day, chunk.last_day) if str(d) not in ckpt.completed]
+        stats["skipped_days"] += chunk.days - len(pending)
+        shards.extend(_contiguous_runs(pending))
+    _log(
+        "info",
+        run_id,
+        action="backfill_plan",
+        dataset=dataset,
+        shards=len(shards),
+        workers=workers,
+        skipped_days=stats["skipped_days"],
+        checkpoint=ckpt.path,
+    )
+
+    def _done(shard, shard_stats):
+        apply_writes(shard_stats.get("catalog"))
+        ckpt.mark(_days(*shard))
+        for k in ("days", "chunks", "api_calls", "raw_rows", "curated_rows"):
+            stats[k] += shard_stats.get(k, 0)
+
+    def _failed(shard, err):
+        stats["failed_shards"] += 1
+        _log(
+            "error",
+            run_id,
+            action="shard_failed",
+            dataset=dataset,
+            date_from=str(shard[0]),
+            date_to=str(shard[1]),
+            error=str(err),
+        )
+
+    if workers <= 1:
+        for shard in shards:
+            try:
+                _done(shard, _run_shard(cfg, dataset, *shard, local, run_id, 1))
+            except Exception as e:
+                _failed(shard, e)
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_run_shard, cfg, dataset, *shard, local, run_id, workers): shard
+            for shard in shards
+        }
+        for fut in as_completed(futures):
+            shard = futures[fut]
+            try:
+                _done(shard, fut.result())
+            except Exception as e:
+                _failed(shard, e)
+    return stats
@@ -0,0 +1,150 @@
+"""Caché en disco de respuestas ESIOS para periodos cerrados.
+
+Clave: (indicator_id, start, end, time_trunc, locale). Solo se cachean ventanas
+cuyo fin es anterior al inicio del día local actual (Europe/Madrid): un día aún
+abierto puede recibir datos nuevos. Las ventanas cerradas recientemente caducan
+tras ``recent_ttl_hours`` (ESIOS consolida valores unos días después); las
+antiguas no caducan. El tamaño total se acota con expulsión LRU (mtime).
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from .utils import TZ_MADRID, now_utc
+
+
+def _parse_iso(s: str) -> datetime:
+    dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def local_day_start_utc(now: datetime | None = None) -> datetime:
+    now_local = (now or now_utc()).astimezone(TZ_MADRID)
+    start_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start_local.astimezone(timezone.utc)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 2 * 1024**3,
+        recent_days: int = 3,
+        recent_ttl_hours: float = 24,
+    ):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.recent_days = recent_days
+        self.recent_ttl_seconds = recent_ttl_hours * 3600
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(indicator_id, start_iso, end_iso, time_trunc, locale) -> str:
+        raw = json.dumps([str(indicator_id), start_iso, end_iso, time_trunc, locale])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def is_open(self, end_iso: str, now: datetime | None = None) -> bool:
+        return _parse_iso(end_iso) > local_day_start_utc(now)
+
+    def expires_at(self, end_iso: str, now: datetime | None = None) -> float | None:
+        """Epoch de caducidad de una ventana cerrada (None = no caduca)."""
+        now = now or now_utc()
+        recent_limit = local_day_start_utc(now) - timedelta(days=self.recent_days)
+        if _parse_iso(end_iso) > recent_limit:
+            return now.timestamp() + self.recent_ttl_seconds
+        return None
+
+    def get(self, indicator_id, start_iso, end_iso, time_trunc, locale) -> Dict[str, Any] | None:
+        path = self._path(self.key(indicator_id, start_iso, end_iso, time_trunc, locale))
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        expires = entry.get("expires")
+        if expires is not None and expires < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)  # LRU: marca de último uso
+        except OSError:
+            pass
+        return entry.get("payload")
+
+    def put(self, indicator_id, start_iso, end_iso, time_trunc, locale, payload) -> bool:
+        if self.is_open(end_iso):
+            return False
+        expires = self.expires_at(end_iso)
+        path = self._path(self.key(indicator_id, start_iso, end_iso, time_trunc, locale))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"expires": expires, "payload": payload}, f)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan()[1]
+            else:
+                self._total_bytes += os.path.getsize(path)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return True
+
+    def _scan(self):
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json.gz"):
+                    continue
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        return entries, total
+
+    def _evict(self):
+        # Expulsa las entradas menos usadas hasta volver a ~90% del límite
+        entries, total = self._scan()
+        target = self.max_bytes * 0.9
+        for _mtime, size, p in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+
+def build_cache(cfg_defaults: dict) -> ResponseCache | None:
+    ccfg = cfg_defaults.get("response_cache") or {}
+    if not ccfg.get("enabled", False):
+        return None
+    return ResponseCache(
+        ccfg.get("dir", "./data/cache/esios"),
+        max_bytes=int(float(ccfg.get("max_mb", 2048)) * 1024**2),
+        recent_days=int(ccfg.get("recent_days", 3)),
+        recent_ttl_hours=float(ccfg.get("recent_ttl_hours", 24)),
+    )
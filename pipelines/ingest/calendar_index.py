@@ -0,0 +1,130 @@
+"""Índice de calendario Europe/Madrid precalculado por año.
+
+Para cada día local guarda su inicio en UTC (epoch ns) y su duración real
+(23/24/25 h en los cambios de hora). Con esa tabla, filtrar o partir frames por
+día local son comparaciones de rangos int64 (``searchsorted``) en lugar de
+convertir cada fila a ``date``. Los años se calculan una vez y se cachean.
+
+No se llama ``calendar.py`` para no ocultar el módulo estándar al ejecutar
+``main.py`` como script.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+TZ_MADRID = ZoneInfo("Europe/Madrid")
+
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+
+class YearCalendar(NamedTuple):
+    year: int
+    first_ordinal: int  # date.toordinal() del 1 de enero
+    bounds_ns: np.ndarray  # inicio UTC de cada día local + inicio del año siguiente
+    hours: np.ndarray  # horas de cada día local (23/24/25)
+
+
+def _local_midnight_ns(d: date) -> int:
+    start = datetime.combine(d, time(0, 0), tzinfo=TZ_MADRID).astimezone(timezone.utc)
+    return int(start.timestamp()) * 1_000_000_000
+
+
+@lru_cache(maxsize=64)
+def year_calendar(year: int) -> YearCalendar:
+    first = date(year, 1, 1)
+    n = (date(year + 1, 1, 1) - first).days
+    bounds = np.fromiter(
+        (_local_midnight_ns(first + timedelta(days=i)) for i in range(n + 1)),
+        dtype=np.int64,
+        count=n + 1,
+    )
+    hours = np.diff(bounds) // NS_PER_HOUR
+    return YearCalendar(year, first.toordinal(), bounds, hours)
+
+
+@lru_cache(maxsize=64)
+def _span(first_year: int, last_year: int):
+    """Límites concatenados de varios años: (ordinal del primer día, bounds_ns)."""
+    years = [year_calendar(y) for y in range(first_year, last_year + 1)]
+    bounds = np.concatenate([y.bounds_ns[:-1] for y in years] + [years[-1].bounds_ns[-1:]])
+    return years[0].first_ordinal, bounds
+
+
+def _pos(d: date) -> tuple[YearCalendar, int]:
+    cal = year_calendar(d.year)
+    return cal, d.toordinal() - cal.first_ordinal
+
+
+def day_bounds_ns(d: date) -> tuple[int, int]:
+    cal, i = _pos(d)
+    return int(cal.bounds_ns[i]), int(cal.bounds_ns[i + 1])
+
+
+def day_bounds_utc(d: date) -> tuple[datetime, datetime]:
+    """[inicio, fin) en UTC del día local ``d``."""
+    start, end = day_bounds_ns(d)
+    return (
+        datetime.fromtimestamp(start / 1e9, tz=timezone.utc),
+        datetime.fromtimestamp(end / 1e9, tz=timezone.utc),
+    )
+
+
+def expected_hours(d: date) -> int:
+    cal, i = _pos(d)
+    return int(cal.hours[i])
+
+
+def expected_minutes(d: date) -> int:
+    return expected_hours(d) * 60
+
+
+def dst_days(year: int) -> list[date]:
+    """Días de cambio de hora (23 o 25 horas) del año."""
+    cal = year_calendar(year)
+    return [date.fromordinal(cal.first_ordinal + int(i)) for i in np.flatnonzero(cal.hours != 24)]
+
+
+def _utc_ns(ts: pd.Series) -> tuple[np.ndarray, bool]:
+    """Epoch ns de una serie datetime; el flag indica si era naive (hora local de pared)."""
+    ts = pd.to_datetime(ts)
+    naive = ts.dt.tz is None
+    values = ts.dt.as_unit("ns").array.asi8
+    return values, naive
+
+
+def local_day_ordinals(ts: pd.Series) -> np.ndarray:
+    """Ordinal (``date.toordinal``) del día local de cada fila; -1 para nulos."""
+    values, naive = _utc_ns(ts)
+    valid = values != np.iinfo(np.int64).min
+    out = np.full(len(values), -1, dtype=np.int64)
+    if not valid.any():
+        return out
+    if naive:
+        # Hora de pared local: el día es la división entera por 24h
+        out[valid] = values[valid] // NS_PER_DAY + date(1970, 1, 1).toordinal()
+        return out
+    lo, hi = values[valid].min(), values[valid].max()
+    first_year = datetime.fromtimestamp(lo / 1e9, tz=timezone.utc).year - 1
+    last_year = datetime.fromtimestamp(hi / 1e9, tz=timezone.utc).year + 1
+    first_ordinal, bounds = _span(first_year, last_year)
+    out[valid] = np.searchsorted(bounds, values[valid], side="right") - 1 + first_ordinal
+    return out
+
+
+def local_day_mask(ts: pd.Series, d: date) -> np.ndarray:
+    """Máscara booleana de las filas cuyo instante cae en el día local ``d``."""
+    values, naive = _utc_ns(ts)
+    if naive:
+        start = (d.toordinal() - date(1970, 1, 1).toordinal()) * NS_PER_DAY
+        end = start + NS_PER_DAY
+    else:
+        start, end = day_bounds_ns(d)
+    return (values >= start) & (values < end)
@@ -0,0 +1,533 @@
+"""Catálogo por tabla curated, en shards por mes.
+
+Cada mes tiene su ``_catalog.json`` junto al ``_manifest.json`` con una
+entrada por fichero Parquet vivo (clave: ruta relativa al mes)::
+
+    {"version": 2, "updated_at": "...Z",
+     "files": {"day=01/part-merged-gen_mix.parquet":
+               {"rows": 28800, "bytes": 412345, "mtime": 1759990000.0,
+                "min_ts": "2025-08-31T22:00:00Z", "max_ts": "2025-09-01T21:59:00Z",
+                "dims": {"tech": ["eolica", "solar"], "zone": ["ES"]}}},
+     "folded": {"day=02/part-merged-gen_mix.parquet": 1759990100.0}}
+
+Una vez plegado en el compact, un micro-file pierde sus estadísticas (las
+tiene el compact) y se queda solo con su mtime en ``folded``: la compactación
+sigue sabiendo que existe y cuándo se reescribe. Al borrar los originales sale
+también de ahí. El shard crece con el mes, no con la historia de la tabla.
+
+La raíz de la tabla guarda solo el índice de meses (``_catalog.json``)::
+
+    {"version": 2, "complete": true, "updated_at": "...Z", "months": ["2025-08", "2025-09"]}
+
+Lo actualizan todos los writers: ``write_parquet_partitioned`` con las
+estadísticas de la tabla que acaba de escribir (sin releerla) y la
+compactación tras publicar el mes (compact nuevos, ``folded`` del manifest).
+Con él se planifican meses y micro-files y se podan ficheros por rango
+temporal o dimensión sin listar el bucket. Qué ficheros están vivos lo sigue
+diciendo el ``_manifest.json`` de cada mes (``month_live_files``).
+
+Cada shard (y el índice) se actualiza leyendo + modificando + reemplazando
+bajo un lock entre procesos: un ``.lock`` creado con escritura condicional
+(solo si no existe; en GCS ``ifGenerationMatch=0``). Dos jobs que escriben el
+mismo mes se esperan en vez de pisarse. Los workers en otros procesos
+(backfill, compactación con ``process``) acumulan con ``collect_writes`` y
+escribe el coordinador, una vez por mes.
+
+``complete`` solo lo pone ``rebuild_catalog`` (un listado completo, el paso de
+reconciliación explícito): un catálogo creado por el primer writer no conoce
+los ficheros anteriores y no se usa para planificar. Un fallo al apuntar un
+fichero quita ``complete`` y el siguiente run vuelve a reconciliar.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from .manifest import _fs, _mtime, is_compact_file, live_files, month_relpath, read_manifest
+from .utils import EPOCH_UNIT, read_json, write_json_atomic
+
+CATALOG_NAME = "_catalog.json"
+CATALOG_VERSION = 2
+DIMENSION_COLUMNS = ("zone", "tech", "country", "source")
+# Columna temporal de min_ts/max_ts: la primera presente
+CATALOG_TS_COLUMNS = ("minute_ts", "hour_ts", "datetime")
+# Lock de un shard: espera máxima y antigüedad a partir de la cual se da por abandonado
+LOCK_TIMEOUT_S = 60.0
+LOCK_STALE_S = 120.0
+
+TABLE_RELPATH_RE = re.compile(r"(?:^|/)(year=\d{4}/month=\d{2}/.*)$")
+MONTH_PATH_RE = re.compile(r"^(.*/year=(\d{4})/month=(\d{2}))(?:/|$)")
+
+_LOCK = threading.Lock()
+_PENDING: contextvars.ContextVar[list | None] = contextvars.ContextVar("catalog_pending", default=None)
+
+
+def catalog_enabled(cfg: dict) -> bool:
+    return bool((cfg.get("defaults", {}).get("catalog") or {}).get("enabled", False))
+
+
+def catalog_path(table_root: str) -> str:
+    return f"{table_root.rstrip('/')}/{CATALOG_NAME}"
+
+
+def month_catalog_path(month_path: str) -> str:
+    return f"{month_path.rstrip('/')}/{CATALOG_NAME}"
+
+
+def table_root_of(path: str) -> str:
+    """Raíz de la tabla de un fichero o mes curated (lo anterior a ``/year=YYYY``)."""
+    return re.split(r"/year=\d{4}(?:/|$)", path, maxsplit=1)[0]
+
+
+def month_path_of(path: str) -> str | None:
+    """Mes (``.../year=YYYY/month=MM``) de un fichero curated; None fuera de un mes."""
+    m = MONTH_PATH_RE.match(path)
+    return m.group(1) if m else None
+
+
+def table_relpath(path: str) -> str:
+    """Ruta relativa a la tabla (``year=2025/month=09/day=01/part-x.parquet``)."""
+    m = TABLE_RELPATH_RE.search(path)
+    return m.group(1) if m else path
+
+
+def _month_key(month_path: str) -> str:
+    m = MONTH_PATH_RE.match(month_path.rstrip("/") + "/")
+    return f"{m.group(2)}-{m.group(3)}"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def _iso(value) -> str | None:
+    """Timestamp (datetime, pandas o ISO) como ``YYYY-MM-DDTHH:MM:SSZ`` en UTC (comparable como texto)."""
+    if value is None or isinstance(value, str):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def read_catalog(table_root: str) -> dict | None:
+    """Índice de meses de la tabla (None si no hay o es de una versión anterior: se reconstruye)."""
+    catalog = read_json(catalog_path(table_root))
+    return catalog if (catalog or {}).get("version") == CATALOG_VERSION else None
+
+
+def read_month(month_path: str) -> dict | None:
+    """Shard del catálogo de un mes (None si no hay)."""
+    shard = read_json(month_catalog_path(month_path))
+    return shard if (shard or {}).get("version") == CATALOG_VERSION else None
+
+
+def _create(fs, path: str, data: bytes):
+    """Escribe ``path`` solo si no existe (``FileExistsError`` si ya está)."""
+    if "file" in fs.protocol:  # type: ignore
+        local = fs._strip_protocol(path)  # type: ignore
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        fd = os.open(local, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+    else:
+        fs.pipe_file(path, data, mode="create")  # type: ignore
+
+
+@contextmanager
+def _locked(path: str):
+    """Lock entre procesos sobre ``path`` (``path.lock`` creado con escritura condicional)."""
+    fs = _fs(path)
+    lock = f"{path}.lock"
+    deadline = time.monotonic() + LOCK_TIMEOUT_S
+    payload = json.dumps({"token": uuid.uuid4().hex, "at": time.time()}).encode()
+    while True:
+        try:
+            _create(fs, lock, payload)
+            break
+        except FileExistsError:
+            try:
+                held = read_json(lock) or {}
+            except ValueError:  # a medio escribir por quien lo tiene
+                held = {"at": time.time()}
+            if time.time() - float(held.get("at") or 0) > LOCK_STALE_S:  # writer caído: se libera
+                try:
+                    fs.rm(lock)  # type: ignore
+                except FileNotFoundError:
+                    pass
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Catálogo bloqueado: {lock}")
+            time.sleep(0.05 + random.random() * 0.1)
+    try:
+        yield
+    finally:
+        try:
+            fs.rm(lock)  # type: ignore
+        except FileNotFoundError:
+            pass
+
+
+def table_stats(table) -> dict:
+    """Filas, min/max de la columna temporal y valores de cada dimensión de una tabla Arrow."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    stats: dict = {"rows": table.num_rows, "min_ts": None, "max_ts": None, "dims": {}}
+    ts_col = next((c for c in CATALOG_TS_COLUMNS if c in table.column_names), None)
+    if ts_col and table.num_rows:
+        col = table.column(ts_col)
+        if pa.types.is_integer(col.type):  # epoch_ts
+            col = col.cast(pa.timestamp(EPOCH_UNIT, tz="UTC"))
+        if pa.types.is_timestamp(col.type):
+            mm = pc.min_max(col)
+            stats["min_ts"], stats["max_ts"] = _iso(mm["min"].as_py()), _iso(mm["max"].as_py())
+    for name in DIMENSION_COLUMNS:
+        if name in table.column_names:
+            values = pc.unique(table.column(name)).to_pylist()
+            stats["dims"][name] = sorted(str(v) for v in values if v is not None)
+    return stats
+
+
+def _entry(stats: dict, info: dict) -> dict:
+    return {**stats, "bytes": int(info.get("size") or 0), "mtime": _mtime(info)}
+
+
+def file_entry(path: str, info: dict | None = None, fs=None) -> dict:
+    """Entrada de un fichero ya escrito: lee solo la columna temporal y las dimensiones."""
+    import pyarrow.parquet as pq
+
+    fs = fs or _fs(path)
+    info = info or fs.info(path)  # type: ignore
+    with fs.open(path, "rb") as f:  # type: ignore
+        pf = pq.ParquetFile(f)
+        names = pf.schema_arrow.names
+        ts_col = next((c for c in CATALOG_TS_COLUMNS if c in names), None)
+        columns = [c for c in DIMENSION_COLUMNS if c in names] + ([ts_col] if ts_col else [])
+        stats = table_stats(pf.read(columns=columns))
+        stats["rows"] = pf.metadata.num_rows
+    return _entry(stats, info)
+
+
+def update_index(table_root: str, months=(), invalidate: bool = False, complete: bool | None = None) -> dict:
+    """Añade ``months`` (``"YYYY-MM"``) al índice de la tabla; ``invalidate`` quita ``complete``."""
+    path = catalog_path(table_root)
+    with _locked(path):
+        catalog = read_catalog(table_root) or {"version": CATALOG_VERSION, "complete": False, "months": []}
+        known = set(catalog["months"])
+        if set(months) - known or invalidate or complete is not None:
+            catalog["months"] = sorted(known | set(months))
+            if invalidate:
+                catalog["complete"] = False
+            if complete is not None:
+                catalog["complete"] = complete
+            catalog["updated_at"] = _now()
+            write_json_atomic(path, catalog)
+    return catalog
+
+
+def update_month(month_path: str, upserts: dict | None = None, removals=(), folded: dict | None = None) -> dict:
+    """Aplica ``upserts`` (``{relpath: entrada}``), ``removals`` y ``folded`` al shard del mes.
+
+    ``folded`` (``{relpath: mtime}`` del manifest): las entradas con ese mtime
+    pasan a ``folded`` sin estadísticas. Un mes nuevo se apunta antes en el
+    índice de la tabla, así nunca hay un shard que el índice no conozca.
+    """
+    path = month_catalog_path(month_path)
+    with _LOCK, _locked(path):
+        shard = read_month(month_path)
+        if shard is None:
+            update_index(table_root_of(month_path), [_month_key(month_path)])
+            shard = {"version": CATALOG_VERSION, "files": {}, "folded": {}}
+        files, kept = shard["files"], shard["folded"]
+        for rel in removals:
+            files.pop(rel, None)
+            kept.pop(rel, None)
+        for rel, entry in (upserts or {}).items():
+            files[rel] = entry
+            kept.pop(rel, None)
+        for rel, mtime in (folded or {}).items():
+            entry = files.get(rel)
+            if entry is not None and not is_compact_file(rel) and entry.get("mtime") == mtime:
+                del files[rel]
+                kept[rel] = mtime
+        shard["updated_at"] = _now()
+        write_json_atomic(path, shard)
+    return shard
+
+
+def _submit(month_path: str, upserts: dict | None, removals=(), folded: dict | None = None):
+    """``upserts=None`` invalida el catálogo de la tabla (ver ``_record_failed``)."""
+    pending = _PENDING.get()
+    if pending is not None:
+        pending.append((month_path, upserts, list(removals), folded))
+    elif upserts is None:
+        update_index(table_root_of(month_path), invalidate=True)
+    else:
+        update_month(month_path, upserts, removals, folded)
+
+
+@contextmanager
+def collect_writes():
+    """Acumula las actualizaciones del catálogo del bloque en una lista en vez de escribirlas.
+
+    Para workers en otro proceso: devuelven la lista y el coordinador la
+    aplica con ``apply_writes``.
+    """
+    pending: list = []
+    token = _PENDING.set(pending)
+    try:
+        yield pending
+    finally:
+        _PENDING.reset(token)
+
+
+def apply_writes(pending) -> dict[str, int]:
+    """Aplica lo acumulado por ``collect_writes`` (una escritura por mes). Devuelve entradas cambiadas por tabla."""
+    by_month: dict[str, tuple[dict, set, dict]] = {}
+    invalid: set[str] = set()
+    for month_path, upserts, removals, folded in pending or []:
+        if upserts is None:
+            invalid.add(table_root_of(month_path))
+            continue
+        up, rm, fold = by_month.setdefault(month_path, ({}, set(), {}))
+        for rel in removals:
+            up.pop(rel, None)
+            fold.pop(rel, None)
+            rm.add(rel)
+        for rel, entry in upserts.items():
+            up[rel] = entry
+            rm.discard(rel)
+        fold.update(folded or {})
+    changed: dict[str, int] = {}
+    for month_path, (up, rm, fold) in by_month.items():
+        update_month(month_path, up, rm, fold)
+        root = table_root_of(month_path)
+        changed[root] = changed.get(root, 0) + len(up) + len(rm)
+    for root in invalid:
+        update_index(root, invalidate=True)
+        changed.setdefault(root, 0)
+    return changed
+
+
+def record_write(path: str, table, fs=None):
+    """Apunta un fichero recién escrito con las estadísticas de ``table`` (sin releerlo).
+
+    Un fallo del catálogo no tumba la escritura: se avisa y se quita
+    ``complete`` para que el siguiente run lo reconstruya con un listado.
+    """
+    try:
+        month_path = month_path_of(path)
+        if month_path is None:
+            return
+        fs = fs or _fs(path)
+        entry = _entry(table_stats(table), fs.info(path))  # type: ignore
+        _submit(month_path, {month_relpath(path): entry})
+    except Exception as e:
+        _record_failed(path, e)
+
+
+def record_remove(path: str):
+    """Quita la entrada de un fichero borrado por un writer (mismo tratamiento de fallos que ``record_write``)."""
+    try:
+        month_path = month_path_of(path)
+        if month_path is not None:
+            _submit(month_path, {}, [month_relpath(path)])
+    except Exception as e:
+        _record_failed(path, e)
+
+
+def record_compaction(month_path: str) -> tuple[int, int]:
+    """Apunta lo que acaba de publicar la compactación del mes (sin listar). Devuelve (añadidas, quitadas).
+
+    Entradas de los compact nuevos (una lectura de sus columnas de
+    estadísticas), fuera las de los sustituidos y los micro-files plegados
+    pasan a ``folded``.
+    """
+    base = month_path.rstrip("/")
+    manifest = read_manifest(base) or {}
+    compact = list(manifest.get("compact") or [])
+    shard = read_month(base) or {"files": {}}
+    fs = _fs(base)
+    upserts = {name: file_entry(f"{base}/{name}", fs=fs) for name in compact if name not in shard["files"]}
+    removals = [rel for rel in shard["files"] if is_compact_file(rel) and rel not in compact]
+    _submit(base, upserts, removals, manifest.get("folded") or {})
+    return len(upserts), len(removals)
+
+
+def _record_failed(path: str, error: Exception):
+    print(json.dumps({"level": "warn", "msg": "catalog_update_failed", "path": path, "error": str(error)}))
+    try:
+        _submit(month_path_of(path) or path, None)
+    except Exception as e:  # el catálogo queda como estaba; el siguiente --reconcile lo repara
+        print(json.dumps({"level": "warn", "msg": "catalog_invalidate_failed", "path": path, "error": str(e)}))
+
+
+def _parquet_files(fs, base: str) -> dict[str, tuple[str, dict]]:
+    """``{relpath: (ruta, info)}`` de los Parquet bajo ``base`` (un solo listado; sin temporales ocultos)."""
+    try:
+        found = fs.find(base.rstrip("/"), detail=True)  # type: ignore
+    except FileNotFoundError:
+        return {}
+    return {
+        table_relpath(name): (name, info)
+        for name, info in found.items()
+        if name.endswith(".parquet") and "/." not in name and TABLE_RELPATH_RE.search(name)
+    }
+
+
+def _month_shard(month_path: str, found: dict[str, tuple[str, dict]], fs, previous: dict | None = None) -> dict:
+    """Shard de un mes desde un listado (``{relpath: (ruta, info)}`` del mes).
+
+    Solo se relee lo nuevo o cambiado respecto a ``previous``; lo plegado en el
+    compact del manifest queda en ``folded``.
+    """
+    files = (previous or {}).get("files") or {}
+    folded = (read_manifest(month_path) or {}).get("folded") or {}
+    out = {"version": CATALOG_VERSION, "updated_at": _now(), "files": {}, "folded": {}}
+    for rel, (name, info) in sorted(found.items()):
+        rel = month_relpath(rel)
+        mtime = _mtime(info)
+        if not is_compact_file(rel) and folded.get(rel) == mtime:
+            out["folded"][rel] = mtime
+        elif rel in files and files[rel].get("mtime") == mtime:
+            out["files"][rel] = files[rel]
+        else:
+            out["files"][rel] = file_entry(name, info, fs)
+    return out
+
+
+def rebuild_catalog(table_root: str, write: bool = True) -> dict:
+    """Reconcilia el catálogo con un listado completo de la tabla (migración / reparación). Queda ``complete``.
+
+    Es el único paso que lista el bucket. Devuelve el índice con ``files``:
+    número de ficheros catalogados.
+    """
+    fs = _fs(table_root)
+    root = table_root.rstrip("/")
+    by_month: dict[str, dict] = {}
+    for rel, found in _parquet_files(fs, root).items():
+        by_month.setdefault(month_path_of(f"{root}/{rel}"), {})[rel] = found
+    months = sorted(_month_key(p) for p in by_month)
+    count = 0
+    for month_path, found in sorted(by_month.items()):
+        if write:
+            with _LOCK, _locked(month_catalog_path(month_path)):
+                shard = _month_shard(month_path, found, fs, read_month(month_path))
+                write_json_atomic(month_catalog_path(month_path), shard)
+        else:
+            shard = _month_shard(month_path, found, fs, read_month(month_path))
+        count += len(shard["files"]) + len(shard["folded"])
+    catalog = {"version": CATALOG_VERSION, "complete": True, "updated_at": _now(), "months": months}
+    if write and months:
+        catalog = update_index(table_root, months, complete=True)
+    return {**catalog, "files": count}
+
+
+def sync_month(month_path: str) -> tuple[int, int]:
+    """Reconcilia el shard de un mes con un listado del mes. Devuelve (actualizadas, quitadas).
+
+    Para un mes del índice cuyo shard falta: recalcula lo nuevo o cambiado y
+    quita los ficheros que ya no existen.
+    """
+    base = month_path.rstrip("/")
+    fs = _fs(base)
+    previous = read_month(base) or {}
+    files, kept = previous.get("files") or {}, previous.get("folded") or {}
+    shard = _month_shard(base, _parquet_files(fs, base), fs, previous)
+    upserts = {rel: e for rel, e in shard["files"].items() if files.get(rel) != e}
+    # Plegados que el shard no tenía: entrada mínima que ``folded`` mueve a su sitio
+    upserts.update({rel: {"mtime": m} for rel, m in shard["folded"].items() if kept.get(rel) != m})
+    removals = [rel for rel in {**files, **kept} if rel not in shard["files"] and rel not in shard["folded"]]
+    _submit(base, upserts, removals, shard["folded"])
+    return len(upserts), len(removals)
+
+
+def catalog_months(catalog: dict) -> list[tuple[int, int]]:
+    return sorted((int(k[:4]), int(k[5:7])) for k in (catalog or {}).get("months") or [])
+
+
+def catalog_month_paths(table_root: str, catalog: dict) -> list[tuple[int, int, str]]:
+    """Mismo formato que ``compact.list_month_paths`` pero sacado del índice (sin listar)."""
+    root = table_root.rstrip("/")
+    return [(y, m, f"{root}/year={y:04d}/month={m:02d}") for y, m in catalog_months(catalog)]
+
+
+def month_mtimes(shard: dict) -> dict[str, float]:
+    """mtime de los micro-files del mes según su shard (``manifest.month_file_mtimes`` sin listar)."""
+    out = dict(shard.get("folded") or {})
+    out.update({rel: e.get("mtime") or 0 for rel, e in (shard.get("files") or {}).items() if not is_compact_file(rel)})
+    return out
+
+
+def month_live_files(month_path: str, shard: dict | None = None) -> list[str]:
+    """``manifest.live_files`` de un mes sin listar: micro-files del shard + manifest del mes."""
+    shard = read_month(month_path) if shard is None else shard
+    return live_files(month_path, month_mtimes(shard or {}))
+
+
+def _matches(entry: dict | None, lo: str | None, hi: str | None, dims: dict) -> bool:
+    """¿Puede tener filas en [lo, hi] y en ``dims``? Sin entrada o sin estadística: sí."""
+    if not entry:
+        return True
+    if lo and entry.get("max_ts") and entry["max_ts"] < lo:
+        return False
+    if hi and entry.get("min_ts") and entry["min_ts"] > hi:
+        return False
+    for name, wanted in dims.items():
+        have = (entry.get("dims") or {}).get(name)
+        if have is not None and not set(have) & set(wanted):
+            return False
+    return True
+
+
+def _month_window(y: int, m: int) -> tuple[str, str]:
+    """Rango UTC que puede cubrir la partición de un mes (días locales: un día de margen)."""
+    start = datetime(y, m, 1, tzinfo=timezone.utc)
+    end = datetime(y + m // 12, m % 12 + 1, 1, tzinfo=timezone.utc)
+    return _iso(start - timedelta(days=1)), _iso(end + timedelta(days=1))  # type: ignore
+
+
+def select_files(table_root: str, start=None, end=None, catalog: dict | None = None, **dims) -> list[str]:
+    """Ficheros vivos de la tabla que pueden tener filas en ``[start, end]`` y en ``dims``.
+
+    ``dims``: listas de valores por dimensión, p. ej. ``tech=["solar"]``. Solo se
+    leen el shard y el manifest de los meses que solapan el rango.
+    """
+    if catalog is None:
+        catalog = read_catalog(table_root) or {}
+    lo, hi = _iso(start), _iso(end)
+    dims = {k: [v] if isinstance(v, str) else list(v) for k, v in dims.items()}
+    out = []
+    for y, m, month_path in catalog_month_paths(table_root, catalog):
+        first, last = _month_window(y, m)
+        if (lo and last < lo) or (hi and first > hi):
+            continue
+        shard = read_month(month_path) or {}
+        files = shard.get("files") or {}
+        if not any(_matches(e, lo, hi, dims) for e in files.values()):
+            continue
+        for path in month_live_files(month_path, shard):
+            if _matches(files.get(month_relpath(path)), lo, hi, dims):
+                out.append(path)
+    return out
+
+
+def select_dataset(table_root: str, start=None, end=None, schema=None, **dims):
+    """``pyarrow.dataset`` sobre ``select_files`` (``schema`` del registro para unificar tipos)."""
+    import fsspec
+    import pyarrow.dataset as ds
+
+    files = select_files(table_root, start, end, **dims)
+    if not files:
+        return None
+    fs, _token, paths = fsspec.get_fs_token_paths(files)
+    return ds.dataset(paths, schema=schema, format="parquet", filesystem=fs)
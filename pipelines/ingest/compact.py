@@ -3,7 +3,9 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from typing import Iterable
 from zoneinfo import ZoneInfo
@@ -24,11 +26,77 @@ except ImportError:  # pragma: no cover
     pq = None  # type: ignore
     ds = None  # type: ignore
 
+try:  # relative (cuando se importa como pipelines.ingest.compact)
+    from .catalog import (
+        apply_writes,
+        catalog_enabled,
+        catalog_month_paths,
+        collect_writes,
+        month_mtimes,
+        read_catalog,
+        read_month,
+        rebuild_catalog,
+        record_compaction,
+        record_remove,
+        sync_month,
+    )
+    from .manifest import (
+        day_of,
+        is_compact_file,
+        month_file_mtimes,
+        month_relpath,
+        month_state,
+        new_compact_names,
+        pending_files,
+        publish_compaction,
+        rewritten_days,
+    )
+    from .schemas import conform_table, table_schema
+    from .utils import EPOCH_UNIT, cast_curated_table, curated_dtypes, dedupe_table, sort_table
+except ImportError:  # ejecución directa: python pipelines/ingest/compact.py
+    import os
+    import sys
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    from pipelines.ingest.catalog import (  # type: ignore
+        apply_writes,
+        catalog_enabled,
+        catalog_month_paths,
+        collect_writes,
+        month_mtimes,
+        read_catalog,
+        read_month,
+        rebuild_catalog,
+        record_compaction,
+        record_remove,
+        sync_month,
+    )
+    from pipelines.ingest.manifest import (  # type: ignore
+        day_of,
+        is_compact_file,
+        month_file_mtimes,
+        month_relpath,
+        month_state,
+        new_compact_names,
+        pending_files,
+        publish_compaction,
+        rewritten_days,
+    )
+    from pipelines.ingest.schemas import conform_table, table_schema  # type: ignore
+    from pipelines.ingest.utils import (  # type: ignore
+        EPOCH_UNIT,
+        cast_curated_table,
+        curated_dtypes,
+        dedupe_table,
+        sort_table,
+    )
+
 TZ_MADRID = ZoneInfo("Europe/Madrid")
 
 DEFAULT_SORT_CANDIDATES = ["minute_ts", "hour_ts", "datetime"]
 
-
 def load_cfg(path: str = "config/ingest.yaml"):
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
@@ -136,25 +204,52 @@ def pick_dedupe_keys(schema_names: Iterable[str]) -> list[str]:
     return []
 
 
-def read_month_dataset(month_path: str):
-    """Return (table, file_row_count, file_count) excluding existing compact.parquet.
+def table_dtypes(cfg: dict, table: str) -> dict:
+    """curated_dtypes del (primer) dataset que escribe en ``table``."""
+    for ds_cfg in cfg.get("datasets", {}).values():
+        if ds_cfg.get("curated_table") == table:
+            return curated_dtypes(cfg, ds_cfg)
+    return curated_dtypes(cfg)
 
-    file_row_count: suma de filas de cada micro-file antes de dedupe.
+
+def _micro_fragments(month_path: str, files: set[str] | None = None) -> list:
+    """Fragmentos de los micro-files del mes (sin compact).
+
+    Con ``files`` (rutas relativas al mes, p. ej. del catálogo) se abren esas
+    rutas sin listar el mes; sin ellos se descubren con un listado.
     """
     if ds is None:
         raise SystemExit("pyarrow.dataset no disponible. Instala pyarrow.")
-    dataset_all = ds.dataset(month_path, format="parquet")
+    if files is None:
+        dataset = ds.dataset(month_path, format="parquet")
+    else:
+        if not files:
+            return []
+        base = month_path.rstrip("/")
+        dataset = ds.dataset([f"{base}/{rel}" for rel in sorted(files)], format="parquet")
+    return [f for f in dataset.get_fragments() if not is_compact_file(getattr(f, "path", ""))]  # type: ignore
+
+
+def read_month_dataset(month_path: str, dtypes: dict | None = None, schema=None, files: set[str] | None = None):
+    """Return (table, file_row_count, file_count) excluding existing compact files.
+
+    ``files``: solo esos micro-files (rutas relativas al mes, ver ``month_file_mtimes``).
+
+    file_row_count: suma de filas de cada micro-file antes de dedupe.
+    ``schema`` (registro de esquemas) deja todos los fragmentos con el mismo
+    esquema: los escritos por el writer ya coinciden y solo se ajustan los
+    antiguos. Sin esquema, ``dtypes`` (curated_dtypes) unifica tipos.
+    """
     file_row_count = 0
     micro_files = 0
     tables = []
     # Enumerar ficheros concretos (fragmentos) para contar filas individuales
-    for frag in dataset_all.get_fragments():  # type: ignore
+    for frag in _micro_fragments(month_path, files):
         path = getattr(frag, "path", "")
-        if path.endswith("compact.parquet"):
-            continue
         try:
             # Leer solo columnas mínimas para contar (schema completo necesario para sort posterior)
             t = frag.to_table()  # type: ignore
+            t = conform_table(t, schema) if schema is not None else cast_curated_table(t, dtypes)
             file_row_count += t.num_rows
             micro_files += 1
             tables.append(t)
@@ -176,80 +271,386 @@ def read_month_dataset(month_path: str):
         return empty, 0, 0  # vacío
     if pa is None:
         raise SystemExit("pyarrow no disponible para concatenar")
-    # pyarrow >=14 depreca 'promote'; el comportamiento por defecto ya realiza la promoción necesaria
-    try:  # pyarrow 13/14 compat
-        table = pa.concat_tables(tables)
-    except TypeError:
-        # fallback por si alguna versión antigua exige promote=True
-        table = pa.concat_tables(tables, promote=True)  # type: ignore[arg-type]
+    # Esquemas idénticos: concatenación zero-copy, sin promoción
+    table = pa.concat_tables(tables)
     return table, file_row_count, micro_files
 
 
-def write_compacted(
-    table,
+def month_fragments_by_day(month_path: str, files: set[str] | None = None) -> list[tuple[str, list]]:
+    """Fragmentos del mes agrupados por partición ``day=DD`` en orden (sin ficheros compact).
+
+    Las particiones son días locales completos y las claves de dedupe incluyen el
+    timestamp, así que cada día se puede compactar de forma independiente.
+    Ficheros sueltos en la raíz del mes forman su propio grupo (``""``) al principio.
+    ``files``: solo esos micro-files (rutas relativas al mes).
+    """
+    groups: dict[str, list] = {}
+    for frag in _micro_fragments(month_path, files):
+        path = getattr(frag, "path", "")
+        m = re.search(r"day=(\d{2})", path)
+        groups.setdefault(m.group(1) if m else "", []).append(frag)
+    return sorted(groups.items())
+
+
+def layout_sort_keys(schema_names: Iterable[str]) -> list[str]:
+    """Orden de las filas dentro de un día: dimensiones de la clave de dedupe y luego el timestamp.
+
+    Cada dimensión (zone, tech, country...) queda contigua en el row group del
+    día, así que las estadísticas por página permiten saltarse el resto.
+    """
+    ts = pick_sort_keys(schema_names)
+    return [k for k in pick_dedupe_keys(schema_names) if k not in ts] + ts
+
+
+def sort_and_dedupe(table):
+    """Ordena (``layout_sort_keys``) y deduplica (gana la última fila). Devuelve (tabla, eliminadas, claves).
+
+    Pensado para un día: ordenar un mes entero por dimensiones mezclaría días.
+    """
+    order = layout_sort_keys(table.schema.names)
+    dedupe_keys = pick_dedupe_keys(table.schema.names)
+    before = table.num_rows
+    # Arrow puro: conserva diccionarios/float32/timestamps y no copia si no hay duplicados
+    if dedupe_keys and set(dedupe_keys) == set(order):
+        table = dedupe_table(table, order, sort=True)  # orden y dedupe en una pasada
+    else:
+        table = dedupe_table(sort_table(table, order) if order else table, dedupe_keys)
+    return table, before - table.num_rows, dedupe_keys
+
+
+def _local_days(table):
+    """Día local (Europe/Madrid) de cada fila según la columna temporal, como ``"DD"``."""
+    import pyarrow.compute as pc
+
+    sort_keys = pick_sort_keys(table.schema.names)
+    if not sort_keys:
+        raise ValueError("Compactación incremental sin columna temporal")
+    col = table.column(sort_keys[0])
+    if pa.types.is_integer(col.type):  # epoch_ts
+        col = col.cast(pa.timestamp(EPOCH_UNIT, tz="UTC"))
+    if pa.types.is_timestamp(col.type) and col.type.tz:
+        col = col.cast(pa.timestamp(col.type.unit, tz="Europe/Madrid"))
+    return pc.utf8_lpad(pc.cast(pc.day(col), pa.string()), 2, "0")
+
+
+def split_by_day(table) -> list[tuple[str, object]]:
+    """``[(día "DD", filas de ese día)]`` en orden de día (un solo grupo ``""`` sin columna temporal)."""
+    import pyarrow.compute as pc
+
+    if not pick_sort_keys(table.schema.names):
+        return [("", table)]
+    days = _local_days(table)
+    return [(d, table.filter(pc.equal(days, d))) for d in sorted(pc.unique(days).to_pylist())]
+
+
+def _compact_days(fs, paths: list[str], conform):
+    """(día, tabla) de los ficheros compact existentes, leyendo row group a row group."""
+    current, pieces = None, []
+    for path in paths:
+        with fs.open(path, "rb") as f:  # type: ignore
+            pf = pq.ParquetFile(f)
+            for i in range(pf.num_row_groups):
+                for day, piece in split_by_day(conform(pf.read_row_group(i))):
+                    if day != current and pieces:
+                        yield current, pa.concat_tables(pieces)
+                        pieces = []
+                    current = day
+                    pieces.append(piece)
+    if pieces:
+        yield current, pa.concat_tables(pieces)
+
+
+def _fold_days(compact_days, changed: dict[str, list], drop: set[str] = frozenset()):
+    """Mezcla ordenada de los días del compact con los días con ficheros nuevos.
+
+    Produce ``(día, [tabla del compact], fuentes nuevas)``; los días sin fuentes
+    nuevas se copian tal cual y los de ``drop`` salen solo de sus fuentes.
+    """
+    pending = sorted(changed)
+    for day, piece in compact_days:
+        while pending and pending[0] < day:
+            d = pending.pop(0)
+            yield d, [], changed[d]
+        sources = changed[pending.pop(0)] if pending and pending[0] == day else []
+        yield day, [] if sources and day in drop else [piece], sources
+    for d in pending:
+        yield d, [], changed[d]
+
+
+class CompactWriter:
+    """Escribe el compact de un mes con un layout pensado para lectura selectiva.
+
+    - Un día por ``write_day``: los row groups nunca mezclan días (como mucho
+      ``row_group_size`` filas, varios si el día es mayor).
+    - Filas ordenadas por ``layout_sort_keys`` (dimensiones y timestamp),
+      declarado en ``sorting_columns``, con page index y páginas de
+      ``max_rows_per_page`` filas: un filtro por tech/zone + rango de fechas lee
+      solo los row groups de esos días y, dentro, las páginas de esa dimensión.
+    - Bloom filters opcionales sobre ``bloom_filter_columns``.
+    - Ficheros de ~``target_file_mb``: al superarlo se empieza otro en la
+      siguiente frontera de día (``compact-<token>-00000.parquet``, ``-00001``...).
+
+    Se escribe en temporales ocultos; ``commit`` los mueve a nombres únicos y
+    publica el mes en ``_manifest.json`` (ver ``manifest.publish_compaction``).
+    """
+
+    def __init__(self, month_path: str, schema=None, layout: dict | None = None):
+        import fsspec
+
+        self.month_path = month_path.rstrip("/")
+        self.fs = fsspec.get_fs_token_paths(self.month_path)[0]
+        self.layout = layout or {}
+        self.schema = schema
+        self.rows = 0
+        self.tmp_paths: list[str] = []
+        self.writer = self.sink = None
+
+    def _writer_options(self, schema) -> dict:
+        lay = self.layout
+        opts = {
+            "compression": lay.get("compression", "zstd"),
+            "write_statistics": True,
+            "write_page_index": bool(lay.get("page_index", True)),
+        }
+        sort_keys = layout_sort_keys(schema.names)
+        if sort_keys:
+            opts["sorting_columns"] = pq.SortingColumn.from_ordering(schema, [(k, "ascending") for k in sort_keys])
+        if lay.get("max_rows_per_page"):
+            opts["max_rows_per_page"] = int(lay["max_rows_per_page"])
+        bloom = [c for c in lay.get("bloom_filter_columns") or [] if c in schema.names]
+        if bloom:
+            ndv, fpp = int(lay.get("bloom_filter_ndv", 1024)), float(lay.get("bloom_filter_fpp", 0.01))
+            opts["bloom_filter_options"] = {c: {"ndv": ndv, "fpp": fpp} for c in bloom}
+        return opts
+
+    def write_day(self, table):
+        if table.num_rows == 0:
+            return
+        if self.schema is None:
+            self.schema = table.schema
+        elif not table.schema.equals(self.schema, check_metadata=False):
+            table = table.cast(self.schema)
+        if self.writer is None:
+            tmp = f"{self.month_path}/.compact.{uuid.uuid4().hex}.tmp"
+            self.tmp_paths.append(tmp)
+            self.sink = self.fs.open(tmp, "wb")  # type: ignore
+            self.writer = pq.ParquetWriter(self.sink, self.schema, **self._writer_options(self.schema))
+        self.writer.write_table(table, row_group_size=int(self.layout.get("row_group_size", 50_000)))
+        self.rows += table.num_rows
+        target_mb = float(self.layout.get("target_file_mb") or 0)
+        if target_mb and self.sink.tell() >= target_mb * 1024 * 1024:
+            self._close_file()  # el siguiente día abre un fichero nuevo
+
+    def _close_file(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            self.writer = self.sink = None
+
+    def commit(self, folded: dict[str, float], run_id: str | None = None) -> list[str]:
+        """Mueve los temporales a nombres únicos y publica el manifest (``folded``: micro-files plegados)."""
+        self._close_file()
+        names = new_compact_names(len(self.tmp_paths))
+        for tmp, name in zip(self.tmp_paths, names):
+            self.fs.mv(tmp, f"{self.month_path}/{name}")  # type: ignore
+        self.tmp_paths = []
+        publish_compaction(self.month_path, names, folded, self.rows, run_id)
+        return [f"{self.month_path}/{n}" for n in names]
+
+    def abort(self):
+        """Cierra y borra los temporales (fallo a mitad: no quedan compact parciales)."""
+        try:
+            self._close_file()
+        finally:
+            for tmp in self.tmp_paths:
+                if self.fs.exists(tmp):  # type: ignore
+                    self.fs.rm(tmp)  # type: ignore
+            self.tmp_paths = []
+
+
+def compact_month_streaming(
     month_path: str,
+    dtypes: dict | None = None,
+    schema=None,
     compression: str = "zstd",
     row_group_size: int = 50_000,
     force: bool = False,
-):
+    dry_run: bool = False,
+    incremental: bool = False,
+    layout: dict | None = None,
+    run_id: str | None = None,
+    mtimes: dict[str, float] | None = None,
+) -> dict:
+    """Compacta el mes día a día con un ``CompactWriter``.
+
+    Solo hay un día en memoria a la vez (lectura, orden y dedupe), de modo que
+    el pico no depende del tamaño del mes. El resultado se publica en el
+    manifest del mes al terminar: un fallo a mitad no cambia lo que ven los
+    lectores.
+
+    Con ``incremental`` y un compact previo solo se leen los micro-files que
+    el manifest no da por plegados (nuevos o reescritos): sus días se mezclan
+    con las filas del compact y el resto de días se copia. Un día con un
+    fichero reescrito en su sitio se rehace desde sus micro-files si siguen
+    todos (``manifest.rewritten_days``), igual que lo ve ``live_dataset``. ``force`` relee
+    todos los micro-files que queden, sin perder los días cuyos originales ya
+    se borraron.
+
+    ``mtimes``: micro-files del mes si ya se conocen (``catalog.month_mtimes``);
+    así no se lista el mes y solo se abren los ficheros que se van a leer.
+    """
     if pq is None:
         raise SystemExit("pyarrow.parquet no disponible. Instala pyarrow.")
-    out_path = month_path.rstrip("/") + "/compact.parquet"
     import fsspec
 
-    fs = fsspec.get_fs_token_paths(out_path)[0]
-    if fs.exists(out_path) and not force:  # type: ignore
-        raise SystemExit(f"Ya existe {out_path}. Usa --force para sobrescribir.")
-    pq.write_table(
-        table, out_path, compression=compression, row_group_size=row_group_size
-    )
-    return out_path
+    fs = fsspec.get_fs_token_paths(month_path)[0]
+    # Foto de los micro-files antes de leer: solo se pliegan (y se apuntan en el
+    # manifest) estos; lo que llegue durante la compactación queda pendiente
+    mtimes = month_file_mtimes(month_path) if mtimes is None else mtimes
+    existing, folded = month_state(month_path, mtimes)
+    fold = incremental and bool(existing)
+    if not fold and not dry_run and existing and not force:
+        raise SystemExit(f"Ya existe {existing[0]}. Usa --force para sobrescribir.")
+    stats = {
+        "days": 0,
+        "micro_files": 0,
+        "rows_sum_files": 0,
+        "rows_final": 0,
+        "dedup_removed": 0,
+        "days_copied": 0,
+        "up_to_date": False,
+    }
+
+    def conform(t):
+        return conform_table(t, schema) if schema is not None else cast_curated_table(t, dtypes)
 
+    if fold:
+        pending = set(mtimes) if force else set(pending_files(mtimes, folded))
+        # Días plegados con un fichero reescrito en su sitio (merge/replace) y
+        # todos sus originales: se rehacen solo con sus micro-files
+        rebuild = {d for d, full in rewritten_days(mtimes, folded).items() if full}
+        groups = month_fragments_by_day(month_path, files=pending | {r for r in mtimes if day_of(r) in rebuild})
+        changed: dict[str, list] = {}
+        for day, frags in groups:
+            new = sorted(frags, key=lambda f: mtimes[month_relpath(f.path)])  # gana el más reciente
+            if day:
+                changed.setdefault(day, []).extend(new)
+                continue
+            for frag in new:  # ficheros sueltos en la raíz del mes: repartir por día
+                t = conform(frag.to_table())  # type: ignore
+                stats["micro_files"] += 1
+                stats["rows_sum_files"] += t.num_rows
+                for d, piece in split_by_day(t):
+                    changed.setdefault(d, []).append(piece)
+        if not changed:
+            stats.update(up_to_date=True, path=existing[0], paths=existing)
+            return stats
+        days_iter = _fold_days(_compact_days(fs, existing, conform), changed, drop=rebuild)
+    else:
+        groups = month_fragments_by_day(month_path, files=set(mtimes))
+        days_iter = ((day, [], frags) for day, frags in groups)
+
+    layout = {**(layout or {}), "compression": compression, "row_group_size": row_group_size}
+    writer = CompactWriter(month_path, schema, layout)
+    paths = existing or [month_path.rstrip("/") + "/" + new_compact_names(1)[0]]
+    try:
+        for _day, base, sources in days_iter:
+            tables = list(base)
+            for src in sources:
+                if isinstance(src, pa.Table):  # ya leído (raíz del mes)
+                    tables.append(src)
+                    continue
+                t = conform(src.to_table())  # type: ignore
+                tables.append(t)
+                stats["micro_files"] += 1
+                stats["rows_sum_files"] += t.num_rows
+            stats["days"] += 1
+            if sources:
+                day_table, removed, _keys = sort_and_dedupe(pa.concat_tables(tables))
+                stats["dedup_removed"] += removed
+            else:
+                day_table = tables[0]
+                stats["days_copied"] += 1
+            del tables
+            stats["rows_final"] += day_table.num_rows
+            if not dry_run:
+                writer.write_day(day_table)
+        if not dry_run:
+            paths = writer.commit(mtimes, run_id)
+    finally:
+        writer.abort()
+    stats["path"], stats["paths"] = paths[0], paths
+    return stats
+
+
+def write_compacted(
+    day_tables: list,
+    month_path: str,
+    compression: str = "zstd",
+    row_group_size: int = 50_000,
+    force: bool = False,
+    folded: dict[str, float] | None = None,
+    layout: dict | None = None,
+    run_id: str | None = None,
+) -> list[str]:
+    """Escribe y publica el compact de un mes ya leído en memoria (una tabla por día, ver ``CompactWriter``).
 
-def delete_micro_files(month_path: str):
-    """Delete micro parquet files inside day=DD folders and remove now-empty day folders.
+    ``folded``: micro-files (``{relpath: mtime}``) que contiene, para el manifest.
+    """
+    if pq is None:
+        raise SystemExit("pyarrow.parquet no disponible. Instala pyarrow.")
+    existing, _folded = month_state(month_path)
+    if existing and not force:
+        raise SystemExit(f"Ya existe {existing[0]}. Usa --force para sobrescribir.")
+    schema = day_tables[0].schema if day_tables else None
+    layout = {**(layout or {}), "compression": compression, "row_group_size": row_group_size}
+    writer = CompactWriter(month_path, schema, layout)
+    try:
+        for day_table in day_tables:
+            writer.write_day(day_table)
+        return writer.commit(folded or {}, run_id)
+    finally:
+        writer.abort()
 
+
+def delete_micro_files(month_path: str, mtimes: dict[str, float] | None = None, catalog: bool = False):
+    """Borra los micro-files ya plegados en el compact publicado y las carpetas day=DD vacías.
+
+    Solo se borra lo que el manifest da por plegado (mismo mtime): los
+    micro-files que llegaron después de la compactación se conservan.
+    ``mtimes``: micro-files del mes si ya se conocen (catálogo); con
+    ``catalog`` los borrados salen también del catálogo.
     Returns a dict with counts for logging.
     """
     import fsspec
 
     fs = fsspec.get_fs_token_paths(month_path)[0]
+    base = month_path.rstrip("/")
+    mtimes = month_file_mtimes(month_path) if mtimes is None else mtimes
+    _compact, folded = month_state(month_path, mtimes)
     micro_files_deleted = 0
     day_dirs_removed = 0
-    # First pass: delete parquet files inside day=DD folders (and any stray parquet at month root except compact)
-    for info in fs.listdir(month_path):  # type: ignore
-        name = info.get("name") if isinstance(info, dict) else info
-        if not isinstance(name, str):
-            continue
-        if name.endswith("compact.parquet"):
+    day_dirs = set()
+    for rel in sorted(mtimes):
+        if rel not in folded or mtimes[rel] > folded[rel]:
             continue
-        if name.endswith(".parquet"):
-            fs.rm(name)  # type: ignore
-            micro_files_deleted += 1
-            continue
-        # Potential day= directory
-        if "day=" in name:
-            # Delete parquet files inside
-            inner_list = fs.listdir(name)  # type: ignore
-            for inner in inner_list:
-                in_name = inner.get("name") if isinstance(inner, dict) else inner
-                if not isinstance(in_name, str):
-                    continue
-                if in_name.endswith("compact.parquet"):
-                    continue
-                if in_name.endswith(".parquet"):
-                    fs.rm(in_name)  # type: ignore
-                    micro_files_deleted += 1
-            # After deletions, if directory is empty, remove it
-            # Some FS (e.g. GCS) may show directory placeholders; try-catch removal
-            try:
-                if not fs.listdir(name):  # type: ignore
-                    fs.rm(name, recursive=True)  # type: ignore
-                    day_dirs_removed += 1
-            except Exception:  # pragma: no cover - best effort
-                pass
+        fs.rm(f"{base}/{rel}")  # type: ignore
+        micro_files_deleted += 1
+        if catalog:
+            record_remove(f"{base}/{rel}")
+        if "/" in rel:
+            day_dirs.add(f"{base}/{rel.rsplit('/', 1)[0]}")
+    for name in sorted(day_dirs):
+        # Some FS (e.g. GCS) may show directory placeholders; try-catch removal
+        try:
+            if not fs.listdir(name):  # type: ignore
+                fs.rm(name, recursive=True)  # type: ignore
+                day_dirs_removed += 1
+        except Exception:  # pragma: no cover - best effort
+            pass
     return {
         "micro_files_deleted": micro_files_deleted,
+        "micro_files_pending": len(mtimes) - micro_files_deleted,
         "day_dirs_removed": day_dirs_removed,
     }
 
@@ -257,7 +658,304 @@ def delete_micro_files(month_path: str):
 def log(level: str, **fields):
     rec = {"ts": datetime.utcnow().isoformat() + "Z", "level": level}
     rec.update(fields)
-    print(json.dumps(rec))
+    # Una sola escritura por línea: los meses en paralelo no intercalan JSON
+    print(json.dumps(rec) + "\n", end="", flush=True)
+
+
+def _log_dedupe(run_id: str, removed: int, dedupe_keys: list[str], columns):
+    log("info", action="dedupe", run_id=run_id, removed=removed, keys=dedupe_keys)
+    # Heurística: si usamos sólo timestamp y existen columnas de dimensión, alertar posible colapso accidental
+    dims_present = [c for c in ["tech", "country", "source"] if c in columns]
+    if len(dedupe_keys) == 1 and dims_present:
+        log(
+            "warn",
+            action="possible_dimension_collapse",
+            run_id=run_id,
+            key_used=dedupe_keys,
+            dims_present=dims_present,
+            suggestion="Revisar pick_dedupe_keys: quizá faltan columnas de dimensión",
+        )
+
+
+def _delete_originals(run_id: str, path: str, options: dict):
+    try:
+        del_stats = delete_micro_files(path, options.get("mtimes"), bool(options.get("catalog")))
+        log(
+            "info",
+            action="micro_delete_ok",
+            run_id=run_id,
+            path=path,
+            micro_files_deleted=del_stats.get("micro_files_deleted"),
+            micro_files_pending=del_stats.get("micro_files_pending"),
+            day_dirs_removed=del_stats.get("day_dirs_removed"),
+        )
+    except Exception as e:
+        log(
+            "warn",
+            action="micro_delete_failed",
+            run_id=run_id,
+            path=path,
+            error=str(e),
+        )
+
+
+def _run_streaming_month(options: dict, cfg, table: str, schema, path: str, y: int, m: int, run_id: str) -> dict:
+    """Rama ``streaming`` de ``compact_month`` (mismos logs que la compactación en memoria)."""
+    compaction = cfg.get("defaults", {}).get("compaction", {})
+    try:
+        st = compact_month_streaming(
+            path,
+            table_dtypes(cfg, table),
+            schema,
+            row_group_size=int(compaction.get("row_group_size", 50_000)),
+            force=options.get("force", False),
+            dry_run=options.get("dry_run", False),
+            incremental=options.get("incremental", False),
+            layout=compaction,
+            run_id=run_id,
+            mtimes=options.get("mtimes"),
+        )
+    except SystemExit as se:  # e.g. file exists
+        log("info", action="write_skip", run_id=run_id, reason=str(se))
+        return {"status": "skipped"}
+    except Exception as e:
+        log("error", action="compact_failed", run_id=run_id, path=path, error=str(e))
+        return {"status": "failed"}
+    stats = {k: st[k] for k in ("micro_files", "rows_sum_files", "rows_final", "dedup_removed")}
+    if st["up_to_date"]:
+        log("info", action="up_to_date", run_id=run_id, table=table, year=y, month=m, path=st["path"])
+        return {"status": "up_to_date"}
+    if st["rows_final"] == 0:
+        log("info", action="empty_month", run_id=run_id, table=table, year=y, month=m)
+        return {"status": "empty", **stats}
+    log(
+        "info",
+        action="pre_stats",
+        run_id=run_id,
+        table=table,
+        year=y,
+        month=m,
+        micro_files=st["micro_files"],
+        rows_sum_files=st["rows_sum_files"],
+        days=st["days"],
+        days_copied=st["days_copied"],
+    )
+    if st["dedup_removed"]:
+        columns = schema.names if schema is not None else []
+        _log_dedupe(run_id, st["dedup_removed"], pick_dedupe_keys(columns), columns)
+    log("info", action="post_stats", run_id=run_id, table=table, year=y, month=m, rows_final=st["rows_final"])
+    action = "dry_write" if options.get("dry_run") else "write_ok"
+    log(
+        "info",
+        action=action,
+        run_id=run_id,
+        path=st["path"],
+        files=len(st["paths"]),
+        rows=st["rows_final"],
+        streaming=True,
+        incremental=bool(options.get("incremental")),
+    )
+    if options.get("delete_originals") and not options.get("dry_run"):
+        _delete_originals(run_id, path, options)
+    return {"status": "dry_run" if options.get("dry_run") else "ok", **stats}
+
+
+def _run_in_memory_month(options: dict, cfg, table: str, schema, path: str, y: int, m: int, run_id: str) -> dict:
+    """Rama en memoria de ``compact_month``: mes completo en memoria, orden y dedupe por día."""
+    try:
+        # foto antes de leer (lo posterior queda pendiente)
+        mtimes = options.get("mtimes")
+        mtimes = month_file_mtimes(path) if mtimes is None else mtimes
+        table_pa, raw_row_count, micro_file_count = read_month_dataset(
+            path, table_dtypes(cfg, table), schema, files=set(mtimes)
+        )
+    except Exception as e:
+        log("error", action="read_failed", run_id=run_id, path=path, error=str(e))
+        return {"status": "failed"}
+    if table_pa.num_rows == 0:
+        log("info", action="empty_month", run_id=run_id, table=table, year=y, month=m)
+        return {"status": "empty", "micro_files": micro_file_count}
+    log(
+        "info",
+        action="pre_stats",
+        run_id=run_id,
+        table=table,
+        year=y,
+        month=m,
+        micro_files=micro_file_count,
+        rows_sum_files=raw_row_count,
+        rows_concat=table_pa.num_rows,
+    )
+    day_tables, removed = [], 0
+    for _day, day_table in split_by_day(table_pa):
+        day_table, day_removed, dedupe_keys = sort_and_dedupe(day_table)
+        day_tables.append(day_table)
+        removed += day_removed
+    del table_pa
+    rows_final = sum(t.num_rows for t in day_tables)
+    if removed:
+        _log_dedupe(run_id, removed, dedupe_keys, day_tables[0].schema.names)
+    # Validación: filas concat (antes dedupe) == suma micro-files
+    if rows_final > raw_row_count:
+        log(
+            "warn",
+            action="row_mismatch_excess",
+            run_id=run_id,
+            table=table,
+            expected=raw_row_count,
+            actual=rows_final,
+        )
+    # Estadísticas finales
+    log("info", action="post_stats", run_id=run_id, table=table, year=y, month=m, rows_final=rows_final)
+    stats = {
+        "micro_files": micro_file_count,
+        "rows_sum_files": raw_row_count,
+        "rows_final": rows_final,
+        "dedup_removed": removed,
+    }
+    if options.get("dry_run"):
+        log("info", action="dry_write", run_id=run_id, path=path, rows=rows_final)
+        return {"status": "dry_run", **stats}
+    compaction = cfg.get("defaults", {}).get("compaction", {})
+    try:
+        written = write_compacted(
+            day_tables,
+            path,
+            row_group_size=int(compaction.get("row_group_size", 50_000)),
+            force=options.get("force", False),
+            folded=mtimes,
+            layout=compaction,
+            run_id=run_id,
+        )
+    except SystemExit as se:  # e.g. file exists
+        log("info", action="write_skip", run_id=run_id, reason=str(se))
+        return {"status": "skipped", **stats}
+    log("info", action="write_ok", run_id=run_id, path=written[0], files=len(written), rows=rows_final)
+    if options.get("delete_originals"):
+        _delete_originals(run_id, path, options)
+    return {"status": "ok", **stats}
+
+
+def compact_month(cfg: dict, table: str, y: int, m: int, path: str, options: dict, run_id: str) -> dict:
+    """Compacta un mes de ``table`` y devuelve su resultado para el ``run_summary``.
+
+    ``options``: streaming, incremental, force, dry_run, delete_originals, catalog
+    (``incremental`` siempre usa la ruta streaming). Es una función de
+    módulo con argumentos simples para poder ejecutarse en un ``ProcessPoolExecutor``.
+    Los errores se registran y se devuelven como ``status="failed"``: un mes roto
+    no tumba el resto del run. Con ``catalog`` los micro-files salen del shard
+    del mes (sin listar; un mes sin shard se lista y se reconcilia) y lo
+    publicado se apunta en él; las actualizaciones se devuelven en
+    ``result["catalog"]`` para que las aplique el proceso principal
+    (``catalog.apply_writes``).
+    """
+    t0 = time.perf_counter()
+    log("info", action="processing_month", run_id=run_id, table=table, year=y, month=m, path=path)
+    result = {
+        "table": table,
+        "year": y,
+        "month": m,
+        "path": path,
+        "status": "failed",
+        "micro_files": 0,
+        "rows_sum_files": 0,
+        "rows_final": 0,
+        "dedup_removed": 0,
+    }
+    streaming = options.get("streaming") or options.get("incremental")
+    runner = _run_streaming_month if streaming else _run_in_memory_month
+    shard = None
+    with collect_writes() as catalog_writes:
+        try:
+            if options.get("catalog"):
+                shard = read_month(path)
+                if shard is None:
+                    log("info", action="catalog_month_missing", run_id=run_id, path=path)
+                options = {**options, "mtimes": month_mtimes(shard) if shard is not None else None}
+            result.update(runner(options, cfg, table, table_schema(cfg, table), path, y, m, run_id))
+        except Exception as e:
+            log("error", action="compact_failed", run_id=run_id, path=path, error=str(e))
+        if options.get("catalog") and not options.get("dry_run"):
+            try:
+                if shard is None:
+                    sync_month(path)  # sin shard: un listado del mes lo reconstruye
+                elif result["status"] == "ok":
+                    record_compaction(path)
+            except Exception as e:  # el mes ya está publicado: solo queda el catálogo atrasado
+                log("warn", action="catalog_sync_failed", run_id=run_id, path=path, error=str(e))
+    result["catalog"] = catalog_writes
+    result["duration_seconds"] = round(time.perf_counter() - t0, 2)
+    return result
+
+
+def filesystem_of(path: str) -> str:
+    """Protocolo de una ruta (``gs``, ``s3``...); ``file`` para rutas locales."""
+    return path.split("://", 1)[0] if "://" in path else "file"
+
+
+def run_scheduled(jobs: list, fn, workers: int = 1, executor: str = "thread", fs_limits: dict | None = None) -> list:
+    """Ejecuta ``fn(*args)`` para cada job ``(path, args)`` en un pool de ``workers``.
+
+    ``executor``: ``thread`` (I/O contra GCS) o ``process`` (orden/dedupe con CPU).
+    Nunca hay más de ``fs_limits[fs]`` jobs en vuelo sobre el mismo filesystem
+    (``filesystem_of(path)``; 0 o ausente = sin límite propio). El control se hace
+    al enviar, así que vale igual para hilos que para procesos. Devuelve los
+    resultados en el orden de ``jobs``.
+    """
+    fs_limits = fs_limits or {}
+    if workers <= 1:
+        return [fn(*args) for _path, args in jobs]
+    pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    results: list = [None] * len(jobs)
+    pending = list(enumerate(jobs))
+    in_flight: dict = {}  # future -> (índice, filesystem)
+    busy: dict[str, int] = {}
+    with pool_cls(max_workers=workers) as pool:
+        while pending or in_flight:
+            for item in list(pending):
+                if len(in_flight) >= workers:
+                    break
+                idx, (path, args) = item
+                fs = filesystem_of(path)
+                if fs_limits.get(fs) and busy.get(fs, 0) >= fs_limits[fs]:
+                    continue
+                pending.remove(item)
+                busy[fs] = busy.get(fs, 0) + 1
+                in_flight[pool.submit(fn, *args)] = (idx, fs)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                idx, fs = in_flight.pop(fut)
+                busy[fs] -= 1
+                results[idx] = fut.result()
+    return results
+
+
+def summarize_months(results: list[dict]) -> dict:
+    """Agrega los resultados de ``compact_month`` en los totales del ``run_summary``."""
+    summary = {
+        "months_processed": 0,
+        "months_failed": 0,
+        "months_skipped": 0,
+        "months_empty": 0,
+        "months_up_to_date": 0,
+        "rows_final_total": 0,
+        "rows_files_sum_total": 0,
+        "dedup_removed_total": 0,
+        "tables": {},
+    }
+    for r in results:
+        per_table = summary["tables"].setdefault(r["table"], {"months": 0, "rows_final": 0, "dedup_removed": 0})
+        if r["status"] in ("failed", "skipped", "empty", "up_to_date"):
+            summary[f"months_{r['status']}"] += 1
+            continue
+        summary["months_processed"] += 1
+        summary["rows_final_total"] += r["rows_final"]
+        summary["rows_files_sum_total"] += r["rows_sum_files"]
+        summary["dedup_removed_total"] += r["dedup_removed"]
+        per_table["months"] += 1
+        per_table["rows_final"] += r["rows_final"]
+        per_table["dedup_removed"] += r["dedup_removed"]
+    return summary
 
 
 def main():  # noqa: C901
@@ -288,22 +986,54 @@ def main():  # noqa: C901
         help="Procesar únicamente el mes YYYY-MM indicado (después se puede combinar con --dataset)",
     )
     parser.add_argument(
-        "--force", action="store_true", help="Sobrescribir compact.parquet existente"
+        "--force", action="store_true", help="Sobrescribir el compact existente (compact*.parquet)"
     )
     parser.add_argument(
         "--delete-originals",
         action="store_true",
         help="Borrar micro-files tras compactar",
     )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Reconciliar el catálogo con un listado completo de cada tabla antes de planificar",
+    )
     parser.add_argument("--local", action="store_true", help="Usar paths_local.curated")
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="No escribe ni borra, solo muestra acciones",
     )
+    parser.add_argument(
+        "--streaming",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Compacta día a día con ParquetWriter (memoria acotada). Por defecto defaults.compaction.streaming",
+    )
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Pliega en el compact solo los días con micro-files que el manifest no da por plegados. "
+        "Por defecto defaults.compaction.incremental",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Meses (tabla x mes) en paralelo. Por defecto defaults.compaction.workers",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["thread", "process"],
+        help="thread = I/O (GCS), process = orden/dedupe con CPU. Por defecto defaults.compaction.executor",
+    )
     args = parser.parse_args()
 
     cfg = load_cfg()
+    if args.streaming is None:
+        args.streaming = bool(cfg.get("defaults", {}).get("compaction", {}).get("streaming", False))
+    if args.incremental is None:
+        args.incremental = bool(cfg.get("defaults", {}).get("compaction", {}).get("incremental", False))
     curated_tpl = cfg["paths_local" if args.local else "paths"]["curated"]
     # Derive curated root (remove trailing template components)
     # Template: {bucket}/curated/{table}/year=YYYY/month=MM/day=DD/part-{uuid}.parquet
@@ -327,25 +1057,41 @@ def main():  # noqa: C901
     else:
         target_tables = sorted(tables_cfg)
 
+    compaction = cfg.get("defaults", {}).get("compaction", {})
+    workers = args.workers or int(compaction.get("workers", 1))
+    executor = args.executor or compaction.get("executor", "thread")
+    options = {
+        "streaming": args.streaming,
+        "incremental": args.incremental,
+        "force": args.force,
+        "dry_run": args.dry_run,
+        "delete_originals": args.delete_originals,
+        "catalog": catalog_enabled(cfg),
+    }
+
     run_id = str(uuid.uuid4())
     t_start = datetime.now(timezone.utc)
-    global_stats = {
-        "months": 0,
-        "rows_final_total": 0,
-        "rows_files_sum_total": 0,
-        "dedup_removed_total": 0,
-    }
     log("info", action="tables_selected", run_id=run_id, tables=target_tables)
+    jobs = []
     for table in target_tables:
         table_root = f"{curated_root}/{table}"
         try:
-            month_paths = list_month_paths(table_root, table, local=args.local)
+            if catalog_enabled(cfg):
+                # Meses del catálogo (sin listar el bucket). Solo se lista para
+                # reconciliarlo: con --reconcile o si no está completo (primer run)
+                catalog = read_catalog(table_root)
+                if args.reconcile or not (catalog or {}).get("complete"):
+                    catalog = rebuild_catalog(table_root, write=not args.dry_run)
+                    log("info", action="catalog_rebuilt", run_id=run_id, table=table, files=catalog["files"])
+                table_months = catalog_month_paths(table_root, catalog)
+            else:
+                table_months = list_month_paths(table_root, table, local=args.local)
         except Exception as e:
             log(
                 "warn", action="list_failed", table=table, root=table_root, error=str(e)
             )
             continue
-        closed = detect_closed_months(month_paths, include_current=args.include_current)
+        closed = detect_closed_months(table_months, include_current=args.include_current)
         # Filtro por --month específico
         if args.month:
             try:
@@ -360,155 +1106,24 @@ def main():  # noqa: C901
         if not closed:
             log("info", action="no_closed_months", table=table)
             continue
-        for y, m, path in closed:
-            log(
-                "info",
-                action="processing_month",
-                run_id=run_id,
-                table=table,
-                year=y,
-                month=m,
-                path=path,
-            )
-            try:
-                table_pa, raw_row_count, micro_file_count = read_month_dataset(path)
-            except Exception as e:
-                log(
-                    "error",
-                    action="read_failed",
-                    run_id=run_id,
-                    path=path,
-                    error=str(e),
-                )
-                continue
-            if table_pa.num_rows == 0:
-                log(
-                    "info",
-                    action="empty_month",
-                    run_id=run_id,
-                    table=table,
-                    year=y,
-                    month=m,
-                )
-                continue
-            log(
-                "info",
-                action="pre_stats",
-                run_id=run_id,
-                table=table,
-                year=y,
-                month=m,
-                micro_files=micro_file_count,
-                rows_sum_files=raw_row_count,
-                rows_concat=table_pa.num_rows,
-            )
-            sort_keys = pick_sort_keys(table_pa.schema.names)
-            if sort_keys:
-                table_pa = table_pa.sort_by([(k, "ascending") for k in sort_keys])
-
-            # Infer better dedupe keys (can be wider than sort keys)
-            dedupe_keys = pick_dedupe_keys(table_pa.schema.names)
-            if dedupe_keys:
-                pdf = table_pa.to_pandas()
-                before = len(pdf)
-                pdf = pdf.drop_duplicates(subset=dedupe_keys, keep="last")
-                removed = before - len(pdf)
-                if removed:
-                    log(
-                        "info",
-                        action="dedupe",
-                        run_id=run_id,
-                        removed=removed,
-                        keys=dedupe_keys,
-                    )
-                    # Heurística: si usamos sólo timestamp y existen columnas de dimensión, alertar posible colapso accidental
-                    if len(dedupe_keys) == 1 and any(
-                        c in pdf.columns for c in ["tech", "country", "source"]
-                    ):
-                        log(
-                            "warn",
-                            action="possible_dimension_collapse",
-                            run_id=run_id,
-                            key_used=dedupe_keys,
-                            dims_present=[
-                                c
-                                for c in ["tech", "country", "source"]
-                                if c in pdf.columns
-                            ],
-                            suggestion="Revisar pick_dedupe_keys: quizá faltan columnas de dimensión",
-                        )
-                if pa is None:
-                    raise SystemExit(
-                        "pyarrow no disponible para reconstruir tabla tras dedupe"
-                    )
-                table_pa = pa.Table.from_pandas(pdf, preserve_index=False)
-            # Validación: filas concat (antes dedupe) == suma micro-files
-            if table_pa.num_rows > raw_row_count:
-                log(
-                    "warn",
-                    action="row_mismatch_excess",
-                    run_id=run_id,
-                    table=table,
-                    expected=raw_row_count,
-                    actual=table_pa.num_rows,
-                )
-            # Estadísticas finales
-            log(
-                "info",
-                action="post_stats",
-                run_id=run_id,
-                table=table,
-                year=y,
-                month=m,
-                rows_final=table_pa.num_rows,
-            )
-            global_stats["months"] += 1
-            global_stats["rows_final_total"] += table_pa.num_rows
-            global_stats["rows_files_sum_total"] += raw_row_count
-            # dedup_removed sum captured via individual logs; approximate by diff
-            if raw_row_count >= table_pa.num_rows:
-                global_stats["dedup_removed_total"] += raw_row_count - table_pa.num_rows
-            out_path = path.rstrip("/") + "/compact.parquet"
-            if args.dry_run:
-                log(
-                    "info",
-                    action="dry_write",
-                    run_id=run_id,
-                    path=out_path,
-                    rows=table_pa.num_rows,
-                )
-            else:
-                try:
-                    written = write_compacted(table_pa, path, force=args.force)
-                    log(
-                        "info",
-                        action="write_ok",
-                        run_id=run_id,
-                        path=written,
-                        rows=table_pa.num_rows,
-                    )
-                except SystemExit as se:  # e.g. file exists
-                    log("info", action="write_skip", run_id=run_id, reason=str(se))
-                    continue
-            if args.delete_originals and not args.dry_run:
-                try:
-                    del_stats = delete_micro_files(path)
-                    log(
-                        "info",
-                        action="micro_delete_ok",
-                        run_id=run_id,
-                        path=path,
-                        micro_files_deleted=del_stats.get("micro_files_deleted"),
-                        day_dirs_removed=del_stats.get("day_dirs_removed"),
-                    )
-                except Exception as e:
-                    log(
-                        "warn",
-                        action="micro_delete_failed",
-                        run_id=run_id,
-                        path=path,
-                        error=str(e),
-                    )
+        jobs.extend((path, (cfg, table, y, m, path, options, run_id)) for y, m, path in closed)
+
+    fs_limits = compaction.get("max_concurrency") or {}
+    log(
+        "info",
+        action="compaction_plan",
+        run_id=run_id,
+        months=len(jobs),
+        workers=workers,
+        executor=executor,
+        max_concurrency=fs_limits,
+    )
+    results = run_scheduled(jobs, compact_month, workers, executor, fs_limits)
+    # Catálogo: lo escribe solo este proceso, una vez por tabla
+    updated = apply_writes([w for r in results for w in r.pop("catalog", [])])
+    for root, files in updated.items():
+        log("info", action="catalog_updated", run_id=run_id, root=root, files=files)
+    summary = summarize_months(results)
 
     t_end = datetime.now(timezone.utc)
     duration_s = (t_end - t_start).total_seconds()
@@ -516,12 +1131,13 @@ def main():  # noqa: C901
         "info",
         action="run_summary",
         run_id=run_id,
-        months_processed=global_stats["months"],
-        rows_final_total=global_stats["rows_final_total"],
-        rows_files_sum_total=global_stats["rows_files_sum_total"],
-        dedup_removed_total=global_stats["dedup_removed_total"],
+        **summary,
         duration_seconds=round(duration_s, 2),
         dry_run=args.dry_run,
+        streaming=args.streaming,
+        incremental=args.incremental,
+        workers=workers,
+        executor=executor,
     )
 
 
@@ -0,0 +1,136 @@
+"""Cliente ESIOS asíncrono (asyncio + aiohttp).
+
+Mismas semánticas que ``EsiosClient``: fallback de cabeceras ante 403, modo de
+auth ganador compartido por proceso y errores ``requests.HTTPError`` con el
+mismo detalle. Todas las corrutinas de un event loop comparten rate limit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Dict
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None  # type: ignore
+
+from .cache import ResponseCache
+from .esios_client import (
+    _auth_headers,
+    auth_header_order,
+    default_headers,
+    indicator_params,
+    load_auth_mode,
+    remember_auth_mode,
+)
+from .ratelimit import RateLimiter, TokenBucket
+
+
+class _AsyncResponseError:
+    """Adaptador mínimo para formatear errores igual que el cliente síncrono."""
+
+    def __init__(self, status: int, reason: str | None, url: str, body):
+        self.status_code = status
+        self.reason = reason
+        self.url = url
+        self.body = body
+
+    def to_error(self) -> requests.HTTPError:
+        info = f"HTTP {self.status_code} - {self.reason}"
+        return requests.HTTPError(f"{info} | URL={self.url} | Body={self.body}")
+
+
+class AsyncEsiosClient:
+    def __init__(
+        self,
+        api_key: str | None = None,
+        rate_limit_per_sec: float = 1.0,
+        timeout_seconds: int = 30,
+        pool_size: int = 10,
+        auth_cache_path: str | None = None,
+        limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
+    ):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp no disponible. Instala aiohttp.")
+        self.api_key = (api_key or os.environ.get("ESIOS_TOKEN", "")).strip()
+        if not self.api_key:
+            raise RuntimeError("ESIOS_TOKEN no configurado")
+        self.limiter = limiter or TokenBucket(rate_limit_per_sec)
+        self.cache = cache
+        self.timeout = timeout_seconds
+        self.pool_size = pool_size
+        self.auth_cache_path = auth_cache_path or os.environ.get("ESIOS_AUTH_CACHE")
+        load_auth_mode(self.auth_cache_path)
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                headers=default_headers(),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _throttle(self):
+        await self.limiter.aacquire()
+
+    async def get_indicator(
+        self,
+        indicator_id: int,
+        start_iso_utc: str,
+        end_iso_utc: str,
+        base_url: str,
+        time_trunc: str | None = "hour",
+    ) -> Dict[str, Any]:
+        params = indicator_params(start_iso_utc, end_iso_utc, time_trunc)
+        cache_key = (indicator_id, start_iso_utc, end_iso_utc, time_trunc, params["locale"])
+        # Caché y auth_mode son E/S de disco: en un hilo para no bloquear el event loop
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, *cache_key)
+            if cached is not None:
+                return cached
+        url = f"{base_url}/{indicator_id}"
+        session = await self._get_session()
+
+        last_err = None
+        for mode in auth_header_order():
+            await self._throttle()
+            async with session.get(
+                url, headers=_auth_headers(mode, self.api_key), params=params
+            ) as resp:
+                if resp.ok:
+                    await asyncio.to_thread(remember_auth_mode, mode, self.auth_cache_path)
+                    payload = await resp.json(content_type=None)
+                    if self.cache is not None:
+                        await asyncio.to_thread(self.cache.put, *cache_key, payload)
+                    return payload
+                try:
+                    body = await resp.json(content_type=None)
+                except Exception:
+                    body = (await resp.text())[:500]
+                err = _AsyncResponseError(resp.status, resp.reason, str(resp.url), body)
+            # 403: probar siguiente variante
+            last_err = err
+            if err.status_code == 403:
+                continue
+            raise err.to_error()
+
+        if last_err is not None:
+            raise last_err.to_error()
+        raise requests.HTTPError("Fallo de autenticación ESIOS desconocido")
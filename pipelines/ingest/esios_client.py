@@ -1,8 +1,113 @@
+import json
 import os
-import time
+import threading
 from typing import Any, Dict
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import ResponseCache
+from .ratelimit import RateLimiter, TokenBucket
+
+AUTH_MODES = ("both", "x-api-key", "authorization")
+
+# Variante de cabeceras que ha funcionado en este proceso (compartida entre instancias)
+_auth_mode_lock = threading.Lock()
+_winning_auth_mode: str | None = None
+
+
+def _auth_header_order(preferred: str, winner: str | None) -> list[str]:
+    if preferred == "x-api-key":
+        order = ["x-api-key", "authorization", "both"]
+    elif preferred == "authorization":
+        order = ["authorization", "x-api-key", "both"]
+    else:
+        order = ["both", "x-api-key", "authorization"]
+    if winner in order:
+        order.remove(winner)
+        order.insert(0, winner)
+    return order
+
+
+def load_auth_mode(path: str | None):
+    """Carga el modo de auth ganador persistido (si aún no hay uno en memoria)."""
+    global _winning_auth_mode
+    if _winning_auth_mode or not path:
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            mode = json.load(f).get("auth_mode")
+    except (OSError, ValueError):
+        return
+    if mode in AUTH_MODES:
+        with _auth_mode_lock:
+            _winning_auth_mode = _winning_auth_mode or mode
+
+
+def remember_auth_mode(mode: str, path: str | None = None):
+    global _winning_auth_mode
+    with _auth_mode_lock:
+        if _winning_auth_mode == mode:
+            return
+        _winning_auth_mode = mode
+    if not path:
+        return
+    try:
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"auth_mode": mode}, f)
+    except OSError:
+        pass  # best effort: la caché en disco es opcional
+
+
+def auth_header_order() -> list[str]:
+    # Modo de autenticación configurable: x-api-key | authorization | both (por defecto).
+    # Si ya hay una variante ganadora en este proceso se prueba primero.
+    preferred = (os.environ.get("ESIOS_AUTH_MODE", "both") or "both").lower()
+    return _auth_header_order(preferred, _winning_auth_mode)
+
+
+def indicator_params(
+    start_iso_utc: str, end_iso_utc: str, time_trunc: str | None = "hour"
+) -> Dict[str, str]:
+    params = {
+        "start_date": start_iso_utc,
+        "end_date": end_iso_utc,
+        "locale": "es",
+    }
+    if time_trunc:
+        params["time_trunc"] = time_trunc
+    return params
+
+
+def default_headers() -> Dict[str, str]:
+    return {
+        "Accept": "application/json, application/vnd.esios-api-v1+json",
+        "Accept-Encoding": "gzip, deflate",
+        "Content-Type": "application/json; charset=utf-8",
+        "User-Agent": "tfm-energy-ingest/1.0",
+        "Cache-Control": "no-cache",
+    }
+
+
+def _auth_headers(mode: str, api_key: str) -> Dict[str, str]:
+    headers = {}
+    if mode in ("x-api-key", "both"):
+        headers["x-api-key"] = api_key
+    if mode in ("authorization", "both"):
+        headers["Authorization"] = f"Token token={api_key}"
+    return headers
+
+
+def _http_error(resp) -> requests.HTTPError:
+    info = f"HTTP {resp.status_code} - {resp.reason}"
+    try:
+        body = resp.json()
+    except Exception:
+        body = resp.text[:500]
+    return requests.HTTPError(f"{info} | URL={resp.url} | Body={body}")
 
 
 class EsiosClient:
@@ -11,18 +116,42 @@ class EsiosClient:
         api_key: str | None = None,
         rate_limit_per_sec: float = 1.0,
         timeout_seconds: int = 30,
+        pool_size: int = 10,
+        auth_cache_path: str | None = None,
+        limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
     ):
         self.api_key = (api_key or os.environ.get("ESIOS_TOKEN", "")).strip()
         if not self.api_key:
             raise RuntimeError("ESIOS_TOKEN no configurado")
-        self.rate_interval = 1.0 / max(rate_limit_per_sec, 0.01)
         self.timeout = timeout_seconds
-        self._last_call = 0.0
+        # Presupuesto de llamadas/seg compartido por todos los hilos (y, con un
+        # backend compartido, por todos los procesos)
+        self.limiter = limiter or TokenBucket(rate_limit_per_sec)
+        # Caché opcional de respuestas de periodos cerrados (backfills / re-runs)
+        self.cache = cache
+        # Fichero opcional donde persistir el modo de auth ganador entre procesos
+        self.auth_cache_path = auth_cache_path or os.environ.get("ESIOS_AUTH_CACHE")
+        load_auth_mode(self.auth_cache_path)
+
+        # Sesión keep-alive: reutiliza conexiones TCP/TLS entre indicadores
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(default_headers())
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def _throttle(self):
-        elapsed = time.time() - self._last_call
-        if elapsed < self.rate_interval:
-            time.sleep(self.rate_interval - elapsed)
+        self.limiter.acquire()
 
     def get_indicator(
         self,
@@ -32,65 +161,43 @@ class EsiosClient:
         base_url: str,
         time_trunc: str | None = "hour",
     ) -> Dict[str, Any]:
-        self._throttle()
-        params = {
-            "start_date": start_iso_utc,
-            "end_date": end_iso_utc,
-            "locale": "es",
-        }
-        if time_trunc:
-            params["time_trunc"] = time_trunc
+        params = indicator_params(start_iso_utc, end_iso_utc, time_trunc)
+        cache_key = (indicator_id, start_iso_utc, end_iso_utc, time_trunc, params["locale"])
+        if self.cache is not None:
+            cached = self.cache.get(*cache_key)
+            if cached is not None:
+                return cached
         url = f"{base_url}/{indicator_id}"
 
-        # Modo de autenticación configurable: x-api-key | authorization | both (por defecto)
-        preferred = (os.environ.get("ESIOS_AUTH_MODE", "both") or "both").lower()
-        header_variants = []
-        if preferred == "x-api-key":
-            header_variants = ["x-api-key", "authorization", "both"]
-        elif preferred == "authorization":
-            header_variants = ["authorization", "x-api-key", "both"]
-        else:
-            header_variants = ["both", "x-api-key", "authorization"]
+        # Variantes de cabeceras a probar (la ganadora en este proceso primero)
+        header_variants = auth_header_order()
 
         last_err = None
         for mode in header_variants:
-            headers = {
-                "Accept": "application/json, application/vnd.esios-api-v1+json",
-                "Content-Type": "application/json; charset=utf-8",
-                "User-Agent": "tfm-energy-ingest/1.0",
-                "Cache-Control": "no-cache",
-            }
-            if mode in ("x-api-key", "both"):
-                headers["x-api-key"] = self.api_key
-            if mode in ("authorization", "both"):
-                headers["Authorization"] = f"Token token={self.api_key}"
-
-            resp = requests.get(
-                url, headers=headers, params=params, timeout=self.timeout
+            # Cada intento (incluidos fallbacks 403) consume presupuesto de rate limit
+            self._throttle()
+            resp = self.session.get(
+                url,
+                headers=_auth_headers(mode, self.api_key),
+                params=params,
+                timeout=self.timeout,
             )
-            self._last_call = time.time()
 
             if resp.ok:
-                return resp.json()
+                remember_auth_mode(mode, self.auth_cache_path)
+                payload = resp.json()
+                if self.cache is not None:
+                    self.cache.put(*cache_key, payload)
+                return payload
             # 403: probar siguiente variante
             last_err = resp
             if resp.status_code == 403:
                 continue
 
             # Otros códigos -> fallo inmediato con detalle
-            info = f"HTTP {resp.status_code} - {resp.reason}"
-            try:
-                body = resp.json()
-            except Exception:
-                body = resp.text[:500]
-            raise requests.HTTPError(f"{info} | URL={resp.url} | Body={body}")
+            raise _http_error(resp)
 
         # Si se agotaron variantes
         if last_err is not None:
-            info = f"HTTP {last_err.status_code} - {last_err.reason}"
-            try:
-                body = last_err.json()
-            except Exception:
-                body = last_err.text[:500]
-            raise requests.HTTPError(f"{info} | URL={last_err.url} | Body={body}")
+            raise _http_error(last_err)
         raise requests.HTTPError("Fallo de autenticación ESIOS desconocido")
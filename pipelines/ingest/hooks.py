@@ -1,5 +1,9 @@
+from datetime import date
+
 import pandas as pd
 
+from .calendar_index import expected_hours, local_day_ordinals
+
 ZONES = ["Península", "Baleares", "Canarias", "Ceuta", "Melilla"]
 
 
@@ -7,7 +11,8 @@ def compute_mix_pct(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
     ts_col = "minute_ts" if "minute_ts" in df.columns else "hour_ts"
-    totals = df.groupby([ts_col, "zone"], as_index=False)["mw"].sum()
+    # observed=True: con zone categórica, solo las combinaciones presentes
+    totals = df.groupby([ts_col, "zone"], as_index=False, observed=True)["mw"].sum()
     totals["mw_total"] = totals["mw"]
     totals.drop(columns=["mw"], inplace=True)
     out = df.merge(totals, on=[ts_col, "zone"], how="left")
@@ -22,13 +27,15 @@ def validate_pvpc_complete_day(df: pd.DataFrame) -> pd.DataFrame:
         warnings.warn("PVPC vacío")
         return df
     pvt = df.pivot_table(
-        index="hour_ts", columns="zone", values="price_eur_mwh", aggfunc="last"
+        index="hour_ts", columns="zone", values="price_eur_mwh", aggfunc="last", observed=True
     )
-    # Validación de horas: 24 salvo días de cambio DST (23/25)
-    if len(pvt.index) not in (23, 24, 25):
-        warnings.warn(
-            f"PVPC horas atípicas: {len(pvt.index)} (esperado 24, tolerado 23/25 en DST)"
-        )
+    # Validación de horas: las del día local según el calendario (23/25 en cambios DST)
+    ordinals = local_day_ordinals(pvt.index.to_series())
+    ordinals = ordinals[ordinals >= 0]
+    day = date.fromordinal(int(ordinals[0])) if len(ordinals) else None
+    expected_h = expected_hours(day) if day else 24
+    if len(pvt.index) != expected_h:
+        warnings.warn(f"PVPC horas atípicas: {len(pvt.index)} (esperado {expected_h} para {day})")
     # Validación de zonas: si solo trabajamos con 'Península', no avisar por otras zonas faltantes
     expected = (
         set(["Península"]) if set(pvt.columns) == set(["Península"]) else set(ZONES)
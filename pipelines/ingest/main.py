@@ -1,53 +1,117 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import importlib
 import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING
 
-import pandas as pd
-import yaml
-
-# Permitir ejecución tanto como módulo (-m) como script directo.
-try:  # relative (cuando se importa como pipelines.ingest.main)
-    from .esios_client import EsiosClient
-    from .hooks import compute_mix_pct, validate_pvpc_complete_day
-    from .normalize import (normalize_interconn_pairs, normalize_long_tech,
-                            normalize_prices, normalize_wide_by_indicator,
-                            parse_values_to_df)
-    from .utils import (dedupe, now_utc, resolve_window,
-                        write_parquet_partitioned, write_raw)
-except (
-    ImportError
-):  # fallback absoluto para ejecución directa: python pipelines/ingest/main.py
-    # Insertamos raíz del repo en sys.path si no está para que 'pipelines' sea resoluble
+# Permitir ejecución tanto como módulo (-m) como script directo: los submódulos
+# se cargan con _lazy (pipelines.ingest.*), basta con que la raíz esté en sys.path.
+if not __package__:  # python pipelines/ingest/main.py
     import os
     import sys
 
     repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
     if repo_root not in sys.path:
         sys.path.insert(0, repo_root)
-    from pipelines.ingest.esios_client import EsiosClient  # type: ignore
-    from pipelines.ingest.hooks import compute_mix_pct  # type: ignore
-    from pipelines.ingest.hooks import validate_pvpc_complete_day
-    from pipelines.ingest.normalize import (  # type: ignore
-        normalize_interconn_pairs, normalize_long_tech, normalize_prices,
-        normalize_wide_by_indicator, parse_values_to_df)
-    from pipelines.ingest.utils import now_utc  # type: ignore
-    from pipelines.ingest.utils import (dedupe, resolve_window,
-                                        write_parquet_partitioned, write_raw)
 
+if TYPE_CHECKING:  # solo anotaciones: clientes y pandas se importan bajo demanda
+    import pandas as pd
+
+    from pipelines.ingest.esios_async import AsyncEsiosClient
+    from pipelines.ingest.esios_client import EsiosClient
+
+# post_hook / validators registrados: nombre -> submódulo que lo define
 HOOKS = {
-    "compute_mix_pct": compute_mix_pct,
-    "validate_pvpc_complete_day": validate_pvpc_complete_day,
+    "compute_mix_pct": "hooks",
+    "validate_pvpc_complete_day": "hooks",
 }
 
 
+def _lazy(module: str):
+    """Submódulo de pipelines.ingest importado bajo demanda.
+
+    Los clientes HTTP (requests/aiohttp), los normalizadores y el registro de
+    esquemas (pyarrow) no se cargan al importar main: ``--help``, una ventana
+    vacía o ``compact``/``replay`` no pagan su coste de arranque.
+    """
+    return importlib.import_module(f"{__package__ or 'pipelines.ingest'}.{module}")
+
+
 def load_cfg(path="config/ingest.yaml"):
+    import yaml
+
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
 
+def build_client(cfg) -> EsiosClient:
+    defaults = cfg.get("defaults", {})
+    return _lazy("esios_client").EsiosClient(
+        rate_limit_per_sec=defaults.get("rate_limit_per_sec", 1),
+        timeout_seconds=defaults.get("timeout_seconds", 30),
+        pool_size=int(defaults.get("http_pool_size", 10)),
+        auth_cache_path=defaults.get("auth_cache_path"),
+        limiter=_lazy("ratelimit").build_limiter(defaults),
+        cache=_lazy("cache").build_cache(defaults),
+    )
+
+
+def build_async_client(cfg) -> AsyncEsiosClient:
+    defaults = cfg.get("defaults", {})
+    return _lazy("esios_async").AsyncEsiosClient(
+        rate_limit_per_sec=defaults.get("rate_limit_per_sec", 1),
+        timeout_seconds=defaults.get("timeout_seconds", 30),
+        pool_size=int(defaults.get("http_pool_size", 10)),
+        auth_cache_path=defaults.get("auth_cache_path"),
+        limiter=_lazy("ratelimit").build_limiter(defaults),
+        cache=_lazy("cache").build_cache(defaults),
+    )
+
+
+def parse_columns(cfg_defaults) -> list[str] | None:
+    """Campos del payload a decodificar: los de RAW más los que usa la normalización."""
+    keep = cfg_defaults.get("parse_columns") or cfg_defaults.get("raw_keep_columns")
+    if not keep:
+        return None
+    cols = [c for c in keep if c != "indicator_id"]
+    for c in ("datetime", "value", "geo_name"):
+        if c not in cols:
+            cols.append(c)
+    return cols
+
+
+def _fetch_indicator(
+    client: EsiosClient,
+    base_url: str,
+    ind,
+    start_iso,
+    end_iso,
+    cfg_defaults,
+    time_trunc: str | None = "hour",
+):
+    # Reintentos aislados por indicador (cada hilo lleva su propio contador)
+    last_err = None
+    for _ in range(int(cfg_defaults.get("retries", 3))):
+        try:
+            payload = client.get_indicator(
+                ind, start_iso, end_iso, base_url, time_trunc=time_trunc
+            )
+            df = _lazy("normalize").parse_values_to_df(payload, columns=parse_columns(cfg_defaults))
+            if not df.empty:
+                df["indicator_id"] = ind
+            return df
+        except Exception as e:
+            last_err = e
+            time.sleep(int(cfg_defaults.get("backoff_seconds", 2)))
+    raise last_err or RuntimeError(f"Fallo indicador {ind}")
+
+
 def fetch_dataset(
     client: EsiosClient,
     base_url: str,
@@ -56,48 +120,146 @@ def fetch_dataset(
     end_iso,
     cfg_defaults,
     time_trunc: str | None = "hour",
+    max_workers: int | None = None,
 ):
-    dfs_by_id = {}
-    for ind in indicator_ids:
-        last_err = None
-        for _ in range(int(cfg_defaults.get("retries", 3))):
-            try:
-                payload = client.get_indicator(
-                    ind, start_iso, end_iso, base_url, time_trunc=time_trunc
-                )
-                df = parse_values_to_df(payload)
-                if not df.empty:
-                    df["indicator_id"] = ind
-                dfs_by_id[ind] = df
-                break
-            except Exception as e:
-                last_err = e
-                import time
-
-                time.sleep(int(cfg_defaults.get("backoff_seconds", 2)))
-        if ind not in dfs_by_id:
-            raise last_err or RuntimeError(f"Fallo indicador {ind}")
-    return dfs_by_id
-
-
-def normalize_dataset(kind: str, dfs_by_id, ds_cfg):
+    """Descarga todos los indicadores en paralelo (pool acotado).
+
+    El rate limit global lo aplica el cliente (thread-safe); el dict resultante
+    conserva el orden de ``indicator_ids``.
+    """
+    workers = int(max_workers or cfg_defaults.get("fetch_workers", 4))
+    workers = max(1, min(workers, len(indicator_ids) or 1))
+    if workers == 1:
+        return {
+            ind: _fetch_indicator(
+                client, base_url, ind, start_iso, end_iso, cfg_defaults, time_trunc
+            )
+            for ind in indicator_ids
+        }
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            ind: pool.submit(
+                _fetch_indicator,
+                client,
+                base_url,
+                ind,
+                start_iso,
+                end_iso,
+                cfg_defaults,
+                time_trunc,
+            )
+            for ind in indicator_ids
+        }
+        return {ind: fut.result() for ind, fut in futures.items()}
+
+
+async def _afetch_indicator(
+    client: AsyncEsiosClient,
+    base_url: str,
+    ind,
+    start_iso,
+    end_iso,
+    cfg_defaults,
+    time_trunc: str | None = "hour",
+):
+    last_err = None
+    for _ in range(int(cfg_defaults.get("retries", 3))):
+        try:
+            payload = await client.get_indicator(
+                ind, start_iso, end_iso, base_url, time_trunc=time_trunc
+            )
+            df = _lazy("normalize").parse_values_to_df(payload, columns=parse_columns(cfg_defaults))
+            if not df.empty:
+                df["indicator_id"] = ind
+            return df
+        except Exception as e:
+            last_err = e
+            await asyncio.sleep(int(cfg_defaults.get("backoff_seconds", 2)))
+    raise last_err or RuntimeError(f"Fallo indicador {ind}")
+
+
+async def afetch_dataset(
+    client: AsyncEsiosClient,
+    base_url: str,
+    indicator_ids,
+    start_iso,
+    end_iso,
+    cfg_defaults,
+    time_trunc: str | None = "hour",
+):
+    """Versión asíncrona de ``fetch_dataset`` (mismo contrato ``dfs_by_id``)."""
+    dfs = await asyncio.gather(
+        *[
+            _afetch_indicator(
+                client, base_url, ind, start_iso, end_iso, cfg_defaults, time_trunc
+            )
+            for ind in indicator_ids
+        ]
+    )
+    return dict(zip(indicator_ids, dfs))
+
+
+async def afetch_datasets(
+    client: AsyncEsiosClient, base_url: str, jobs, cfg_defaults, return_exceptions: bool = False
+):
+    """Descarga varios datasets en un único event loop.
+
+    ``jobs``: {dataset: (indicator_ids, start_iso, end_iso, time_trunc)}.
+    Devuelve {dataset: dfs_by_id}; todas las peticiones comparten el rate limit
+    del cliente. Con ``return_exceptions`` el fallo de un dataset queda como
+    excepción en su entrada sin cancelar los demás.
+    """
+    names = list(jobs)
+    results = await asyncio.gather(
+        *[
+            afetch_dataset(client, base_url, ids, s_iso, e_iso, cfg_defaults, tt)
+            for ids, s_iso, e_iso, tt in (jobs[n] for n in names)
+        ],
+        return_exceptions=return_exceptions,
+    )
+    return dict(zip(names, results))
+
+
+def prefetch_datasets(cfg, jobs) -> dict:
+    """Descarga asíncrona (``defaults.async_fetch``) de las ventanas de varios datasets."""
+
+    async def _run():
+        async with build_async_client(cfg) as client:
+            return await afetch_datasets(
+                client, cfg["defaults"]["base_url"], jobs, cfg["defaults"], return_exceptions=True
+            )
+
+    return asyncio.run(_run())
+
+
+def normalize_dataset(kind: str, dfs_by_id, ds_cfg, categorical=None):
     ncfg = ds_cfg.get("normalize", {})
+    engine = ncfg.get("engine", "pandas")
+    if engine == "arrow":
+        return _lazy("normalize_arrow").normalize_dataset_arrow(
+            kind, dfs_by_id, ncfg, categorical=categorical
+        )
+    if engine != "pandas":
+        raise ValueError(f"normalize.engine no soportado: {engine}")
+    import pandas as pd
+
+    normalize = _lazy("normalize")
     if kind == "prices":
         frames = []
         for ind, df in dfs_by_id.items():
             source = ncfg.get("column_map", {}).get("source", f"ID_{ind}")
-            frames.append(normalize_prices(df, ncfg.get("column_map", {}), source))
+            frames.append(normalize.normalize_prices(df, ncfg.get("column_map", {}), source))
         return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
     if kind == "wide_by_indicator":
-        return normalize_wide_by_indicator(
+        return normalize.normalize_wide_by_indicator(
             dfs_by_id, ncfg.get("column_map", {}), ncfg.get("id_rename")
         )
     if kind == "long_tech":
-        return normalize_long_tech(
+        return normalize.normalize_long_tech(
             dfs_by_id, ncfg.get("tech_map", {}), ncfg.get("column_map", {})
         )
     if kind == "interconn_pairs":
-        return normalize_interconn_pairs(
+        return normalize.normalize_interconn_pairs(
             dfs_by_id, ncfg.get("to_pairs", {}), ncfg.get("column_map", {})
         )
     raise ValueError(f"kind no soportado: {kind}")
@@ -107,19 +269,17 @@ def apply_post(ds_cfg, df):
     post = ds_cfg.get("normalize", {}).get("post_hook")
     if not post:
         return df
-    fn = HOOKS.get(post)
-    if not fn:
+    if post not in HOOKS:
         raise ValueError(f"post_hook '{post}' no registrado")
-    return fn(df)
+    return getattr(_lazy(HOOKS[post]), post)(df)
 
 
 def apply_validators(ds_cfg, df):
     validators = ds_cfg.get("normalize", {}).get("validators", [])
     for v in validators:
-        fn = HOOKS.get(v)
-        if not fn:
+        if v not in HOOKS:
             raise ValueError(f"validator '{v}' no registrado")
-        df = fn(df)
+        df = getattr(_lazy(HOOKS[v]), v)(df)
     return df
 
 
@@ -129,9 +289,480 @@ def _log(level: str, run_id: str, **fields):
     print(json.dumps(rec))
 
 
+def output_targets(cfg, local: bool = False):
+    """Devuelve (raw_tpl, curated_tpl, bucket_root, io_mode) según modo local/GCS."""
+    if local:
+        paths_local = cfg.get("paths_local", {})
+        raw_tpl = paths_local.get("raw")
+        curated_tpl = paths_local.get("curated")
+        if not raw_tpl or not curated_tpl:
+            raise SystemExit(
+                "paths_local.raw/curated no definido en config/ingest.yaml"
+            )
+        return raw_tpl, curated_tpl, {"root": paths_local.get("root", "./data")}, "local"
+    paths = cfg["paths"]
+    return paths["raw"], paths["curated"], {"bucket": paths["bucket"]}, "gcs"
+
+
+def build_raw_df(dfs_by_id, cfg) -> pd.DataFrame:
+    import pandas as pd
+
+    raw_df = (
+        pd.concat([v for v in dfs_by_id.values()], ignore_index=True)
+        if dfs_by_id
+        else pd.DataFrame()
+    )
+    # Aplica trimming de columnas RAW si está configurado (para evitar duplicados de timestamps)
+    keep_cols = cfg.get("defaults", {}).get("raw_keep_columns")
+    if keep_cols and not raw_df.empty:
+        cols = [c for c in keep_cols if c in raw_df.columns]
+        if cols:
+            raw_df = raw_df[cols]
+    return raw_df
+
+
+def curate_frame(ds, dfs_by_id, dtypes: dict | None = None) -> pd.DataFrame:
+    kind = ds.get("normalize", {}).get("kind")
+    categorical = (dtypes or {}).get("categorical")
+    curated_df = normalize_dataset(kind, dfs_by_id, ds, categorical=categorical)
+    # Tipos compactos antes del post_hook (opera ya sobre category/float32) y de
+    # nuevo después para las columnas que añade (p.ej. pct, mw_total)
+    utils = _lazy("utils")
+    curated_df = utils.apply_curated_dtypes(curated_df, dtypes)
+    return utils.apply_curated_dtypes(apply_post(ds, curated_df), dtypes)
+
+
+def filter_local_day(curated_df: pd.DataFrame, target_day: date) -> pd.DataFrame:
+    # Filtra solo el día objetivo (local) para evitar arrastres
+    for ts_col in ("hour_ts", "minute_ts"):
+        if ts_col in curated_df.columns:
+            return curated_df[_lazy("calendar_index").local_day_mask(curated_df[ts_col], target_day)]
+    return curated_df
+
+
+def finalize_day(dataset: str, ds, curated_df: pd.DataFrame) -> pd.DataFrame:
+    """Ajustes de precios, dedupe y validadores sobre el curated de un día."""
+    import pandas as pd
+
+    # Asegura columnas para deduplicado y partición en precios
+    if dataset in ["prices_pvpc", "prices_pvpc_tomorrow", "prices_spot"]:
+        curated_df = curated_df.copy()
+        if "hour_ts" not in curated_df.columns and "datetime" in curated_df.columns:
+            curated_df["hour_ts"] = (
+                pd.to_datetime(curated_df["datetime"], utc=True, errors="coerce")
+                .dt.tz_convert("Europe/Madrid")
+                .dt.floor("h")
+            )
+        if "zone" not in curated_df.columns and "geo_name" in curated_df.columns:
+            curated_df["zone"] = curated_df["geo_name"]
+        # Elimina cualquier columna con nombre de indicador y asegura solo 'source'
+        for col in list(curated_df.columns):
+            if col not in [
+                "hour_ts",
+                "price_eur_mwh",
+                "zone",
+                "source",
+                "indicator_id",
+            ]:
+                if col.upper() in ["PVPC", "SPOT_ES"]:
+                    curated_df.drop(columns=[col], inplace=True)
+        # Asegura que indicator_id esté presente
+        if "indicator_id" not in curated_df.columns:
+            curated_df["indicator_id"] = (
+                ds["indicator_ids"][0] if "indicator_ids" in ds else "unknown"
+            )
+    curated_df = _lazy("utils").dedupe(curated_df, ds.get("dedupe_key", []))
+    return apply_validators(ds, curated_df)
+
+
+def write_outputs_raw(raw_df, cfg, dataset: str, local: bool = False) -> str:
+    raw_tpl, _curated_tpl, bucket_root, io_mode = output_targets(cfg, local)
+    utils = _lazy("utils")
+    return utils.write_raw(
+        raw_df,
+        raw_tpl,
+        dataset=dataset,
+        run_ts=utils.now_utc(),
+        bucket_root=bucket_root,
+        io_mode=io_mode,
+        raw_format=cfg.get("defaults", {}).get("raw_format", "csv"),
+    )
+
+
+def curated_write_mode(cfg, ds) -> str:
+    return ds.get("curated_write_mode") or cfg.get("defaults", {}).get("curated_write_mode", "append")
+
+
+def write_outputs_curated(
+    curated_df,
+    cfg,
+    ds,
+    target_day: date,
+    local: bool = False,
+    dataset: str | None = None,
+    mode: str | None = None,
+) -> str:
+    _raw_tpl, curated_tpl, bucket_root, io_mode = output_targets(cfg, local)
+    utils = _lazy("utils")
+    return utils.write_parquet_partitioned(
+        utils.to_storage_frame(curated_df, utils.curated_dtypes(cfg, ds)),
+        curated_tpl,
+        ds["curated_table"],
+        target_day,
+        bucket_root,
+        io_mode=io_mode,
+        schema=_lazy("schemas").table_schema(cfg, ds["curated_table"]),
+        mode=mode or curated_write_mode(cfg, ds),
+        dedupe_key=ds.get("dedupe_key", []),
+        # Un fichero por dataset y día: PVPC y SPOT comparten tabla sin pisarse
+        file_id=f"merged-{dataset}" if dataset else "merged",
+        catalog=_lazy("catalog").catalog_enabled(cfg),
+    )
+
+
+def run_backfill_range(
+    client: EsiosClient,
+    cfg,
+    dataset: str,
+    start_d: date,
+    end_d: date,
+    local: bool = False,
+    run_id: str | None = None,
+):
+    """Backfill por días completos usando ventanas multi-día (ver planner).
+
+    Cada chunk se descarga con una petición por indicador, se normaliza una vez
+    y se divide por día local para escribir las mismas particiones diarias.
+    Devuelve las estadísticas agregadas.
+    """
+    utils = _lazy("utils")
+    run_id = run_id or str(uuid.uuid4())
+    ds = cfg["datasets"][dataset]
+    granularity = ds.get("granularity", "hour")
+    # time_trunc: minuto para demand/gen/interconn, hora para precios
+    time_trunc = "minute" if granularity == "minute" else "hour"
+    chunks = _lazy("planner").plan_backfill(
+        start_d, end_d, granularity, cfg.get("defaults", {}).get("backfill_planner")
+    )
+    stats = {"days": 0, "chunks": 0, "api_calls": 0, "raw_rows": 0, "curated_rows": 0}
+    for chunk in chunks:
+        t_start = datetime.now(timezone.utc)
+        dfs_by_id = fetch_dataset(
+            client,
+            cfg["defaults"]["base_url"],
+            ds["indicator_ids"],
+            utils.iso_z(chunk.start_utc),
+            utils.iso_z(chunk.end_utc),
+            cfg["defaults"],
+            time_trunc=time_trunc,
+        )
+        raw_df = build_raw_df(dfs_by_id, cfg)
+        raw_path = write_outputs_raw(raw_df, cfg, dataset, local)
+        _log(
+            "info",
+            run_id,
+            action="raw_written",
+            dataset=dataset,
+            date_from=str(chunk.first_day),
+            date_to=str(chunk.last_day),
+            rows=len(raw_df),
+            path=raw_path,
+        )
+
+        curated_all = curate_frame(ds, dfs_by_id, utils.curated_dtypes(cfg, ds))
+        ts_col = "hour_ts" if "hour_ts" in curated_all.columns else "minute_ts"
+        by_day = dict(utils.split_by_local_day(curated_all, ts_col))
+        day = chunk.first_day
+        while day <= chunk.last_day:
+            day_df = by_day.get(day, curated_all.iloc[0:0])
+            curated_df = finalize_day(dataset, ds, day_df)
+            curated_path = write_outputs_curated(curated_df, cfg, ds, day, local, dataset)
+            _log(
+                "info",
+                run_id,
+                action="curated_written",
+                dataset=dataset,
+                date=str(day),
+                rows=len(curated_df),
+                path=curated_path,
+            )
+            stats["days"] += 1
+            stats["curated_rows"] += len(curated_df)
+            day += timedelta(days=1)
+
+        stats["chunks"] += 1
+        stats["api_calls"] += len(ds["indicator_ids"])
+        stats["raw_rows"] += len(raw_df)
+        _log(
+            "info",
+            run_id,
+            action="chunk_summary",
+            dataset=dataset,
+            date_from=str(chunk.first_day),
+            date_to=str(chunk.last_day),
+            days=chunk.days,
+            raw_rows=len(raw_df),
+            seconds=round((datetime.now(timezone.utc) - t_start).total_seconds(), 2),
+        )
+    return stats
+
+
+def dataset_time_trunc(ds: dict) -> str:
+    return "minute" if ds.get("granularity") == "minute" else "hour"
+
+
+def plan_window(
+    dataset: str,
+    window=None,
+    *,
+    cfg,
+    local: bool = False,
+    target_date: date | None = None,
+):
+    """Ventana de un dataset: ``(start_dt, end_dt, target_day, watermarks)``.
+
+    ``watermarks`` es el ``WatermarkStore`` cargado cuando la ventana es
+    incremental (estrategia ``watermark``) y None en otro caso.
+    """
+    ds = cfg["datasets"][dataset]
+    if isinstance(window, tuple):
+        return (*window, None)
+    utils = _lazy("utils")
+    strategy = window or ds.get("window_strategy", {"type": "last_hours", "hours": 6})
+    watermarks = None
+    watermark = None
+    if strategy.get("type") == "watermark":
+        wm = _lazy("watermark")
+        watermarks = wm.WatermarkStore(wm.watermark_path(cfg, dataset, local), dataset)
+        watermarks.load()
+        # Marcas más antiguas que stale_hours (por defecto max_hours) no fijan la ventana
+        stale_hours = strategy.get("stale_hours", strategy.get("max_hours"))
+        stale_before = utils.now_utc() - timedelta(hours=float(stale_hours)) if stale_hours else None
+        watermark = watermarks.window_start(ds["indicator_ids"], stale_before=stale_before)
+    start_dt, end_dt, target_day = utils.resolve_window(
+        strategy, target_date=target_date, watermark=watermark
+    )
+    return start_dt, end_dt, target_day, watermarks
+
+
+def run_ingest(
+    dataset: str,
+    window=None,
+    io_mode: str = "gcs",
+    *,
+    cfg=None,
+    client: EsiosClient | None = None,
+    target_date: date | None = None,
+    run_id: str | None = None,
+    plan: tuple | None = None,
+    dfs_by_id: dict | None = None,
+) -> dict:
+    """Ingesta de una ventana de un dataset: ESIOS -> RAW -> curated.
+
+    ``window``: None (``window_strategy`` del dataset, con marca de agua si
+    aplica), una estrategia de ``resolve_window`` o una tupla
+    ``(start_utc, end_utc, target_day)``. ``io_mode``: ``"gcs"`` | ``"local"``.
+    ``cfg`` y ``client`` se comparten entre datasets del mismo proceso.
+    ``plan`` (de ``plan_window``) y ``dfs_by_id`` permiten pasar una ventana
+    ya descargada (fetch asíncrono de ``run_datasets``).
+    Devuelve las estadísticas del run.
+    """
+    if io_mode not in ("gcs", "local"):
+        raise ValueError(f"io_mode no soportado: {io_mode}")
+    local = io_mode == "local"
+    cfg = cfg or load_cfg()
+    run_id = run_id or str(uuid.uuid4())
+    t_start = datetime.now(timezone.utc)
+    ds = cfg["datasets"][dataset]
+    stats = {"dataset": dataset, "status": "ok", "raw_rows": 0, "curated_rows": 0}
+
+    start_dt, end_dt, target_day, watermarks = plan or plan_window(
+        dataset, window, cfg=cfg, local=local, target_date=target_date
+    )
+    utils = _lazy("utils")
+    start_iso = utils.iso_z(start_dt)
+    end_iso = utils.iso_z(end_dt)
+    if end_dt <= start_dt:
+        _log(
+            "info",
+            run_id,
+            action="window_empty",
+            dataset=dataset,
+            start=start_iso,
+            end=end_iso,
+        )
+        stats["status"] = "window_empty"
+        return stats
+
+    output_targets(cfg, local)
+    if dfs_by_id is None:
+        client = client or build_client(cfg)
+        dfs_by_id = fetch_dataset(
+            client,
+            cfg["defaults"]["base_url"],
+            ds["indicator_ids"],
+            start_iso,
+            end_iso,
+            cfg["defaults"],
+            time_trunc=dataset_time_trunc(ds),
+        )
+
+    raw_df = build_raw_df(dfs_by_id, cfg)
+    raw_path = write_outputs_raw(raw_df, cfg, dataset, local)
+    stats["raw_rows"] = len(raw_df)
+    _log(
+        "info",
+        run_id,
+        action="raw_written",
+        dataset=dataset,
+        rows=len(raw_df),
+        path=raw_path,
+    )
+
+    curated_df = curate_frame(ds, dfs_by_id, utils.curated_dtypes(cfg, ds))
+    if watermarks is not None:
+        # Ventana incremental: puede abarcar varios días locales (recuperación
+        # tras ejecuciones perdidas), se escribe una partición por día
+        ts_col = "hour_ts" if "hour_ts" in curated_df.columns else "minute_ts"
+        for day, day_df in utils.split_by_local_day(curated_df, ts_col):
+            day_df = finalize_day(dataset, ds, day_df)
+            curated_path = write_outputs_curated(day_df, cfg, ds, day, local, dataset)
+            stats["curated_rows"] += len(day_df)
+            _log(
+                "info",
+                run_id,
+                action="curated_written",
+                dataset=dataset,
+                date=str(day),
+                rows=len(day_df),
+                path=curated_path,
+            )
+        marks = watermarks.advance(dfs_by_id)
+        _log(
+            "info",
+            run_id,
+            action="watermark_advanced",
+            dataset=dataset,
+            watermark=utils.iso_z(min(marks.values())) if marks else None,
+        )
+    else:
+        # Filtrado por día objetivo también para granularidad minuto
+        curated_df = filter_local_day(curated_df, target_day)
+        curated_df = finalize_day(dataset, ds, curated_df)
+
+        curated_path = write_outputs_curated(curated_df, cfg, ds, target_day, local, dataset)
+        stats["curated_rows"] = len(curated_df)
+        _log(
+            "info",
+            run_id,
+            action="curated_written",
+            dataset=dataset,
+            rows=len(curated_df),
+            path=curated_path,
+        )
+    stats["duration_seconds"] = round((datetime.now(timezone.utc) - t_start).total_seconds(), 2)
+    _log(
+        "info",
+        run_id,
+        action="run_summary",
+        dataset=dataset,
+        raw_rows=stats["raw_rows"],
+        curated_rows=stats["curated_rows"],
+        duration_seconds=stats["duration_seconds"],
+    )
+    return stats
+
+
+def schedule_datasets(cfg, schedule_ref: str | None = None) -> list[str]:
+    """Datasets habilitados (todos o los de un ``schedule_ref``) en orden de config."""
+    if schedule_ref is not None and schedule_ref not in cfg.get("schedules", {}):
+        raise ValueError(f"Schedule no definido en config: {schedule_ref}")
+    return [
+        name
+        for name, ds in cfg.get("datasets", {}).items()
+        if ds.get("enabled", True)
+        and (schedule_ref is None or ds.get("schedule_ref") == schedule_ref)
+    ]
+
+
+def run_datasets(
+    datasets: list[str],
+    io_mode: str = "gcs",
+    *,
+    cfg=None,
+    client: EsiosClient | None = None,
+    target_date: date | None = None,
+    run_id: str | None = None,
+) -> list[dict]:
+    """Ingesta secuencial de varios datasets en un único proceso.
+
+    Comparte config, cliente HTTP (sesión keep-alive, limitador y caché) y los
+    filesystems fsspec (cacheados por instancia). Un dataset que falla no
+    detiene al resto: queda con ``status="error"``.
+
+    Con ``defaults.async_fetch`` las ventanas de todos los datasets se
+    descargan a la vez en un único event loop (``AsyncEsiosClient``) y después
+    se escriben en orden.
+    """
+    cfg = cfg or load_cfg()
+    run_id = run_id or str(uuid.uuid4())
+    local = io_mode == "local"
+    output_targets(cfg, local)
+    plans: dict = {}
+    prefetched: dict = {}
+    if cfg.get("defaults", {}).get("async_fetch") and client is None:
+        jobs = {}
+        for name in datasets:
+            try:
+                plans[name] = plan_window(name, cfg=cfg, local=local, target_date=target_date)
+            except Exception:
+                continue  # run_ingest lo vuelve a intentar y registra el error
+            start_dt, end_dt = plans[name][:2]
+            if end_dt > start_dt:
+                ds = cfg["datasets"][name]
+                iso_z = _lazy("utils").iso_z
+                jobs[name] = (ds["indicator_ids"], iso_z(start_dt), iso_z(end_dt), dataset_time_trunc(ds))
+        if jobs:
+            prefetched = prefetch_datasets(cfg, jobs)
+    results = []
+    for name in datasets:
+        try:
+            dfs_by_id = prefetched.get(name)
+            if isinstance(dfs_by_id, Exception):
+                raise dfs_by_id
+            if name not in prefetched and client is None:
+                client = build_client(cfg)
+            results.append(
+                run_ingest(
+                    name,
+                    None,
+                    io_mode,
+                    cfg=cfg,
+                    client=client,
+                    target_date=target_date,
+                    run_id=run_id,
+                    plan=plans.get(name),
+                    dfs_by_id=dfs_by_id,
+                )
+            )
+        except Exception as e:
+            _log("error", run_id, action="dataset_failed", dataset=name, error=repr(e))
+            results.append({"dataset": name, "status": "error", "error": repr(e)})
+    return results
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("dataset", help="Nombre del dataset en config/ingest.yaml")
+    parser.add_argument("dataset", nargs="?", help="Nombre del dataset en config/ingest.yaml")
+    parser.add_argument(
+        "--schedule",
+        help="Ejecuta en un solo proceso todos los datasets con ese schedule_ref",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Ejecuta en un solo proceso todos los datasets habilitados",
+    )
     parser.add_argument("--target-date", help="YYYY-MM-DD (solo para *_dstsafe)")
     parser.add_argument(
         "--local",
@@ -146,9 +777,59 @@ if __name__ == "__main__":
         "--backfill-range",
         help="Rango START:END (YYYY-MM-DD:YYYY-MM-DD) para backfill por días completos (inclusive)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Procesos para --backfill-range (por defecto defaults.backfill_workers)",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignora el checkpoint de --backfill-range y reprocesa todos los días",
+    )
     args = parser.parse_args()
+    if sum([bool(args.dataset), bool(args.schedule), args.all]) != 1:
+        parser.error("indica un dataset, --schedule <schedule_ref> o --all")
+    if (args.schedule or args.all) and (args.backfill_day or args.backfill_range):
+        parser.error("--backfill-day/--backfill-range requieren un dataset concreto")
 
     cfg = load_cfg()
+    io_mode = "local" if args.local else "gcs"
+    run_id = str(uuid.uuid4())
+    t_global_start = datetime.now(timezone.utc)
+
+    # Varios datasets en un único proceso (cfg, cliente HTTP y fsspec compartidos)
+    if args.schedule or args.all:
+        try:
+            names = schedule_datasets(cfg, args.schedule)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        _log(
+            "info",
+            run_id,
+            action="run_start",
+            mode="schedule" if args.schedule else "all",
+            schedule=args.schedule,
+            datasets=names,
+        )
+        td = date.fromisoformat(args.target_date) if args.target_date else None
+        results = run_datasets(names, io_mode, cfg=cfg, target_date=td, run_id=run_id)
+        failed = [r["dataset"] for r in results if r["status"] == "error"]
+        _log(
+            "info" if not failed else "error",
+            run_id,
+            action="multi_run_summary",
+            schedule=args.schedule,
+            datasets=len(results),
+            failed=failed,
+            raw_rows=sum(r.get("raw_rows", 0) for r in results),
+            curated_rows=sum(r.get("curated_rows", 0) for r in results),
+            duration_seconds=round(
+                (datetime.now(timezone.utc) - t_global_start).total_seconds(), 2
+            ),
+        )
+        raise SystemExit(1 if failed else 0)
+
     ds = cfg["datasets"].get(args.dataset)
     if not ds or not ds.get("enabled", True):
         available = ", ".join(
@@ -164,8 +845,6 @@ if __name__ == "__main__":
             f"Dataset '{args.dataset}' no existe o está deshabilitado. Disponibles: {available}"
         )
 
-    run_id = str(uuid.uuid4())
-    t_global_start = datetime.now(timezone.utc)
     _log(
         "info",
         run_id,
@@ -178,7 +857,7 @@ if __name__ == "__main__":
         ),
     )
 
-    # Modo backfill por rango: iterar días completos
+    # Modo backfill por rango: ventanas multi-día divididas por día local
     if args.backfill_range:
         try:
             start_s, end_s = [s.strip() for s in args.backfill_range.split(":", 1)]
@@ -192,341 +871,45 @@ if __name__ == "__main__":
         if end_d < start_d:
             raise SystemExit("--backfill-range END debe ser >= START")
 
-        # Crear cliente y preparar plantillas de salida según modo
-        client = EsiosClient(
-            rate_limit_per_sec=cfg["defaults"].get("rate_limit_per_sec", 1),
-            timeout_seconds=cfg["defaults"].get("timeout_seconds", 30),
+        from pipelines.ingest.backfill import run_backfill_parallel
+
+        output_targets(cfg, args.local)  # valida plantillas antes de llamar a la API
+        workers = args.workers or int(cfg["defaults"].get("backfill_workers", 1))
+        stats = run_backfill_parallel(
+            cfg,
+            args.dataset,
+            start_d,
+            end_d,
+            local=args.local,
+            workers=workers,
+            resume=not args.no_resume,
+            run_id=run_id,
         )
-        local_root = cfg.get("paths_local", {}).get("root", "./data")
-        raw_tpl = cfg.get("paths_local", {}).get("raw") if args.local else None
-        curated_tpl = cfg.get("paths_local", {}).get("curated") if args.local else None
-        if args.local and (not raw_tpl or not curated_tpl):
-            raise SystemExit(
-                "paths_local.raw/curated no definido en config/ingest.yaml"
-            )
-        if args.local:
-            assert isinstance(raw_tpl, str) and isinstance(curated_tpl, str)
-
-        agg_days = 0
-        agg_raw_rows = 0
-        agg_cur_rows = 0
-        current = start_d
-        while current <= end_d:
-            t_start = datetime.now(timezone.utc)
-            start_dt, end_dt, target_day = resolve_window(
-                {"type": "today_dstsafe"}, target_date=current
-            )
-            start_iso = start_dt.isoformat().replace("+00:00", "Z")
-            end_iso = end_dt.isoformat().replace("+00:00", "Z")
-
-            # time_trunc: minuto para demand/gen/interconn, hora para precios
-            time_trunc = "minute" if ds.get("granularity") == "minute" else "hour"
-            dfs_by_id = fetch_dataset(
-                client,
-                cfg["defaults"]["base_url"],
-                ds["indicator_ids"],
-                start_iso,
-                end_iso,
-                cfg["defaults"],
-                time_trunc=time_trunc,
-            )
-            raw_df = (
-                pd.concat([v for v in dfs_by_id.values()], ignore_index=True)
-                if dfs_by_id
-                else pd.DataFrame()
-            )
-            keep_cols = cfg.get("defaults", {}).get("raw_keep_columns")
-            if keep_cols and not raw_df.empty:
-                cols = [c for c in keep_cols if c in raw_df.columns]
-                if cols:
-                    raw_df = raw_df[cols]
-            if args.local:
-                assert isinstance(raw_tpl, str)
-                raw_path = write_raw(
-                    raw_df,
-                    raw_tpl,
-                    dataset=args.dataset,
-                    run_ts=now_utc(),
-                    bucket_root={"root": local_root},
-                    io_mode="local",
-                )
-            else:
-                raw_path = write_raw(
-                    raw_df,
-                    cfg["paths"]["raw"],
-                    dataset=args.dataset,
-                    run_ts=now_utc(),
-                    bucket_root={"bucket": cfg["paths"]["bucket"]},
-                )
-            raw_rows = len(raw_df)
-            _log(
-                "info",
-                run_id,
-                action="raw_written",
-                dataset=args.dataset,
-                date=str(target_day),
-                rows=raw_rows,
-                path=raw_path,
-            )
-
-            kind = ds.get("normalize", {}).get("kind")
-            curated_df = normalize_dataset(kind, dfs_by_id, ds)
-            curated_df = apply_post(ds, curated_df)
-            # Filtra solo el día objetivo (local) para evitar arrastres
-            if "hour_ts" in curated_df.columns:
-                curated_df = curated_df[
-                    (curated_df["hour_ts"].dt.tz_localize(None).dt.date == target_day)
-                    | (curated_df["hour_ts"].dt.date == target_day)
-                ]
-            elif "minute_ts" in curated_df.columns:
-                curated_df = curated_df[
-                    (curated_df["minute_ts"].dt.tz_localize(None).dt.date == target_day)
-                    | (curated_df["minute_ts"].dt.date == target_day)
-                ]
-            if args.dataset in ["prices_pvpc", "prices_pvpc_tomorrow", "prices_spot"]:
-                if (
-                    "hour_ts" not in curated_df.columns
-                    and "datetime" in curated_df.columns
-                ):
-                    curated_df["hour_ts"] = pd.to_datetime(
-                        curated_df["datetime"], utc=True, errors="coerce"
-                    ).dt.floor("h")
-                if (
-                    "zone" not in curated_df.columns
-                    and "geo_name" in curated_df.columns
-                ):
-                    curated_df["zone"] = curated_df["geo_name"]
-                for col in curated_df.columns:
-                    if col not in [
-                        "hour_ts",
-                        "price_eur_mwh",
-                        "zone",
-                        "source",
-                        "indicator_id",
-                    ]:
-                        if col.upper() in ["PVPC", "SPOT_ES"]:
-                            curated_df.drop(columns=[col], inplace=True)
-                if "indicator_id" not in curated_df.columns:
-                    curated_df["indicator_id"] = (
-                        ds["indicator_ids"][0] if "indicator_ids" in ds else "unknown"
-                    )
-            curated_df = dedupe(curated_df, ds.get("dedupe_key", []))
-            curated_df = apply_validators(ds, curated_df)
-
-            if args.local:
-                assert isinstance(curated_tpl, str)
-                curated_path = write_parquet_partitioned(
-                    curated_df,
-                    curated_tpl,
-                    ds["curated_table"],
-                    target_day,
-                    {"root": local_root},
-                    io_mode="local",
-                )
-            else:
-                curated_path = write_parquet_partitioned(
-                    curated_df,
-                    cfg["paths"]["curated"],
-                    ds["curated_table"],
-                    target_day,
-                    {"bucket": cfg["paths"]["bucket"]},
-                )
-            cur_rows = len(curated_df)
-            _log(
-                "info",
-                run_id,
-                action="curated_written",
-                dataset=args.dataset,
-                date=str(target_day),
-                rows=cur_rows,
-                path=curated_path,
-            )
-            agg_days += 1
-            agg_raw_rows += raw_rows
-            agg_cur_rows += cur_rows
-            _log(
-                "info",
-                run_id,
-                action="day_summary",
-                dataset=args.dataset,
-                date=str(target_day),
-                raw_rows=raw_rows,
-                curated_rows=cur_rows,
-                seconds=round(
-                    (datetime.now(timezone.utc) - t_start).total_seconds(), 2
-                ),
-            )
-
-            current = current + timedelta(days=1)
         _log(
-            "info",
+            "info" if not stats["failed_shards"] else "error",
             run_id,
             action="backfill_range_summary",
             dataset=args.dataset,
-            days=agg_days,
-            raw_rows=agg_raw_rows,
-            curated_rows=agg_cur_rows,
+            days=stats["days"],
+            skipped_days=stats["skipped_days"],
+            chunks=stats["chunks"],
+            failed_shards=stats["failed_shards"],
+            workers=workers,
+            api_calls=stats["api_calls"],
+            raw_rows=stats["raw_rows"],
+            curated_rows=stats["curated_rows"],
             duration_seconds=round(
                 (datetime.now(timezone.utc) - t_global_start).total_seconds(), 2
             ),
         )
-        raise SystemExit(0)
+        raise SystemExit(1 if stats["failed_shards"] else 0)
 
     # Ventana normal (o --backfill-day)
-    backfill_td = date.fromisoformat(args.backfill_day) if args.backfill_day else None
-    if backfill_td is not None:
-        start_dt, end_dt, target_day = resolve_window(
-            {"type": "today_dstsafe"}, target_date=backfill_td
-        )
+    if args.backfill_day:
+        window, td = {"type": "today_dstsafe"}, date.fromisoformat(args.backfill_day)
     else:
+        window = None
         td = date.fromisoformat(args.target_date) if args.target_date else None
-        start_dt, end_dt, target_day = resolve_window(
-            ds.get("window_strategy", {"type": "last_hours", "hours": 6}),
-            target_date=td,
-        )
-    start_iso = start_dt.isoformat().replace("+00:00", "Z")
-    end_iso = end_dt.isoformat().replace("+00:00", "Z")
-
-    client = EsiosClient(
-        rate_limit_per_sec=cfg["defaults"].get("rate_limit_per_sec", 1),
-        timeout_seconds=cfg["defaults"].get("timeout_seconds", 30),
-    )
-
-    time_trunc = "minute" if ds.get("granularity") == "minute" else "hour"
-    dfs_by_id = fetch_dataset(
-        client,
-        cfg["defaults"]["base_url"],
-        ds["indicator_ids"],
-        start_iso,
-        end_iso,
-        cfg["defaults"],
-        time_trunc=time_trunc,
-    )
-
-    raw_df = (
-        pd.concat([v for v in dfs_by_id.values()], ignore_index=True)
-        if dfs_by_id
-        else pd.DataFrame()
-    )
-    # Aplica trimming de columnas RAW si está configurado (para evitar duplicados de timestamps)
-    keep_cols = cfg.get("defaults", {}).get("raw_keep_columns")
-    if keep_cols and not raw_df.empty:
-        cols = [c for c in keep_cols if c in raw_df.columns]
-        if cols:
-            raw_df = raw_df[cols]
-    local_root = cfg.get("paths_local", {}).get("root", "./data")
-    raw_tpl = cfg.get("paths_local", {}).get("raw") if args.local else None
-    curated_tpl = cfg.get("paths_local", {}).get("curated") if args.local else None
-    if args.local:
-        if not raw_tpl or not curated_tpl:
-            raise SystemExit(
-                "paths_local.raw/curated no definido en config/ingest.yaml"
-            )
-        assert isinstance(raw_tpl, str) and isinstance(curated_tpl, str)
-        raw_path = write_raw(
-            raw_df,
-            raw_tpl,
-            dataset=args.dataset,
-            run_ts=now_utc(),
-            bucket_root={"root": local_root},
-            io_mode="local",
-        )
-    else:
-        raw_path = write_raw(
-            raw_df,
-            cfg["paths"]["raw"],
-            dataset=args.dataset,
-            run_ts=now_utc(),
-            bucket_root={"bucket": cfg["paths"]["bucket"]},
-        )
-    raw_rows = len(raw_df)
-    _log(
-        "info",
-        run_id,
-        action="raw_written",
-        dataset=args.dataset,
-        rows=raw_rows,
-        path=raw_path,
-    )
-
-    kind = ds.get("normalize", {}).get("kind")
-    curated_df = normalize_dataset(kind, dfs_by_id, ds)
-    curated_df = apply_post(ds, curated_df)
-    # Filtrado por día objetivo también para granularidad minuto
-    if "hour_ts" in curated_df.columns:
-        curated_df = curated_df[
-            (curated_df["hour_ts"].dt.tz_localize(None).dt.date == target_day)
-            | (curated_df["hour_ts"].dt.date == target_day)
-        ]
-    elif "minute_ts" in curated_df.columns:
-        curated_df = curated_df[
-            (curated_df["minute_ts"].dt.tz_localize(None).dt.date == target_day)
-            | (curated_df["minute_ts"].dt.date == target_day)
-        ]
-    # Asegura columnas para deduplicado y partición en precios
-    if args.dataset in ["prices_pvpc", "prices_pvpc_tomorrow", "prices_spot"]:
-        if "hour_ts" not in curated_df.columns and "datetime" in curated_df.columns:
-            curated_df["hour_ts"] = (
-                pd.to_datetime(curated_df["datetime"], utc=True, errors="coerce")
-                .dt.tz_convert("Europe/Madrid")
-                .dt.floor("h")
-            )
-        if "zone" not in curated_df.columns and "geo_name" in curated_df.columns:
-            curated_df["zone"] = curated_df["geo_name"]
-        # Elimina cualquier columna con nombre de indicador y asegura solo 'source'
-        for col in curated_df.columns:
-            if col not in [
-                "hour_ts",
-                "price_eur_mwh",
-                "zone",
-                "source",
-                "indicator_id",
-            ]:
-                if col.upper() in ["PVPC", "SPOT_ES"]:
-                    curated_df.drop(columns=[col], inplace=True)
-        # Asegura que indicator_id esté presente
-        if "indicator_id" not in curated_df.columns:
-            curated_df["indicator_id"] = (
-                ds["indicator_ids"][0] if "indicator_ids" in ds else "unknown"
-            )
-    curated_df = dedupe(curated_df, ds.get("dedupe_key", []))
-    curated_df = apply_validators(ds, curated_df)
-
-    if args.local:
-        assert isinstance(curated_tpl, str)
-        curated_path = write_parquet_partitioned(
-            curated_df,
-            curated_tpl,
-            ds["curated_table"],
-            target_day,
-            {"root": local_root},
-            io_mode="local",
-        )
-    else:
-        curated_path = write_parquet_partitioned(
-            curated_df,
-            cfg["paths"]["curated"],
-            ds["curated_table"],
-            target_day,
-            {"bucket": cfg["paths"]["bucket"]},
-        )
-    cur_rows = len(curated_df)
-    _log(
-        "info",
-        run_id,
-        action="curated_written",
-        dataset=args.dataset,
-        rows=cur_rows,
-        path=curated_path,
-    )
-    _log(
-        "info",
-        run_id,
-        action="run_summary",
-        dataset=args.dataset,
-        raw_rows=raw_rows,
-        curated_rows=cur_rows,
-        duration_seconds=round(
-            (datetime.now(timezone.utc) - t_global_start).total_seconds(), 2
-        ),
+    run_ingest(
+        args.dataset, window, io_mode, cfg=cfg, target_date=td, run_id=run_id
     )
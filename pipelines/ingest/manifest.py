@@ -0,0 +1,390 @@
+"""Manifest por mes (``_manifest.json``): ficheros autoritativos de una partición curated.
+
+La compactación escribe sus ficheros a temporales ocultos, los mueve a nombres
+únicos (``compact-<token>[-NNNNN].parquet``) y solo entonces publica el mes
+reemplazando ``_manifest.json`` de forma atómica (temporal + mv). Después borra
+los compact anteriores. Un lector que sigue el manifest nunca ve un compact a
+medio escribir ni cuenta dos veces una fila:
+
+    ficheros vivos = compact del manifest
+                   + micro-files que el manifest no da por plegados
+                     (nuevos o reescritos después de la compactación)
+
+Formato::
+
+    {"version": 1, "generation": 3, "updated_at": "...Z", "run_id": "...",
+     "compact": ["compact-1a2b3c4d.parquet"], "rows": 491040,
+     "watermark": 1760000000.0, "folded": {"day=01/part-x.parquet": 1759990000.0}}
+
+``folded`` guarda el mtime de cada micro-file plegado: un ``part-merged``
+reescrito en el mismo nombre (modos ``merge``/``replace``) vuelve a estar vivo.
+Un día así ya está en el compact con sus filas anteriores (``rewritten_days``):
+la vista viva y la siguiente compactación lo rehacen desde sus micro-files, o
+si los originales ya se borraron, mezclan el compact con lo nuevo por la clave
+de dedupe (gana lo nuevo). Los meses sin manifest (anteriores a este formato)
+se resuelven con el watermark del compact.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import uuid
+from datetime import datetime, timezone
+
+TZ_LOCAL = "Europe/Madrid"
+# Columna temporal de los días locales: la primera presente
+TS_COLUMNS = ("minute_ts", "hour_ts", "datetime")
+MANIFEST_NAME = "_manifest.json"
+MANIFEST_VERSION = 1
+WATERMARK_KEY = b"compaction_watermark"
+
+# compact.parquet / compact-NNNNN.parquet (anteriores al manifest) y compact-<token>[-NNNNN].parquet
+COMPACT_FILE_RE = re.compile(r"(^|/)compact(-[0-9a-f]{8})?(-\d{5})?\.parquet$")
+
+
+def is_compact_file(path: str) -> bool:
+    return bool(COMPACT_FILE_RE.search(path))
+
+
+def _fs(path: str):
+    import fsspec
+
+    return fsspec.get_fs_token_paths(path)[0]
+
+
+def _mtime(info: dict) -> float:
+    """mtime (epoch s) de una entrada de ``fs.find(detail=True)`` (local, gcsfs, s3fs)."""
+    value = info.get("mtime") or info.get("updated") or info.get("LastModified") or 0
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+def month_relpath(path: str) -> str:
+    """Ruta relativa al mes (``day=01/part-x.parquet``): igual para fsspec y pyarrow.dataset."""
+    m = re.search(r"month=\d{2}/(.*)$", path)
+    return m.group(1) if m else path
+
+
+def month_file_mtimes(month_path: str) -> dict[str, float]:
+    """mtime de cada micro-file del mes (un solo listado), por ruta relativa al mes."""
+    try:
+        found = _fs(month_path).find(month_path.rstrip("/"), detail=True)  # type: ignore
+    except FileNotFoundError:
+        return {}
+    return {
+        month_relpath(name): _mtime(info)
+        for name, info in found.items()
+        if name.endswith(".parquet") and not is_compact_file(name) and "/." not in name
+    }
+
+
+def compact_paths(month_path: str) -> list[str]:
+    """Ficheros compact presentes en el mes, en orden (incluye huérfanos sin publicar)."""
+    try:
+        names = _fs(month_path).ls(month_path.rstrip("/"), detail=False)  # type: ignore
+    except FileNotFoundError:
+        return []
+    base = month_path.rstrip("/")
+    return sorted(f"{base}/{n.rsplit('/', 1)[-1]}" for n in names if is_compact_file(n))
+
+
+def new_compact_names(count: int) -> list[str]:
+    """Nombres únicos para los ficheros de una compactación (nunca pisan a los publicados)."""
+    token = uuid.uuid4().hex[:8]
+    if count == 1:
+        return [f"compact-{token}.parquet"]
+    return [f"compact-{token}-{i:05d}.parquet" for i in range(count)]
+
+
+def read_manifest(month_path: str) -> dict | None:
+    path = f"{month_path.rstrip('/')}/{MANIFEST_NAME}"
+    fs = _fs(path)
+    try:
+        with fs.open(path, "r", encoding="utf-8") as f:  # type: ignore
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(month_path: str, manifest: dict) -> str:
+    """Publica ``manifest`` de forma atómica (temporal oculto + mv sobre ``_manifest.json``)."""
+    base = month_path.rstrip("/")
+    path = f"{base}/{MANIFEST_NAME}"
+    tmp = f"{base}/.{MANIFEST_NAME}.{uuid.uuid4().hex}.tmp"
+    fs = _fs(path)
+    with fs.open(tmp, "w", encoding="utf-8") as f:  # type: ignore
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    fs.mv(tmp, path)  # type: ignore
+    return path
+
+
+def publish_compaction(
+    month_path: str,
+    compact: list[str],
+    folded: dict[str, float],
+    rows: int,
+    run_id: str | None = None,
+) -> dict:
+    """Nuevo manifest con ``compact`` (nombres) como ficheros autoritativos y borrado de los compact sobrantes.
+
+    Los compact anteriores (y huérfanos de compactaciones fallidas) se borran
+    después de publicar: un lector con el manifest viejo aún los encuentra.
+    """
+    previous = read_manifest(month_path) or {}
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generation": int(previous.get("generation", 0)) + 1,
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+        "run_id": run_id,
+        "compact": list(compact),
+        "rows": rows,
+        "watermark": max(folded.values(), default=previous.get("watermark")),
+        "folded": folded,
+    }
+    write_manifest(month_path, manifest)
+    fs = _fs(month_path)
+    for path in compact_paths(month_path):
+        if path.rsplit("/", 1)[-1] not in compact:
+            fs.rm(path)  # type: ignore
+    return manifest
+
+
+def _legacy_watermark(compact: list[str]) -> float | None:
+    import pyarrow.parquet as pq
+
+    fs = _fs(compact[0])
+    with fs.open(compact[0], "rb") as f:  # type: ignore
+        raw = (pq.read_schema(f).metadata or {}).get(WATERMARK_KEY)
+    return float(json.loads(raw)["mtime"]) if raw else None
+
+
+def read_watermark(month_path: str) -> float | None:
+    """mtime del micro-file más reciente ya plegado en el compact del mes (None si no hay)."""
+    manifest = read_manifest(month_path)
+    if manifest is not None:
+        return manifest.get("watermark")
+    compact = compact_paths(month_path)
+    return _legacy_watermark(compact) if compact else None
+
+
+def month_state(month_path: str, mtimes: dict[str, float] | None = None) -> tuple[list[str], dict[str, float]]:
+    """(compact autoritativos, micro-files plegados ``{relpath: mtime}``) del mes.
+
+    Con manifest es lo publicado. Sin manifest (meses anteriores) se usan los
+    compact presentes y su watermark: lo que no sea posterior se da por
+    plegado (un compact sin watermark se asume completo).
+    """
+    manifest = read_manifest(month_path)
+    base = month_path.rstrip("/")
+    if manifest is not None:
+        return [f"{base}/{c}" for c in manifest.get("compact", [])], dict(manifest.get("folded") or {})
+    compact = compact_paths(month_path)
+    if not compact:
+        return [], {}
+    mtimes = month_file_mtimes(month_path) if mtimes is None else mtimes
+    watermark = _legacy_watermark(compact)
+    return compact, {rel: m for rel, m in mtimes.items() if watermark is None or m <= watermark}
+
+
+def pending_files(mtimes: dict[str, float], folded: dict[str, float]) -> list[str]:
+    """Micro-files (relpath) que aún no están en el compact: nuevos o reescritos después."""
+    return sorted(rel for rel, m in mtimes.items() if rel not in folded or m > folded[rel])
+
+
+def day_of(relpath: str) -> str:
+    """Día ``"DD"`` de un micro-file (``day=DD/...``); ``""`` en la raíz del mes."""
+    m = re.match(r"day=(\d{2})/", relpath)
+    return m.group(1) if m else ""
+
+
+def rewritten_days(mtimes: dict[str, float], folded: dict[str, float]) -> dict[str, bool]:
+    """Días ya plegados en el compact con micro-files pendientes: ``{día: rehacer_desde_micro_files}``.
+
+    Un ``part-merged`` reescrito (``merge``/``replace``) o un fichero nuevo en
+    un día plegado dejan en el compact filas que pueden estar sustituidas. Si
+    siguen todos los micro-files plegados del día (y no hay sueltos en la raíz
+    del mes), el día se rehace solo con ellos: exacto para cualquier modo de
+    escritura. Si no (``--delete-originals``), se mezcla con el compact por la
+    clave de dedupe.
+    """
+    by_day: dict[str, list[str]] = {}
+    for rel in folded:
+        by_day.setdefault(day_of(rel), []).append(rel)
+    complete_root = "" not in by_day
+    out: dict[str, bool] = {}
+    for rel in pending_files(mtimes, folded):
+        day = day_of(rel)
+        if day and day in by_day and day not in out:
+            out[day] = complete_root and all(r in mtimes for r in by_day[day])
+    return out
+
+
+def local_days(table, ts_col: str | None = None):
+    """Día local (Europe/Madrid) de cada fila como ``"DD"`` (None sin columna temporal)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    ts_col = ts_col or next((c for c in TS_COLUMNS if c in table.column_names), None)
+    if ts_col is None:
+        return None
+    col = table.column(ts_col)
+    if pa.types.is_integer(col.type):  # epoch_ts
+        from .utils import EPOCH_UNIT
+
+        col = col.cast(pa.timestamp(EPOCH_UNIT, tz="UTC"))
+    if pa.types.is_timestamp(col.type) and col.type.tz:
+        col = col.cast(pa.timestamp(col.type.unit, tz=TZ_LOCAL))
+    return pc.utf8_lpad(pc.cast(pc.day(col), pa.string()), 2, "0")
+
+
+def _row_group_day(meta, index: int, ts_col: str | None) -> str | None:
+    """Día local de un row group según sus estadísticas (None si no hay o mezcla días)."""
+    from zoneinfo import ZoneInfo
+
+    if ts_col is None:
+        return None
+    rg = meta.row_group(index)
+    for i in range(rg.num_columns):
+        col = rg.column(i)
+        if col.path_in_schema != ts_col:
+            continue
+        st = col.statistics
+        if st is None or not st.has_min_max:
+            return None
+        days = set()
+        for value in (st.min, st.max):
+            if isinstance(value, int):  # epoch_ts (ms)
+                value = datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            days.add(f"{value.astimezone(ZoneInfo(TZ_LOCAL)).day:02d}")
+        return days.pop() if len(days) == 1 else None
+    return None
+
+
+def live_files(month_path: str, mtimes: dict[str, float] | None = None) -> list[str]:
+    """Ficheros con filas vivas del mes: compact + pendientes (+ los micro-files de los días reescritos).
+
+    Con días reescritos (``rewritten_days``) parte de las filas del compact
+    están sustituidas: para contar cada fila una vez hay que leer con
+    ``live_dataset``.
+    """
+    mtimes = month_file_mtimes(month_path) if mtimes is None else mtimes
+    compact, folded = month_state(month_path, mtimes)
+    rebuild = {d for d, ok in rewritten_days(mtimes, folded).items() if ok}
+    pending = set(pending_files(mtimes, folded)) | {rel for rel in mtimes if day_of(rel) in rebuild}
+    base = month_path.rstrip("/")
+    return compact + [f"{base}/{rel}" for rel in sorted(pending)]
+
+
+def _fragment(fmt, fs, path: str):
+    """Fragmento Parquet de ``path`` sobre un filesystem fsspec."""
+    from pyarrow.fs import FSSpecHandler, PyFileSystem
+
+    return fmt.make_fragment(fs._strip_protocol(path), filesystem=PyFileSystem(FSSpecHandler(fs)))
+
+
+def _rewritten_rows(fmt, fs, compact: list[str], days: dict[str, bool], keep):
+    """Reparte el compact entre row groups intactos y filas de los días reescritos.
+
+    Devuelve ``(fragmentos con los row groups de días no reescritos, filas
+    sueltas de días no reescritos, {día: filas del compact a mezclar})``. El
+    compact nunca mezcla días en un row group; los compact anteriores sí pueden
+    y esos row groups se leen y se separan por día.
+    """
+    import pyarrow.compute as pc
+
+    fragments, loose, base_rows = [], [], {d: [] for d in days}
+    for path in (p for p in compact if keep(p)):
+        frag = _fragment(fmt, fs, path)
+        if not days:
+            fragments.append(frag)
+            continue
+        meta = frag.metadata
+        names = meta.schema.to_arrow_schema().names
+        ts_col = next((c for c in TS_COLUMNS if c in names), None)
+        intact = []
+        for i in range(meta.num_row_groups):
+            day = _row_group_day(meta, i, ts_col)
+            if day is not None and day not in days:
+                intact.append(i)
+                continue
+            table = frag.subset(row_group_ids=[i]).to_table()
+            row_days = local_days(table, ts_col)
+            if row_days is None:
+                loose.append(table)
+                continue
+            for d in pc.unique(row_days).to_pylist():
+                piece = table.filter(pc.equal(row_days, d))
+                if d not in days:
+                    loose.append(piece)
+                elif not days[d]:  # originales borrados: el compact es la base del día
+                    base_rows[d].append(piece)
+        if intact:
+            fragments.append(frag.subset(row_group_ids=intact))
+    return fragments, loose, base_rows
+
+
+def live_dataset(month_path: str, schema=None, mtimes: dict[str, float] | None = None, files=None):
+    """``pyarrow.dataset`` con cada fila viva del mes una sola vez (``schema`` del registro para unificar tipos).
+
+    Sin días reescritos son los ficheros de ``live_files``. Con ellos, los row
+    groups del compact de esos días se sustituyen por el día rehecho (ver
+    ``rewritten_days``, gana el micro-file más reciente); solo esos días pasan
+    por memoria. ``mtimes``: micro-files del mes si ya se conocen (catálogo);
+    ``files``: limitar a esas rutas (poda previa por estadísticas).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    mtimes = month_file_mtimes(month_path) if mtimes is None else mtimes
+    compact, folded = month_state(month_path, mtimes)
+    days = rewritten_days(mtimes, folded)
+    base = month_path.rstrip("/")
+    pending = pending_files(mtimes, folded)
+    keep = (lambda p: True) if files is None else set(files).__contains__
+    fs = _fs(month_path)
+    fmt = ds.ParquetFileFormat()
+    fragments, loose, base_rows = _rewritten_rows(fmt, fs, compact, days, keep)
+    clean = [f"{base}/{rel}" for rel in pending if day_of(rel) not in days]
+    fragments += [_fragment(fmt, fs, p) for p in clean if keep(p)]
+    if schema is None:
+        schema = fragments[0].physical_schema if fragments else None
+
+    from .compact import pick_dedupe_keys
+    from .schemas import conform_table
+    from .utils import dedupe_table
+
+    def conform(t):
+        return t if schema is None else conform_table(t, schema)
+
+    by_mtime = sorted(mtimes, key=lambda rel: mtimes[rel])  # gana el más reciente
+    for day in sorted(days):
+        rels = [r for r in by_mtime if day_of(r) == day and (days[day] or r in pending)]
+        tables = base_rows[day] + [
+            _fragment(fmt, fs, f"{base}/{r}").to_table() for r in rels if keep(f"{base}/{r}")
+        ]
+        if not tables:
+            continue
+        schema = schema or tables[0].schema
+        day_table = pa.concat_tables([conform(t) for t in tables])
+        loose.append(dedupe_table(day_table, pick_dedupe_keys(day_table.schema.names)))
+    children = []
+    if fragments:
+        children.append(ds.FileSystemDataset(fragments, schema, fmt, fragments[0].filesystem))
+    if loose:
+        children.append(ds.dataset(pa.concat_tables([conform(t) for t in loose]), schema=schema))
+    if not children:
+        return None
+    out = children[0] if len(children) == 1 else ds.dataset(children, schema=schema)
+    ts_col = next((c for c in TS_COLUMNS if c in schema.names), None)
+    if days and ts_col:
+        # count_rows() sin filtro cuenta los fragmentos con row groups
+        # seleccionados por los metadatos del fichero entero: un filtro siempre
+        # cierto obliga a contar solo lo seleccionado
+        out = out.filter(ds.field(ts_col).is_null() | ds.field(ts_col).is_valid())
+    return out
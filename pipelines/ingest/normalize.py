@@ -1,18 +1,72 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+    pc = None  # type: ignore
 
-def parse_values_to_df(payload: Dict[str, Any]) -> pd.DataFrame:
+
+def _to_arrow(name: str, col: list):
+    if name == "datetime":
+        # Cast vectorizado ISO-8601 (con offset) -> timestamp UTC
+        arr = pa.array(col, type=pa.string())
+        try:
+            return pc.cast(arr, pa.timestamp("ns", tz="UTC"))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            parsed = pd.to_datetime(pd.Series(col), utc=True, errors="coerce")
+            return pa.array(parsed, type=pa.timestamp("ns", tz="UTC"))
+    if name == "value":
+        try:
+            return pa.array(col, type=pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.array(pd.to_numeric(pd.Series(col), errors="coerce"), type=pa.float64())
+    return pa.array(col)
+
+
+def parse_values_to_table(payload: Dict[str, Any], columns: Iterable[str] | None = None):
+    """Convierte ``indicator.values`` (ya decodificado) en una tabla Arrow tipada, columna a columna.
+
+    ``columns`` proyecta los campos a extraer. Las columnas son la unión de las
+    claves de todas las filas (no solo de la primera): una clave que aparece
+    más tarde se conserva con nulos en el resto.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow no disponible. Instala pyarrow.")
     values = payload.get("indicator", {}).get("values", [])
-    df = pd.DataFrame(values)
-    if df.empty:
+    if not values:
+        return pa.table({})
+    if columns:
+        wanted, found = list(columns), set()
+        for v in values:
+            found.update(c for c in wanted if c in v)
+            if len(found) == len(wanted):
+                break
+        names = [c for c in wanted if c in found]
+    else:
+        names = list(dict.fromkeys(k for v in values for k in v))
+    return pa.table({name: _to_arrow(name, [v.get(name) for v in values]) for name in names})
+
+
+def parse_values_to_df(
+    payload: Dict[str, Any], columns: Iterable[str] | None = None
+) -> pd.DataFrame:
+    if pa is None:  # pragma: no cover - ruta legacy sin pyarrow
+        df = pd.DataFrame(payload.get("indicator", {}).get("values", []))
+        if columns is not None and not df.empty:
+            df = df[[c for c in columns if c in df.columns]]
+        if "datetime" in df:
+            df["datetime"] = pd.to_datetime(df["datetime"], utc=True, errors="coerce")
         return df
-    if "datetime" in df:
-        df["datetime"] = pd.to_datetime(df["datetime"], utc=True, errors="coerce")
-    return df
+    table = parse_values_to_table(payload, columns)
+    if table.num_columns == 0:
+        return pd.DataFrame()
+    return table.to_pandas()
 
 
 def normalize_prices(
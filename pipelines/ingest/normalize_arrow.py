@@ -0,0 +1,239 @@
+"""Motor de normalización sobre pyarrow.compute.
+
+Implementa los mismos ``normalize.kind`` que ``normalize.py`` (prices,
+wide_by_indicator, long_tech, interconn_pairs) y produce las mismas columnas
+curated, pero sin frames pandas intermedios: cada indicador se procesa como
+tabla Arrow y solo se convierte a pandas una vez al final (para hooks, dedupe
+y escritura). Se activa por dataset con ``normalize.engine: arrow``.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+    pc = None  # type: ignore
+
+TS_TYPE_LOCAL = "Europe/Madrid"
+
+
+def _as_table(obj, columns: list[str]):
+    if isinstance(obj, pa.Table):
+        table = obj
+    else:
+        cols = [c for c in columns if c in obj.columns]
+        table = pa.Table.from_pandas(obj[cols], preserve_index=False)
+    return table.select([c for c in columns if c in table.column_names])
+
+
+def _local_ts(table, ts_col: str):
+    # Los offsets de Europe/Madrid son horas enteras: truncar a hora en UTC
+    # equivale a truncar en hora local; la zona es solo metadato del tipo.
+    ts = table.column("datetime")
+    if ts_col == "hour_ts":
+        ts = pc.floor_temporal(ts, unit="hour")
+    unit = ts.type.unit if pa.types.is_timestamp(ts.type) else "ns"
+    return ts.cast(pa.timestamp(unit, tz=TS_TYPE_LOCAL))
+
+
+def _numeric(table):
+    col = table.column("value")
+    if pa.types.is_floating(col.type):
+        return col
+    try:
+        return col.cast(pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pa.array(pd.to_numeric(col.to_pandas(), errors="coerce"), type=pa.float64())
+
+
+def _zone(table, n: int):
+    if "geo_name" in table.column_names:
+        return table.column("geo_name")
+    return pa.array(["ES"] * n, type=pa.string())
+
+
+def _not_null(table, cols: list[str]):
+    mask = None
+    for c in cols:
+        m = pc.is_valid(table.column(c))
+        mask = m if mask is None else pc.and_(mask, m)
+    return table.filter(mask) if mask is not None else table
+
+
+def _to_pandas(table, categorical=None) -> pd.DataFrame:
+    # Dimensiones codificadas como diccionario -> category en pandas sin strings por fila
+    for c in categorical or []:
+        i = table.schema.get_field_index(c)
+        t = table.schema.field(i).type if i >= 0 else None
+        if t is not None and (pa.types.is_string(t) or pa.types.is_large_string(t)):
+            table = table.set_column(i, c, pc.dictionary_encode(table.column(i)))
+    return table.to_pandas()
+
+
+def normalize_prices_arrow(df, column_map: Dict[str, str], source: str):
+    if df is None or (not isinstance(df, pa.Table) and df.empty) or len(df) == 0:
+        return None
+    table = _as_table(df, ["datetime", "value", "geo_name"])
+    # Filtrar solo la zona 'Península' si el source es PVPC
+    if source == "PVPC" and "geo_name" in table.column_names:
+        table = table.filter(pc.equal(table.column("geo_name"), "Península"))
+    n = table.num_rows
+    zone = _zone(table, n)
+    if "geo_name" in table.column_names:
+        # Renombrar Península a España para homogeneizar con SPOT_ES
+        zone = pc.if_else(pc.equal(zone, "Península"), "España", zone)
+    return pa.table(
+        {
+            column_map.get("ts", "hour_ts"): _local_ts(table, "hour_ts"),
+            column_map.get("value", "price_eur_mwh"): _numeric(table),
+            column_map.get("zone", "zone"): zone,
+            "source": pa.array([source] * n, type=pa.string()),
+        }
+    )
+
+
+def normalize_wide_by_indicator_arrow(
+    dfs_by_id,
+    column_map: Dict[str, str],
+    id_rename: Dict[str, str] | None = None,
+    categorical=None,
+) -> pd.DataFrame:
+    ts_col = column_map.get("ts", "hour_ts")
+    parts = []
+    for key_id, df in dfs_by_id.items():
+        if df is None or len(df) == 0:
+            continue
+        table = _as_table(df, ["datetime", "value", "geo_name", "indicator_id"])
+        parts.append(
+            pa.table(
+                {
+                    ts_col: _local_ts(table, ts_col),
+                    "geo_name": table.column("geo_name"),
+                    "indicator_id": table.column("indicator_id").cast(pa.int64()),
+                    "value": _numeric(table),
+                }
+            )
+        )
+    if not parts:
+        return pd.DataFrame()
+    # Equivalente a pivot_table(aggfunc="last"): se ignoran valores nulos y claves nulas
+    big = _not_null(pa.concat_tables(parts), [ts_col, "geo_name", "indicator_id", "value"])
+    last = big.group_by([ts_col, "geo_name", "indicator_id"], use_threads=False).aggregate(
+        [("value", "last")]
+    )
+    out = last.group_by([ts_col, "geo_name"], use_threads=False).aggregate([])
+    ids = sorted(pc.unique(last.column("indicator_id")).to_pylist())
+    for ind in ids:
+        sub = last.filter(pc.equal(last.column("indicator_id"), ind))
+        sub = sub.select([ts_col, "geo_name", "value_last"]).rename_columns(
+            [ts_col, "geo_name", str(ind)]
+        )
+        out = out.join(sub, keys=[ts_col, "geo_name"], join_type="left outer")
+    out = out.sort_by([(ts_col, "ascending"), ("geo_name", "ascending")])
+    out = out.select([ts_col, "geo_name"] + [str(i) for i in ids])
+
+    # Igual que el pivot pandas: los nombres fijos (1293/544) tienen prioridad sobre id_rename
+    rename = {str(k): v for k, v in (id_rename or {}).items()}
+    rename.update(
+        {
+            "geo_name": column_map.get("zone", "zone"),
+            "1293": column_map.get("real", "demand_mw"),
+            "544": column_map.get("forecast", "forecast_mw"),
+        }
+    )
+    pdf = _to_pandas(out.rename_columns([rename.get(c, c) for c in out.column_names]), categorical)
+    # Mismo contrato que el pivot pandas: ids sin renombrar quedan como enteros
+    pdf.columns = [int(c) if c.isdigit() else c for c in pdf.columns]
+    pdf.columns.name = "indicator_id"
+    return pdf
+
+
+def normalize_long_tech_arrow(
+    dfs_by_id, tech_map: Dict[str, str], column_map: Dict[str, str], categorical=None
+) -> pd.DataFrame:
+    ts_col = column_map.get("ts", "hour_ts")
+    parts = []
+    for key_id, df in dfs_by_id.items():
+        if df is None or len(df) == 0:
+            continue
+        table = _as_table(df, ["datetime", "value", "geo_name"])
+        n = table.num_rows
+        tech = tech_map.get(str(key_id), str(key_id))
+        parts.append(
+            pa.table(
+                {
+                    ts_col: _local_ts(table, ts_col),
+                    column_map.get("tech", "tech"): pa.array([tech] * n, type=pa.string()),
+                    column_map.get("value", "mw"): _numeric(table),
+                    column_map.get("zone", "zone"): _zone(table, n),
+                }
+            )
+        )
+    if not parts:
+        return pd.DataFrame()
+    return _to_pandas(pa.concat_tables(parts), categorical)
+
+
+def normalize_interconn_pairs_arrow(
+    dfs_by_id, to_pairs: Dict[str, list], column_map: Dict[str, str], categorical=None
+) -> pd.DataFrame:
+    ts_col = column_map.get("ts", "hour_ts")
+    country_col = column_map.get("country", "country")
+    parts = []
+    for key_id, df in dfs_by_id.items():
+        if df is None or len(df) == 0:
+            continue
+        table = _as_table(df, ["datetime", "value"])
+        country, field = to_pairs.get(str(key_id), ["UNK", "value"])
+        parts.append(
+            pa.table(
+                {
+                    ts_col: _local_ts(table, ts_col),
+                    country_col: pa.array([country] * table.num_rows, type=pa.string()),
+                    field: _numeric(table),
+                }
+            )
+        )
+    if not parts:
+        return pd.DataFrame()
+    out = pa.concat_tables(parts, promote_options="default")
+    group_cols = [c for c in out.column_names if c not in ("export_mw", "import_mw")]
+    value_cols = [c for c in out.column_names if c not in group_cols]
+    out = _not_null(out, group_cols)
+    agg = out.group_by(group_cols, use_threads=False).aggregate(
+        [(c, "last") for c in value_cols]
+    )
+    agg = agg.rename_columns([c[: -len("_last")] if c.endswith("_last") else c for c in agg.column_names])
+    agg = agg.sort_by([(c, "ascending") for c in group_cols])
+    return _to_pandas(agg.select(group_cols + value_cols), categorical)
+
+
+def normalize_dataset_arrow(kind: str, dfs_by_id, ncfg: dict, categorical=None) -> pd.DataFrame:
+    if pa is None:
+        raise RuntimeError("pyarrow no disponible para normalize.engine=arrow")
+    column_map = ncfg.get("column_map", {})
+    if kind == "prices":
+        tables = []
+        for ind, df in dfs_by_id.items():
+            source = column_map.get("source", f"ID_{ind}")
+            t = normalize_prices_arrow(df, column_map, source)
+            if t is not None:
+                tables.append(t)
+        return _to_pandas(pa.concat_tables(tables), categorical) if tables else pd.DataFrame()
+    if kind == "wide_by_indicator":
+        return normalize_wide_by_indicator_arrow(
+            dfs_by_id, column_map, ncfg.get("id_rename"), categorical
+        )
+    if kind == "long_tech":
+        return normalize_long_tech_arrow(dfs_by_id, ncfg.get("tech_map", {}), column_map, categorical)
+    if kind == "interconn_pairs":
+        return normalize_interconn_pairs_arrow(
+            dfs_by_id, ncfg.get("to_pairs", {}), column_map, categorical
+        )
+    raise ValueError(f"kind no soportado: {kind}")
@@ -0,0 +1,63 @@
+"""Planificador de peticiones para backfills.
+
+En lugar de una petición por indicador y día (con 4h de solape DST en cada una),
+agrupa días consecutivos en ventanas grandes por indicador: hasta un mes para
+datos horarios y acotadas por tamaño de payload para datos de minuto. Las
+ventanas no cruzan fronteras de mes para que cada chunk escriba particiones de
+un único mes.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+from .utils import dstsafe_bounds
+
+POINTS_PER_DAY = {"hour": 24, "minute": 1440}
+
+
+class WindowChunk(NamedTuple):
+    first_day: date
+    last_day: date
+    start_utc: datetime
+    end_utc: datetime
+
+    @property
+    def days(self) -> int:
+        return (self.last_day - self.first_day).days + 1
+
+
+def max_chunk_days(granularity: str, planner_cfg: dict | None = None) -> int:
+    pcfg = planner_cfg or {}
+    if granularity == "minute":
+        days = int(pcfg.get("chunk_days_minute", 7))
+    else:
+        days = int(pcfg.get("chunk_days_hour", 31))
+    # Tope por tamaño de payload (puntos por indicador y zona en una petición)
+    max_points = int(pcfg.get("max_points_per_request", 20000))
+    per_day = POINTS_PER_DAY.get(granularity, 24)
+    return max(1, min(days, max_points // per_day))
+
+
+def plan_backfill(
+    start_d: date,
+    end_d: date,
+    granularity: str = "hour",
+    planner_cfg: dict | None = None,
+) -> list[WindowChunk]:
+    """Divide [start_d, end_d] (inclusive) en ventanas DST-safe de varios días."""
+    if end_d < start_d:
+        return []
+    max_days = max_chunk_days(granularity, planner_cfg)
+    chunks: list[WindowChunk] = []
+    current = start_d
+    while current <= end_d:
+        month_end = (current.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(
+            days=1
+        )
+        last = min(end_d, month_end, current + timedelta(days=max_days - 1))
+        start_utc, end_utc = dstsafe_bounds(current, last)
+        chunks.append(WindowChunk(current, last, start_utc, end_utc))
+        current = last + timedelta(days=1)
+    return chunks
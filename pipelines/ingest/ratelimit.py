@@ -0,0 +1,121 @@
+"""Limitadores de tasa (token bucket) para las llamadas a ESIOS.
+
+Backends:
+    - ``local``: bucket en memoria, thread-safe (un único proceso).
+    - ``sqlite``: bucket compartido entre procesos del mismo host mediante un
+      fichero SQLite (bloqueo ``BEGIN IMMEDIATE``).
+
+Cualquier almacén compartido (Redis, Firestore...) puede añadirse implementando
+``RateLimiter.reserve``: descuenta un token y devuelve los segundos que el
+llamante debe esperar antes de lanzar la petición.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+
+class RateLimiter:
+    def reserve(self) -> float:
+        raise NotImplementedError
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        # reserve() puede bloquear (sqlite: BEGIN IMMEDIATE): fuera del event loop
+        wait = await asyncio.to_thread(self.reserve)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _take(tokens: float, last: float, now: float, rate: float, burst: float):
+    # Rellena según el tiempo transcurrido y reserva un token (puede quedar negativo:
+    # la deuda se traduce en espera y mantiene el orden de llegada)
+    tokens = min(burst, tokens + (now - last) * rate) - 1.0
+    wait = -tokens / rate if tokens < 0 else 0.0
+    return tokens, wait
+
+
+class TokenBucket(RateLimiter):
+    def __init__(self, rate_per_sec: float = 1.0, burst: float = 1.0):
+        self.rate = max(float(rate_per_sec), 0.01)
+        self.burst = max(float(burst), 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, wait = _take(self._tokens, self._last, now, self.rate, self.burst)
+            self._last = now
+            return wait
+
+
+class SqliteTokenBucket(RateLimiter):
+    """Token bucket persistido en SQLite: presupuesto global para todos los procesos del host."""
+
+    def __init__(
+        self,
+        path: str,
+        rate_per_sec: float = 1.0,
+        burst: float = 1.0,
+        key: str = "esios",
+    ):
+        self.path = path
+        self.rate = max(float(rate_per_sec), 0.01)
+        self.burst = max(float(burst), 1.0)
+        self.key = key
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, ts REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def reserve(self) -> float:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, ts FROM buckets WHERE key = ?", (self.key,)
+            ).fetchone()
+            now = time.time()
+            tokens, last = row if row else (self.burst, now)
+            tokens, wait = _take(tokens, last, now, self.rate, self.burst)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, ts) VALUES (?, ?, ?)",
+                (self.key, tokens, now),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+def build_limiter(cfg_defaults: dict) -> RateLimiter:
+    rate = float(cfg_defaults.get("rate_limit_per_sec", 1))
+    burst = float(cfg_defaults.get("rate_limit_burst", 1))
+    lcfg = cfg_defaults.get("rate_limiter") or {}
+    backend = (lcfg.get("backend") or "local").lower()
+    if backend == "local":
+        return TokenBucket(rate, burst)
+    if backend == "sqlite":
+        path = lcfg.get("path") or "./data/state/esios_ratelimit.sqlite"
+        return SqliteTokenBucket(path, rate, burst, key=lcfg.get("key", "esios"))
+    raise ValueError(f"rate_limiter.backend no soportado: {backend}")
@@ -0,0 +1,251 @@
+"""Replay: reconstruye tablas curated a partir de la capa RAW, sin llamar a ESIOS.
+
+Lee en paralelo los ficheros RAW del dataset (csv / ndjson.zst / parquet),
+reconstruye ``dfs_by_id`` y ejecuta la misma cadena que la ingesta
+(``normalize_dataset`` -> ``apply_post`` -> ``dedupe`` -> ``apply_validators``)
+por ventanas del planner, escribiendo cada día local.
+
+RAW se particiona por fecha de ejecución, no por fecha del dato: se leen las
+particiones desde el día anterior al rango (PVPC de mañana) en adelante y se
+filtra por ``datetime``. Si un mismo punto aparece en varias ejecuciones gana la
+más reciente. Cada día se escribe en modo ``replace`` (``part-merged-<dataset>``),
+que retira de los ``part-<uuid>`` antiguos del día las filas que sustituye.
+
+Uso:
+  python pipelines/ingest/replay.py gen_mix --range 2025-01-01:2025-01-31 [--local] [--workers 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+
+try:  # relative (cuando se importa como pipelines.ingest.replay)
+    from .calendar_index import day_bounds_utc
+    from .main import _log, curate_frame, finalize_day, load_cfg, output_targets, write_outputs_curated
+    from .planner import plan_backfill
+    from .utils import RAW_EXTENSIONS, curated_dtypes, raw_format_of, read_raw, split_by_local_day
+except ImportError:  # ejecución directa: python pipelines/ingest/replay.py
+    import os
+    import sys
+
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    from pipelines.ingest.calendar_index import day_bounds_utc  # type: ignore
+    from pipelines.ingest.main import (  # type: ignore
+        _log,
+        curate_frame,
+        finalize_day,
+        load_cfg,
+        output_targets,
+        write_outputs_curated,
+    )
+    from pipelines.ingest.planner import plan_backfill  # type: ignore
+    from pipelines.ingest.utils import (  # type: ignore
+        RAW_EXTENSIONS,
+        curated_dtypes,
+        raw_format_of,
+        read_raw,
+        split_by_local_day,
+    )
+
+RAW_PARTITION = re.compile(r"year=(\d{4})/month=(\d{2})/day=(\d{2})/")
+RAW_KEY = ["indicator_id", "datetime", "geo_name"]
+
+
+def list_raw_files(cfg, dataset: str, local: bool = False, since: date | None = None) -> list[str]:
+    """Ficheros RAW del dataset (particiones >= ``since``), en orden de ejecución."""
+    import fsspec
+
+    raw_tpl, _curated_tpl, bucket_root, _io_mode = output_targets(cfg, local)
+    prefix = raw_tpl.split("/year=", 1)[0].format(dataset=dataset, **bucket_root)
+    fs = fsspec.get_fs_token_paths(prefix)[0]
+    try:
+        found = fs.find(prefix)  # type: ignore
+    except FileNotFoundError:
+        return []
+    files = []
+    for path in found:
+        name = path.rsplit("/", 1)[-1]
+        if name.startswith(".") or not name.endswith(tuple(RAW_EXTENSIONS.values())):
+            continue
+        m = RAW_PARTITION.search(path)
+        if since and m and date(int(m.group(1)), int(m.group(2)), int(m.group(3))) < since:
+            continue
+        # gcsfs devuelve rutas sin esquema: lo restauramos
+        files.append(fs.unstrip_protocol(path) if "://" in prefix else path)  # type: ignore
+    # El nombre incluye iso_run: ordenar por nombre = orden cronológico de ejecución
+    return sorted(files, key=lambda p: p.rsplit("/", 1)[-1])
+
+
+def raw_file_bounds(path: str):
+    """(min, max) de ``datetime`` (UTC) de un fichero RAW; ``(None, None)`` si está vacío.
+
+    En parquet salen de las estadísticas de row group (solo el footer); csv y
+    ndjson.zst se leen una vez proyectando ``datetime``.
+    """
+    if raw_format_of(path) == "parquet":
+        import fsspec
+        import pyarrow.parquet as pq
+
+        with fsspec.open(path, "rb") as f:
+            meta = pq.ParquetFile(f).metadata
+        names = [meta.schema.column(i).name for i in range(meta.num_columns)]
+        if "datetime" in names and meta.num_row_groups:
+            idx = names.index("datetime")
+            stats = [meta.row_group(i).column(idx).statistics for i in range(meta.num_row_groups)]
+            if all(st is not None and st.has_min_max for st in stats):
+                lo = min(pd.Timestamp(st.min) for st in stats)
+                hi = max(pd.Timestamp(st.max) for st in stats)
+                return (
+                    lo.tz_localize("UTC") if lo.tzinfo is None else lo.tz_convert("UTC"),
+                    hi.tz_localize("UTC") if hi.tzinfo is None else hi.tz_convert("UTC"),
+                )
+    dt = read_raw(path, ["datetime"]).get("datetime")
+    if dt is None or dt.dropna().empty:
+        return None, None
+    return dt.min(), dt.max()
+
+
+def index_raw_files(files: list[str], workers: int = 8) -> dict:
+    """``{path: (min, max)}`` de ``datetime`` de cada fichero RAW (una sola pasada, en paralelo)."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(zip(files, pool.map(raw_file_bounds, files)))
+
+
+def files_for_window(files: list[str], bounds: dict, start_utc: datetime, end_utc: datetime) -> list[str]:
+    """Ficheros (en su orden) con algún ``datetime`` en [start_utc, end_utc)."""
+    start, end = pd.Timestamp(start_utc), pd.Timestamp(end_utc)
+    out = []
+    for path in files:
+        lo, hi = bounds.get(path, (None, None))
+        if lo is not None and hi >= start and lo < end:
+            out.append(path)
+    return out
+
+
+def load_raw_window(
+    files: list[str],
+    indicator_ids,
+    start_utc: datetime,
+    end_utc: datetime,
+    workers: int = 8,
+    columns: list[str] | None = None,
+) -> dict:
+    """Lee ``files`` en paralelo filtrando [start_utc, end_utc) y devuelve ``dfs_by_id``."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        frames = list(pool.map(lambda p: read_raw(p, columns, start_utc, end_utc), files))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return {}
+    raw = pd.concat(frames, ignore_index=True)
+    # pool.map conserva el orden de los ficheros: la última ejecución gana
+    raw = raw.drop_duplicates(subset=[c for c in RAW_KEY if c in raw.columns], keep="last")
+    groups = {int(k): g for k, g in raw.groupby("indicator_id", sort=False)}
+    return {int(i): groups[int(i)].reset_index(drop=True) for i in indicator_ids if int(i) in groups}
+
+
+def run_replay(
+    cfg,
+    dataset: str,
+    start_d: date,
+    end_d: date,
+    local: bool = False,
+    workers: int | None = None,
+    run_id: str | None = None,
+):
+    """Regenera el curated de [start_d, end_d] desde RAW. Devuelve estadísticas."""
+    run_id = run_id or str(uuid.uuid4())
+    ds = cfg["datasets"][dataset]
+    defaults = cfg.get("defaults", {})
+    workers = workers or int(defaults.get("replay_workers", 8))
+    dtypes = curated_dtypes(cfg, ds)
+    files = list_raw_files(cfg, dataset, local, since=start_d - timedelta(days=1))
+    # RAW va por fecha de ejecución (un backfill de 2024 cae en la partición de hoy):
+    # el rango de datos de cada fichero se indexa una vez y cada ventana lee solo
+    # los que la solapan, en vez de releer todo el listado por ventana
+    bounds = index_raw_files(files, workers)
+    stats = {"days": 0, "chunks": 0, "raw_files": len(files), "raw_reads": 0, "raw_rows": 0, "curated_rows": 0}
+    _log("info", run_id, action="replay_plan", dataset=dataset, raw_files=len(files), workers=workers)
+
+    def _write(day, day_df):
+        curated_df = finalize_day(dataset, ds, day_df)
+        path = write_outputs_curated(curated_df, cfg, ds, day, local, dataset, mode="replace")
+        return day, len(curated_df), path
+
+    for chunk in plan_backfill(
+        start_d, end_d, ds.get("granularity", "hour"), defaults.get("backfill_planner")
+    ):
+        start_utc = day_bounds_utc(chunk.first_day)[0]
+        end_utc = day_bounds_utc(chunk.last_day)[1]
+        chunk_files = files_for_window(files, bounds, start_utc, end_utc)
+        dfs_by_id = load_raw_window(
+            chunk_files, ds["indicator_ids"], start_utc, end_utc, workers, defaults.get("raw_keep_columns")
+        )
+        stats["chunks"] += 1
+        stats["raw_reads"] += len(chunk_files)
+        stats["raw_rows"] += sum(len(df) for df in dfs_by_id.values())
+        if not dfs_by_id:
+            _log(
+                "warn",
+                run_id,
+                action="replay_no_raw",
+                dataset=dataset,
+                date_from=str(chunk.first_day),
+                date_to=str(chunk.last_day),
+            )
+            continue
+        curated_all = curate_frame(ds, dfs_by_id, dtypes)
+        ts_col = "hour_ts" if "hour_ts" in curated_all.columns else "minute_ts"
+        days = [
+            (d, part)
+            for d, part in split_by_local_day(curated_all, ts_col)
+            if chunk.first_day <= d <= chunk.last_day
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for day, rows, path in pool.map(lambda kv: _write(*kv), days):
+                _log("info", run_id, action="curated_written", dataset=dataset, date=str(day), rows=rows, path=path)
+                stats["days"] += 1
+                stats["curated_rows"] += rows
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye curated desde RAW (sin llamar a ESIOS)")
+    parser.add_argument("dataset", help="Nombre del dataset en config/ingest.yaml")
+    parser.add_argument("--range", required=True, help="START:END (YYYY-MM-DD:YYYY-MM-DD, inclusive)")
+    parser.add_argument("--local", action="store_true", help="Lee/escribe según paths_local")
+    parser.add_argument("--workers", type=int, help="Hilos de lectura/escritura (defaults.replay_workers)")
+    args = parser.parse_args()
+
+    try:
+        start_s, end_s = [s.strip() for s in args.range.split(":", 1)]
+        start_d, end_d = date.fromisoformat(start_s), date.fromisoformat(end_s)
+    except Exception:
+        raise SystemExit("--range debe tener formato START:END con YYYY-MM-DD:YYYY-MM-DD")
+    if end_d < start_d:
+        raise SystemExit("--range END debe ser >= START")
+
+    cfg = load_cfg()
+    if args.dataset not in cfg.get("datasets", {}):
+        raise SystemExit(f"Dataset '{args.dataset}' no existe en config/ingest.yaml")
+    run_id = str(uuid.uuid4())
+    t0 = datetime.now(timezone.utc)
+    _log("info", run_id, action="run_start", dataset=args.dataset, mode="replay")
+    stats = run_replay(cfg, args.dataset, start_d, end_d, args.local, args.workers, run_id)
+    _log(
+        "info",
+        run_id,
+        action="replay_summary",
+        dataset=args.dataset,
+        date_from=str(start_d),
+        date_to=str(end_d),
+        duration_seconds=round((datetime.now(timezone.utc) - t0).total_seconds(), 2),
+        **stats,
+    )
@@ -0,0 +1,140 @@
+"""Registro de esquemas Arrow de las tablas curated.
+
+El esquema de cada tabla (prices, demand, gen_mix, interconn) se deriva de la
+config de los datasets que escriben en ella (``normalize.kind``, ``column_map``,
+``id_rename``, ``to_pairs``, ``post_hook``) y de ``curated_dtypes``. El writer lo
+impone al escribir, de modo que todos los ficheros de una tabla comparten
+exactamente el mismo esquema y la compactación concatena sin promociones.
+"""
+
+from __future__ import annotations
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+    pc = None  # type: ignore
+
+from .utils import EPOCH_UNIT, TS_COLUMNS, curated_dtypes
+
+TS_UNIT = "us"
+TS_TZ = "Europe/Madrid"
+
+# Columnas que añaden los post_hooks registrados
+POST_HOOK_COLUMNS = {"compute_mix_pct": ["mw_total", "pct"]}
+
+
+def _value_columns(kind: str, ds: dict) -> list[str]:
+    ncfg = ds.get("normalize", {})
+    cmap = ncfg.get("column_map", {})
+    if kind == "prices":
+        return [cmap.get("value", "price_eur_mwh")]
+    if kind == "wide_by_indicator":
+        fixed = {"1293": cmap.get("real", "demand_mw"), "544": cmap.get("forecast", "forecast_mw")}
+        rename = {str(k): v for k, v in (ncfg.get("id_rename") or {}).items()}
+        return [fixed.get(str(i), rename.get(str(i), str(i))) for i in ds.get("indicator_ids", [])]
+    if kind == "long_tech":
+        return [cmap.get("value", "mw")]
+    if kind == "interconn_pairs":
+        fields = [pair[1] for pair in (ncfg.get("to_pairs") or {}).values()]
+        return list(dict.fromkeys(fields))
+    raise ValueError(f"kind no soportado: {kind}")
+
+
+def _dimension_columns(kind: str, ds: dict) -> list[str]:
+    cmap = ds.get("normalize", {}).get("column_map", {})
+    if kind == "prices":
+        return [cmap.get("zone", "zone"), "source"]
+    if kind == "wide_by_indicator":
+        return [cmap.get("zone", "zone")]
+    if kind == "long_tech":
+        return [cmap.get("tech", "tech"), cmap.get("zone", "zone")]
+    if kind == "interconn_pairs":
+        return [cmap.get("country", "country")]
+    return []
+
+
+def dataset_columns(ds: dict) -> list[tuple[str, str]]:
+    """Columnas (nombre, rol) del curated de un dataset: ts / dim / value / id."""
+    kind = ds.get("normalize", {}).get("kind")
+    cmap = ds.get("normalize", {}).get("column_map", {})
+    cols = [(cmap.get("ts", "hour_ts"), "ts")]
+    dims = _dimension_columns(kind, ds)
+    values = _value_columns(kind, ds)
+    if kind == "long_tech":
+        # Orden de normalize_long_tech: ts, tech, mw, zone
+        cols += [(dims[0], "dim"), (values[0], "value"), (dims[1], "dim")]
+    elif kind == "prices":
+        # Orden de normalize_prices: ts, valor, zone, source (+ indicator_id en finalize_day)
+        cols += [(values[0], "value"), (dims[0], "dim"), (dims[1], "dim"), ("indicator_id", "id")]
+    else:
+        cols += [(d, "dim") for d in dims] + [(v, "value") for v in values]
+    post = ds.get("normalize", {}).get("post_hook")
+    cols += [(c, "value") for c in POST_HOOK_COLUMNS.get(post, [])]
+    return cols
+
+
+def _field(name: str, role: str, dtypes: dict):
+    if role == "ts":
+        if dtypes.get("epoch_ts") and name in TS_COLUMNS:
+            return pa.field(name, pa.int64())
+        return pa.field(name, pa.timestamp(TS_UNIT, tz=TS_TZ))
+    if role == "dim":
+        if name in (dtypes.get("categorical") or []):
+            return pa.field(name, pa.dictionary(pa.int32(), pa.string()))
+        return pa.field(name, pa.string())
+    if role == "id":
+        return pa.field(name, pa.int64())
+    return pa.field(name, pa.float32() if name in (dtypes.get("float32") or []) else pa.float64())
+
+
+def table_schema(cfg: dict, table: str):
+    """Esquema Arrow de una tabla curated (None si ningún dataset escribe en ella).
+
+    Si varios datasets comparten tabla (PVPC y SPOT en ``prices``) se une su
+    lista de columnas; los tipos los fija el primer dataset que la declara.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow no disponible. Instala pyarrow.")
+    fields: dict[str, object] = {}
+    for ds in cfg.get("datasets", {}).values():
+        if ds.get("curated_table") != table:
+            continue
+        dtypes = curated_dtypes(cfg, ds)
+        for name, role in dataset_columns(ds):
+            fields.setdefault(name, _field(name, role, dtypes))
+    if not fields:
+        return None
+    return pa.schema(list(fields.values()))
+
+
+def registry(cfg: dict) -> dict:
+    """{tabla: esquema} para todas las tablas curated de la config."""
+    tables = {ds.get("curated_table") for ds in cfg.get("datasets", {}).values()}
+    return {t: table_schema(cfg, t) for t in sorted(t for t in tables if t)}
+
+
+def conform_table(table, schema):
+    """Ajusta una tabla al esquema: orden de columnas, tipos y columnas ausentes como nulos.
+
+    Columnas fuera del esquema son un error (indican config y datos desalineados).
+    """
+    extra = [c for c in table.column_names if schema.get_field_index(c) < 0]
+    if extra:
+        raise ValueError(f"Columnas fuera del esquema: {extra}")
+    if table.schema.equals(schema, check_metadata=False):
+        return table.replace_schema_metadata(None)
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            col = table.column(field.name)
+            if pa.types.is_timestamp(field.type) and pa.types.is_timestamp(col.type) and col.type.tz is None:
+                # Ficheros antiguos sin zona: hora local de pared
+                col = pc.assume_timezone(col, field.type.tz, ambiguous="earliest", nonexistent="earliest")
+            elif pa.types.is_integer(field.type) and pa.types.is_timestamp(col.type):
+                col = col.cast(pa.timestamp(EPOCH_UNIT, tz="UTC"))
+            columns.append(col.cast(field.type) if col.type != field.type else col)
+        else:
+            columns.append(pa.chunked_array([pa.nulls(table.num_rows, type=field.type)]))
+    return pa.Table.from_arrays(columns, schema=schema)
@@ -1,21 +1,68 @@
 from __future__ import annotations
 
 import os
+import re
 import uuid
-from datetime import date, datetime, time, timedelta, timezone
-from zoneinfo import ZoneInfo
+from datetime import date, datetime, timedelta, timezone
 
+import numpy as np
 import pandas as pd
 
-TZ_MADRID = ZoneInfo("Europe/Madrid")
+from .calendar_index import TZ_MADRID, day_bounds_utc, local_day_ordinals
 
 
 def now_utc():
     return datetime.now(timezone.utc)
 
 
-def resolve_window(strategy: dict, target_date: date | None = None):
+def iso_z(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def dstsafe_bounds(first_day: date, last_day: date | None = None, pad_hours: float = 1):
+    """Ventana UTC que cubre los días locales [first_day, last_day] con ``pad_hours`` de margen.
+
+    Los límites salen del índice de calendario, así que ya contemplan días de
+    23/25 horas; el margen solo cubre valores en el borde del día.
+    """
+    pad = timedelta(hours=pad_hours)
+    start = day_bounds_utc(first_day)[0] - pad
+    end = day_bounds_utc(last_day or first_day)[1] + pad
+    return start, end
+
+
+def _last_complete_hour_local():
+    # Última hora completa en horario de Madrid (CET/CEST), devuelta en UTC
+    now_local = now_utc().astimezone(TZ_MADRID)
+    end_local = now_local.replace(minute=0, second=0, microsecond=0)
+    start_local = end_local - timedelta(hours=1)
+    return start_local.astimezone(timezone.utc), end_local.astimezone(timezone.utc)
+
+
+def resolve_window(
+    strategy: dict, target_date: date | None = None, watermark: datetime | None = None
+):
     td = target_date or now_utc().astimezone(TZ_MADRID).date()
+    if strategy["type"] == "watermark":
+        # Solo lo no ingerido: desde la marca de agua (menos solape) hasta el fin
+        # configurado. Sin marca previa se usa la estrategia 'fallback'.
+        if watermark is None:
+            fallback = strategy.get("fallback", {"type": "last_hours", "hours": 6})
+            return resolve_window(fallback, target_date=target_date)
+        if strategy.get("end") == "last_complete_hour_local":
+            end = _last_complete_hour_local()[1]
+        else:
+            end = now_utc()
+        overlap = timedelta(
+            hours=float(strategy.get("overlap_hours", 0)),
+            minutes=float(strategy.get("overlap_minutes", 0)),
+        )
+        start = watermark - overlap
+        max_hours = strategy.get("max_hours")
+        if max_hours:
+            start = max(start, end - timedelta(hours=float(max_hours)))
+        start = min(start, end)
+        return start, end, end.astimezone(TZ_MADRID).date()
     if strategy["type"] == "last_hours":
         hours = int(strategy.get("hours", 6))
         end = now_utc()
@@ -28,38 +75,99 @@ def resolve_window(strategy: dict, target_date: date | None = None):
         return start, end, td
     if strategy["type"] == "next_day_dstsafe":
         tomorrow = td + timedelta(days=1)
-        start = datetime.combine(tomorrow, time(0, 0), tzinfo=timezone.utc) - timedelta(
-            hours=3
-        )
-        end = datetime.combine(
-            tomorrow + timedelta(days=1), time(0, 0), tzinfo=timezone.utc
-        ) + timedelta(hours=1)
+        start, end = dstsafe_bounds(tomorrow)
         return start, end, tomorrow
     if strategy["type"] == "today_dstsafe":
-        start = datetime.combine(td, time(0, 0), tzinfo=timezone.utc) - timedelta(
-            hours=3
-        )
-        end = datetime.combine(
-            td + timedelta(days=1), time(0, 0), tzinfo=timezone.utc
-        ) + timedelta(hours=1)
+        start, end = dstsafe_bounds(td)
         return start, end, td
     if strategy["type"] == "last_complete_hour_local":
-        # Última hora completa en horario de Madrid (CET/CEST), devuelta en UTC
-        now_local = now_utc().astimezone(TZ_MADRID)
-        end_local = now_local.replace(minute=0, second=0, microsecond=0)
-        start_local = end_local - timedelta(hours=1)
-        start = start_local.astimezone(timezone.utc)
-        end = end_local.astimezone(timezone.utc)
-        return start, end, start_local.date()
+        start, end = _last_complete_hour_local()
+        return start, end, start.astimezone(TZ_MADRID).date()
     raise ValueError(f"Estrategia no soportada: {strategy}")
 
 
+def curated_table_root(cfg: dict, table: str, local: bool = False) -> str:
+    """Raíz de una tabla curated: {root|bucket}/curated/{table}."""
+    if local:
+        return f"{cfg.get('paths_local', {}).get('root', './data')}/curated/{table}"
+    return f"{cfg['paths']['bucket']}/curated/{table}"
+
+
+def read_json(path: str, default=None):
+    """Lee un JSON pequeño (estado/manifest) vía fsspec; ``default`` si no existe."""
+    import json
+
+    import fsspec
+
+    try:
+        with fsspec.open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def write_json_atomic(path: str, obj) -> str:
+    """Escribe un JSON en un temporal y lo mueve al destino (local: rename atómico)."""
+    import json
+
+    import fsspec
+
+    fs = fsspec.get_fs_token_paths(path)[0]
+    parent = path.rsplit("/", 1)[0]
+    fs.makedirs(parent, exist_ok=True)  # type: ignore
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with fs.open(tmp, "w") as f:  # type: ignore
+        json.dump(obj, f, default=str)
+    fs.mv(tmp, path)  # type: ignore
+    return path
+
+
 def _ensure_local_dir(path: str):
     d = os.path.dirname(path)
     if d and not os.path.exists(d):
         os.makedirs(d, exist_ok=True)
 
 
+RAW_EXTENSIONS = {"csv": ".csv", "ndjson.zst": ".ndjson.zst", "parquet": ".parquet"}
+
+
+def raw_path_for_format(path: str, raw_format: str) -> str:
+    """Cambia la extensión de la plantilla RAW por la del formato elegido."""
+    if raw_format not in RAW_EXTENSIONS:
+        raise ValueError(f"raw_format no soportado: {raw_format}")
+    for ext in sorted(RAW_EXTENSIONS.values(), key=len, reverse=True):
+        if path.endswith(ext):
+            path = path[: -len(ext)]
+            break
+    return path + RAW_EXTENSIONS[raw_format]
+
+
+def raw_format_of(path: str) -> str:
+    for fmt, ext in sorted(RAW_EXTENSIONS.items(), key=lambda kv: len(kv[1]), reverse=True):
+        if path.endswith(ext):
+            return fmt
+    raise ValueError(f"Formato RAW desconocido: {path}")
+
+
+def _write_raw_file(df: pd.DataFrame, path: str, raw_format: str):
+    import fsspec
+
+    if raw_format == "csv":
+        df.to_csv(path, index=False, encoding="utf-8")
+        return
+    import pyarrow as pa
+
+    with fsspec.open(path, "wb") as f:
+        if raw_format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), f, compression="zstd")
+            return
+        # ndjson.zst: una línea JSON por fila, fechas ISO-8601 en UTC
+        with pa.CompressedOutputStream(f, "zstd") as out:
+            out.write(df.to_json(orient="records", lines=True, date_format="iso").encode("utf-8"))
+
+
 def write_raw(
     df: pd.DataFrame,
     path_tpl: str,
@@ -67,6 +175,7 @@ def write_raw(
     run_ts: datetime,
     bucket_root: dict,
     io_mode: str = "gcs",
+    raw_format: str = "csv",
 ) -> str:
     if df is None:
         return ""
@@ -83,9 +192,10 @@ def write_raw(
         iso_run=iso_run_safe,
         **bucket_root,
     )
+    path = raw_path_for_format(path, raw_format)
     if io_mode == "local":
         _ensure_local_dir(path)
-        df.to_csv(path, index=False, encoding="utf-8")
+        _write_raw_file(df, path, raw_format)
         return path
     print(
         "GOOGLE_APPLICATION_CREDENTIALS:",
@@ -94,10 +204,64 @@ def write_raw(
     print("GCLOUD_PROJECT:", os.environ.get("GCLOUD_PROJECT"))
     print("DATA_BUCKET:", os.environ.get("DATA_BUCKET"))
     # Escribimos usando fsspec directamente sobre la ruta gs://
-    df.to_csv(path, index=False, encoding="utf-8")
+    _write_raw_file(df, path, raw_format)
     return path
 
 
+def read_raw(
+    path: str,
+    columns: list[str] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> pd.DataFrame:
+    """Lee un fichero RAW (csv / ndjson.zst / parquet) con ``datetime`` en UTC y ``value`` numérico.
+
+    ``columns`` proyecta columnas y [``start``, ``end``) filtra por ``datetime``
+    (en parquet el filtro se aplica al leer, con las estadísticas de row group).
+    """
+    import fsspec
+
+    raw_format = raw_format_of(path)
+    if raw_format == "csv":
+        df = pd.read_csv(path, encoding="utf-8", usecols=lambda c: columns is None or c in columns)
+    else:
+        import pyarrow as pa
+
+        with fsspec.open(path, "rb") as f:
+            if raw_format == "parquet":
+                import pyarrow.parquet as pq
+
+                filters = []
+                if start is not None:
+                    filters.append(("datetime", ">=", pd.Timestamp(start)))
+                if end is not None:
+                    filters.append(("datetime", "<", pd.Timestamp(end)))
+                schema_names = pq.read_schema(f).names
+                cols = [c for c in columns if c in schema_names] if columns else None
+                f.seek(0)
+                df = pq.read_table(f, columns=cols, filters=filters or None).to_pandas()
+            else:
+                import pyarrow.json as pj
+
+                with pa.CompressedInputStream(f, "zstd") as stream:
+                    table = pj.read_json(stream)
+                if columns:
+                    table = table.select([c for c in columns if c in table.column_names])
+                df = table.to_pandas()
+    if "datetime" in df.columns:
+        df["datetime"] = pd.to_datetime(df["datetime"], utc=True, errors="coerce")
+        if start is not None or end is not None:
+            mask = pd.Series(True, index=df.index)
+            if start is not None:
+                mask &= df["datetime"] >= pd.Timestamp(start)
+            if end is not None:
+                mask &= df["datetime"] < pd.Timestamp(end)
+            df = df[mask]
+    if "value" in df.columns:
+        df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    return df
+
+
 def write_parquet_partitioned(
     df: pd.DataFrame,
     path_tpl: str,
@@ -105,9 +269,37 @@ def write_parquet_partitioned(
     target_date: date,
     bucket_root: dict,
     io_mode: str = "gcs",
+    schema=None,
+    compression: str = "zstd",
+    mode: str = "append",
+    dedupe_key: list[str] | None = None,
+    file_id: str = "merged",
+    catalog: bool = False,
 ) -> str:
+    """Escribe un fichero curated con pyarrow (zstd + estadísticas).
+
+    Con ``schema`` (ver ``schemas.table_schema``) la tabla se ajusta a ese
+    esquema antes de escribir: todos los ficheros de la tabla quedan idénticos.
+
+    ``mode="append"`` crea un ``part-<uuid>`` nuevo por ejecución. ``mode="merge"``
+    mantiene un único fichero por día (``part-<file_id>``): lee el existente, une
+    las filas nuevas, deduplica por ``dedupe_key`` (ganan las nuevas) y lo
+    reemplaza de forma atómica (temporal oculto + mv). ``mode="replace"`` escribe
+    ese mismo fichero sin unir lo existente (replay) y retira de los ``part-<uuid>``
+    del día (modo append) las filas cuya ``dedupe_key`` acaba de reescribir
+    (``_supersede_append_files``): el día no queda duplicado.
+
+    Con ``catalog`` el fichero se apunta en el ``_catalog.json`` de la tabla
+    (filas, bytes, rango temporal y dimensiones de lo escrito, ver ``catalog``).
+    """
+    import fsspec
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
     if df is None or df.empty:
         return ""
+    if mode not in ("append", "merge", "replace"):
+        raise ValueError(f"curated_write_mode no soportado: {mode}")
     year = target_date.year
     month = f"{target_date.month:02d}"
     day = f"{target_date.day:02d}"
@@ -116,19 +308,291 @@ def write_parquet_partitioned(
         year=year,
         month=month,
         day=day,
-        uuid=str(uuid.uuid4()),
+        uuid=str(uuid.uuid4()) if mode == "append" else file_id,
         **bucket_root,
     )
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    if schema is not None:
+        from .schemas import conform_table
+
+        arrow_table = conform_table(arrow_table, schema)
     if io_mode == "local":
         _ensure_local_dir(p)
-        df.to_parquet(p, index=False)
-        return p
-    # Escribimos usando fsspec directamente sobre la ruta gs://
-    df.to_parquet(p, index=False)
+    fs = fsspec.get_fs_token_paths(p)[0]
+    if mode != "append":
+        if mode == "merge" and fs.exists(p):  # type: ignore
+            with fs.open(p, "rb") as f:  # type: ignore
+                existing = pq.read_table(f)
+            if schema is not None:
+                existing = conform_table(existing, schema)
+            arrow_table = _merge_tables(existing, arrow_table, dedupe_key or [], schema)
+        # Temporal con prefijo "." para que ni pyarrow.dataset ni los listados *.parquet lo lean
+        parent, name = p.rsplit("/", 1)
+        target = f"{parent}/.{name}.{uuid.uuid4().hex}.tmp"
+    else:
+        target = p
+    # Escribimos usando fsspec directamente (local o gs://)
+    with fs.open(target, "wb") as f:  # type: ignore
+        pq.write_table(arrow_table, f, compression=compression, write_statistics=True)
+    if target != p:
+        fs.mv(target, p)  # type: ignore
+    if catalog:
+        from .catalog import record_write
+
+        record_write(p, arrow_table, fs)
+    if mode == "replace" and dedupe_key:
+        _supersede_append_files(fs, p, arrow_table, dedupe_key, schema, compression, catalog)
     return p
 
 
+APPEND_FILE_RE = re.compile(r"^part-[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.parquet$")
+
+
+def _decoded_keys(table, key: list[str]):
+    """Columnas ``key`` con los diccionarios decodificados (el hash join no los admite)."""
+    import pyarrow as pa
+
+    cols = []
+    for name in key:
+        col = table.column(name)
+        cols.append(col.cast(col.type.value_type) if pa.types.is_dictionary(col.type) else col)
+    return pa.table(cols, names=key)
+
+
+def _supersede_append_files(fs, path: str, table, key: list[str], schema=None, compression="zstd", catalog=False):
+    """Quita de los ``part-<uuid>`` del día de ``path`` las filas con clave presente en ``table``.
+
+    Los ficheros que se quedan sin filas se borran y el resto se reescribe de
+    forma atómica. Las filas de otras claves (otro dataset de la misma tabla) se
+    conservan. Devuelve (ficheros borrados, reescritos).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    parent = path.rsplit("/", 1)[0]
+    try:
+        names = [n.rsplit("/", 1)[-1] for n in fs.ls(parent, detail=False)]  # type: ignore
+    except FileNotFoundError:
+        return 0, 0
+    if not any(APPEND_FILE_RE.match(n) for n in names):
+        return 0, 0
+    from .schemas import conform_table
+
+    new_keys = _decoded_keys(table, key)
+    removed = rewritten = 0
+    for name in sorted(n for n in names if APPEND_FILE_RE.match(n)):
+        old_path = f"{parent}/{name}"
+        with fs.open(old_path, "rb") as f:  # type: ignore
+            old = pq.read_table(f)
+        if schema is not None:
+            old = conform_table(old, schema)
+        if not set(key).issubset(old.column_names):
+            continue
+        old_keys = _decoded_keys(old, key).append_column("__row", pa.array(range(old.num_rows), pa.int64()))
+        keep = old_keys.join(new_keys, keys=key, join_type="left anti").column("__row")
+        if len(keep) == old.num_rows:
+            continue
+        if len(keep) == 0:
+            fs.rm(old_path)  # type: ignore
+            removed += 1
+            if catalog:
+                from .catalog import record_remove
+
+                record_remove(old_path)
+            continue
+        kept = old.take(keep.take(pc.sort_indices(keep)))  # orden original
+        tmp = f"{parent}/.{name}.{uuid.uuid4().hex}.tmp"
+        with fs.open(tmp, "wb") as f:  # type: ignore
+            pq.write_table(kept, f, compression=compression, write_statistics=True)
+        fs.mv(tmp, old_path)  # type: ignore
+        rewritten += 1
+        if catalog:
+            from .catalog import record_write
+
+            record_write(old_path, kept, fs)
+    return removed, rewritten
+
+
+def _merge_tables(existing, new, key: list[str], schema=None):
+    """Une ``existing`` + ``new`` y deduplica por ``key`` quedándose con la última fila."""
+    import pyarrow as pa
+
+    combined = pa.concat_tables([existing, new], promote_options="none" if schema is not None else "default")
+    if not key:
+        return combined
+    merged = dedupe_table(combined, key, sort=True)
+    if schema is not None:
+        from .schemas import conform_table
+
+        merged = conform_table(merged, schema)
+    return merged
+
+
+def split_by_local_day(df: pd.DataFrame, ts_col: str):
+    """Itera (día_local, sub_df) según el día local de ``ts_col`` (rangos int64 del calendario)."""
+    if df is None or df.empty or ts_col not in df.columns:
+        return
+    ordinals = local_day_ordinals(df[ts_col])
+    order = np.argsort(ordinals, kind="stable")
+    days, starts = np.unique(ordinals[order], return_index=True)
+    ends = list(starts[1:]) + [len(order)]
+    for ordinal, lo, hi in zip(days, starts, ends):
+        if ordinal < 0:
+            continue  # timestamps nulos
+        yield date.fromordinal(int(ordinal)), df.iloc[order[lo:hi]]
+
+
 def dedupe(df: pd.DataFrame, key: list[str]) -> pd.DataFrame:
     if df.empty:
         return df
-    return df.sort_values(by=key).drop_duplicates(subset=key, keep="last")
+    return df.sort_values(by=key, kind="stable").drop_duplicates(subset=key, keep="last")
+
+
+def _key_codes(table, key: list[str]):
+    """Clave compuesta ``key`` como un único int64 que respeta el orden de los valores.
+
+    Cada columna se reduce a códigos densos (índice de diccionario rankeado por
+    valor, offset de timestamp/entero, o ``dictionary_encode``; los nulos van al
+    final) y se combinan en base mixta. Devuelve ``None`` si el producto de
+    cardinalidades no cabe en int64.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = table.unify_dictionaries()
+    combined = np.zeros(table.num_rows, dtype=np.int64)
+    total = 1
+    for k in key:
+        col = table.column(k).combine_chunks()
+        if col.null_count == 0 and (pa.types.is_integer(col.type) or pa.types.is_temporal(col.type)):
+            values = col.cast(pa.int64()).to_numpy()
+            lo = int(values.min())
+            codes, card = values - lo, int(values.max()) - lo + 1
+        else:
+            if not pa.types.is_dictionary(col.type):
+                col = pc.dictionary_encode(col)
+            card = len(col.dictionary) + 1  # +1: hueco para nulos
+            rank = np.empty(card, dtype=np.int64)
+            rank[pc.sort_indices(col.dictionary).to_numpy()] = np.arange(card - 1)
+            rank[-1] = card - 1
+            codes = rank[pc.fill_null(col.indices, card - 1).to_numpy()]
+        total *= card
+        if total >= 2**62:
+            return None
+        combined = combined * card + codes
+    return combined
+
+
+def dedupe_table(table, key: list[str], sort: bool = False):
+    """``dedupe`` sobre una tabla Arrow: última fila por ``key``, sin pasar por pandas.
+
+    Orden estable de la clave compuesta (``_key_codes``) y ``take`` de la última
+    fila de cada grupo. Con ``sort=True`` el resultado sale ordenado por ``key``
+    (como ``dedupe``); si no, conserva el orden original. Se mantienen los tipos
+    exactos (diccionarios, float32, timestamps) y, sin duplicados ni orden
+    pedido, se devuelve la misma tabla (buffers sin copiar).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not key or table.num_rows == 0:
+        return table
+    codes = _key_codes(table, key)
+    if codes is None:  # clave demasiado ancha: group_by de Arrow
+        row = "__row_index__"
+        keys = table.select(key).append_column(row, pa.array(np.arange(table.num_rows, dtype=np.int64)))
+        last = keys.group_by(key, use_threads=False).aggregate([(row, "max")]).column(f"{row}_max")
+        deduped = table if len(last) == table.num_rows else table.take(last.take(pc.array_sort_indices(last)))
+        return sort_table(deduped, key) if sort else deduped
+    order = np.argsort(codes, kind="stable")
+    ordered = codes[order]
+    is_last = np.empty(len(order), dtype=bool)
+    np.not_equal(ordered[1:], ordered[:-1], out=is_last[:-1])
+    is_last[-1] = True
+    keep = order[is_last]
+    if sort:
+        return table.take(pa.array(keep))
+    if len(keep) == table.num_rows:
+        return table
+    return table.take(pa.array(np.sort(keep)))
+
+
+def sort_table(table, key: list[str]):
+    """Orden estable por ``key``; las columnas diccionario se ordenan por su valor."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    codes = _key_codes(table, key)
+    if codes is not None:
+        return table.take(pa.array(np.argsort(codes, kind="stable")))
+    cols = [
+        c.dictionary_decode() if pa.types.is_dictionary(c.type) else c
+        for c in (table.column(k).combine_chunks() for k in key)
+    ]
+    order = pc.sort_indices(pa.table(cols, names=key), [(k, "ascending") for k in key])
+    return table.take(order)
+
+
+TS_COLUMNS = ("hour_ts", "minute_ts")
+EPOCH_UNIT = "ms"
+
+
+def curated_dtypes(cfg: dict, ds: dict | None = None) -> dict:
+    """Tipos del curated: ``defaults.curated_dtypes`` con override por dataset."""
+    out = dict(cfg.get("defaults", {}).get("curated_dtypes") or {})
+    out.update((ds or {}).get("curated_dtypes") or {})
+    return out
+
+
+def apply_curated_dtypes(df: pd.DataFrame, dtypes: dict | None) -> pd.DataFrame:
+    """Dimensiones como ``category`` y potencias opcionalmente en float32 (en memoria)."""
+    if df is None or df.empty or not dtypes:
+        return df
+    casts = {}
+    for c in dtypes.get("categorical") or []:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            casts[c] = "category"
+    for c in dtypes.get("float32") or []:
+        if c in df.columns and df[c].dtype != np.float32:
+            casts[c] = np.float32
+    return df.astype(casts) if casts else df
+
+
+def to_storage_frame(df: pd.DataFrame, dtypes: dict | None) -> pd.DataFrame:
+    """Frame tal y como se escribe a Parquet (``epoch_ts``: timestamps como int64 epoch UTC)."""
+    df = apply_curated_dtypes(df, dtypes)
+    if df is None or df.empty or not (dtypes or {}).get("epoch_ts"):
+        return df
+    df = df.copy()
+    for c in TS_COLUMNS:
+        if c in df.columns and pd.api.types.is_datetime64_any_dtype(df[c]):
+            ts = pd.to_datetime(df[c], utc=True).dt.as_unit(EPOCH_UNIT)
+            df[c] = pd.arrays.IntegerArray(ts.array.asi8, mask=ts.isna().to_numpy())
+    return df
+
+
+def cast_curated_table(table, dtypes: dict | None):
+    """Equivalente Arrow de ``to_storage_frame`` para tablas leídas de Parquet (compactación).
+
+    Unifica ficheros antiguos (strings/float64/timestamps) y nuevos antes de concatenar.
+    """
+    import pyarrow as pa
+
+    if not dtypes:
+        return table
+    categorical = set(dtypes.get("categorical") or [])
+    float32 = set(dtypes.get("float32") or [])
+    dict_type = pa.dictionary(pa.int32(), pa.string())
+    for i, field in enumerate(table.schema):
+        col = table.column(i)
+        if field.name in categorical and field.type != dict_type:
+            col = col.cast(dict_type)
+        elif field.name in float32 and field.type != pa.float32():
+            col = col.cast(pa.float32())
+        elif field.name in TS_COLUMNS and dtypes.get("epoch_ts") and pa.types.is_timestamp(field.type):
+            col = col.cast(pa.timestamp(EPOCH_UNIT, tz="UTC")).cast(pa.int64())
+        else:
+            continue
+        table = table.set_column(i, field.name, col)
+    return table
@@ -0,0 +1,83 @@
+"""Marcas de agua (high-water marks) por dataset e indicador.
+
+Guardan el último ``datetime`` (UTC) ingerido de cada indicador en
+``{root|bucket}/state/watermarks/<dataset>.json``. Con la estrategia de ventana
+``watermark`` la siguiente ejecución solo pide datos posteriores a la marca
+(menos un pequeño solape configurable), y tras un fallo recupera desde ahí en
+lugar de perder horas.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .utils import read_json, write_json_atomic
+
+
+def watermark_path(cfg: dict, dataset: str, local: bool = False) -> str:
+    if local:
+        root = cfg.get("paths_local", {}).get("root", "./data")
+    else:
+        root = cfg["paths"]["bucket"]
+    return f"{root}/state/watermarks/{dataset}.json"
+
+
+class WatermarkStore:
+    def __init__(self, path: str, dataset: str):
+        self.path = path
+        self.dataset = dataset
+        self.marks: dict[str, datetime] = {}
+
+    def load(self) -> dict[str, datetime]:
+        data = read_json(self.path, default={})
+        self.marks = {
+            k: datetime.fromisoformat(v.replace("Z", "+00:00"))
+            for k, v in data.get("indicators", {}).items()
+        }
+        return self.marks
+
+    def window_start(self, indicator_ids, stale_before: datetime | None = None) -> datetime | None:
+        """Marca más antigua entre los indicadores con marca (None si ninguno la tiene).
+
+        Un indicador nuevo (sin marca) no deja el dataset en el fallback para
+        siempre: entra con la ventana de los demás. Con ``stale_before`` se
+        ignoran las marcas anteriores a ese instante (indicador rezagado que no
+        publica) para que uno solo no fije el inicio en ``max_hours`` atrás; si
+        todas son anteriores se usa la más antigua.
+        """
+        marks = [m for m in (self.marks.get(str(i)) for i in indicator_ids) if m is not None]
+        if not marks:
+            return None
+        if stale_before is not None:
+            fresh = [m for m in marks if m >= stale_before]
+            marks = fresh or marks
+        return min(marks)
+
+    def advance(self, dfs_by_id) -> dict[str, datetime]:
+        """Avanza (nunca retrocede) la marca de cada indicador con el máximo datetime recibido."""
+        changed = False
+        for ind, df in dfs_by_id.items():
+            if df is None or df.empty or "datetime" not in df.columns:
+                continue
+            latest = pd.to_datetime(df["datetime"], utc=True, errors="coerce").max()
+            if pd.isna(latest):
+                continue
+            latest = latest.to_pydatetime().astimezone(timezone.utc)
+            prev = self.marks.get(str(ind))
+            if prev is None or latest > prev:
+                self.marks[str(ind)] = latest
+                changed = True
+        if changed:
+            write_json_atomic(
+                self.path,
+                {
+                    "dataset": self.dataset,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                    "indicators": {
+                        k: v.isoformat().replace("+00:00", "Z") for k, v in sorted(self.marks.items())
+                    },
+                },
+            )
+        return self.marks
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""Benchmark de dedupe en compactación: pandas (ruta anterior) vs Arrow (dedupe_table).
+
+Genera un mes sintético de gen_mix (minuto x tecnología, esquema del registro)
+con una fracción de filas repetidas (re-ingestas) y compara:
+    pandas  table.to_pandas() -> drop_duplicates(keep="last") -> from_pandas -> conform_table
+    arrow   dedupe_table (clave int64 compuesta + argsort estable + take), sin salir de Arrow
+
+Uso:
+    python scripts/bench_dedupe.py [--days 31] [--dup-frac 0.2] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from pipelines.ingest.compact import pick_dedupe_keys, pick_sort_keys  # noqa: E402
+from pipelines.ingest.main import load_cfg  # noqa: E402
+from pipelines.ingest.schemas import conform_table, table_schema  # noqa: E402
+from pipelines.ingest.utils import dedupe_table  # noqa: E402
+
+
+def synthetic_month(cfg, days: int, dup_frac: float, seed: int = 0):
+    """Tabla gen_mix ordenada por minute_ts con ``dup_frac`` filas duplicadas."""
+    rng = np.random.default_rng(seed)
+    techs = list(cfg["datasets"]["gen_mix"]["normalize"]["tech_map"].values())
+    ts = pd.date_range("2025-01-01", periods=days * 1440, freq="min", tz="Europe/Madrid")
+    n = len(ts) * len(techs)
+    df = pd.DataFrame(
+        {
+            "minute_ts": np.repeat(ts, len(techs)),
+            "tech": np.tile(techs, len(ts)),
+            "mw": rng.random(n) * 1000,
+            "zone": "Península",
+        }
+    )
+    df["mw_total"] = df.groupby("minute_ts")["mw"].transform("sum")
+    df["pct"] = df["mw"] / df["mw_total"]
+    dups = df.sample(frac=dup_frac, random_state=seed).assign(mw=lambda d: d["mw"] + 1)
+    df = pd.concat([df, dups], ignore_index=True)
+    table = conform_table(pa.Table.from_pandas(df, preserve_index=False), table_schema(cfg, "gen_mix"))
+    return table.sort_by([(k, "ascending") for k in pick_sort_keys(table.schema.names)])
+
+
+def dedupe_pandas(table, keys, schema):
+    pdf = table.to_pandas().drop_duplicates(subset=keys, keep="last")
+    return conform_table(pa.Table.from_pandas(pdf, preserve_index=False), schema)
+
+
+def timed(fn, repeat: int):
+    times, out = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--dup-frac", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cfg = load_cfg(str(ROOT / "config" / "ingest.yaml"))
+    schema = table_schema(cfg, "gen_mix")
+    table = synthetic_month(cfg, args.days, args.dup_frac)
+    keys = pick_dedupe_keys(table.schema.names)
+    print(f"filas={table.num_rows:,} claves={keys} tamaño={table.nbytes / 2**20:.1f} MiB")
+
+    t_pd, out_pd = timed(lambda: dedupe_pandas(table, keys, schema), args.repeat)
+    base = pa.total_allocated_bytes()
+    t_pa, out_pa = timed(lambda: dedupe_table(table, keys), args.repeat)
+    assert out_pa.equals(out_pd), "resultados distintos"
+    print(f"pandas: {t_pd:8.1f} ms  -> {out_pd.num_rows:,} filas")
+    print(f"arrow:  {t_pa:8.1f} ms  -> {out_pa.num_rows:,} filas  (x{t_pd / t_pa:.1f})")
+    print(f"arrow: memoria Arrow retenida por el resultado {(pa.total_allocated_bytes() - base) / 2**20:.1f} MiB")
+    print(f"tipos conservados: {out_pa.schema.equals(schema, check_metadata=False)}")
+
+    t_nd, same = timed(lambda: dedupe_table(out_pa, keys), args.repeat)
+    print(f"arrow sin duplicados: {t_nd:8.1f} ms, misma tabla (sin copia): {same is out_pa}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""Benchmark de arranque del contenedor (tiempo hasta la primera petición).
+
+Mide, en intérpretes nuevos, el tiempo de pared de cada escenario (mediana de
+``--repeat`` ejecuciones) y desglosa los imports con ``python -X importtime``.
+
+Escenarios:
+    entrypoint     entrypoint.py sin argumentos (solo dispatch)
+    ingest_help    entrypoint.py ingest --help
+    import_main    import pipelines.ingest.main
+    first_request  lo que se carga antes de la primera llamada a ESIOS
+                   (main + cliente HTTP + parseo de payload)
+
+Uso:
+    python scripts/bench_startup.py [--repeat 5] [--top 10] [--json out.json] [--budget-ms 1500]
+
+Con ``--budget-ms`` sale con código 1 si ``first_request`` supera el presupuesto
+(útil en CI para que el arranque no se degrade).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+FIRST_REQUEST = (
+    "from pipelines.ingest.main import _lazy, build_client, load_cfg; "
+    "build_client(load_cfg()); _lazy('normalize')"
+)
+
+SCENARIOS = {
+    "entrypoint": ["entrypoint.py"],
+    "ingest_help": ["entrypoint.py", "ingest", "--help"],
+    "import_main": ["-c", "import pipelines.ingest.main"],
+    "first_request": ["-c", FIRST_REQUEST],
+}
+
+
+def _run(args: list[str], importtime: bool = False) -> tuple[float, str]:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + args
+    env = dict(os.environ, ESIOS_TOKEN=os.environ.get("ESIOS_TOKEN", "bench"))
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise SystemExit(f"{' '.join(args)} falló ({proc.returncode}):\n{proc.stderr}")
+    return elapsed, proc.stderr
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Filas (módulo, self_us, cumulative_us) de ``-X importtime``."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cum_us, name = line.split("|", 2)
+        self_us = head.split(":", 1)[1]
+        rows.append((name.strip(), int(self_us), int(cum_us)))
+    return rows
+
+
+def bench(name: str, args: list[str], repeat: int, top: int) -> dict:
+    walls = [_run(args)[0] for _ in range(repeat)]
+    _elapsed, stderr = _run(args, importtime=True)
+    rows = parse_importtime(stderr)
+    # Coste propio agregado por paquete raíz (pandas, pyarrow, requests...)
+    by_package: dict[str, int] = {}
+    for module, self_us, _cum in rows:
+        root = module.split(".")[0]
+        by_package[root] = by_package.get(root, 0) + self_us
+    return {
+        "scenario": name,
+        "wall_ms_median": round(statistics.median(walls), 1),
+        "wall_ms_min": round(min(walls), 1),
+        "import_ms": round(sum(by_package.values()) / 1000, 1),
+        "modules": len(rows),
+        "top": [
+            {"package": p, "self_ms": round(us / 1000, 1)}
+            for p, us in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:top]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Ejecuciones por escenario")
+    parser.add_argument("--top", type=int, default=10, help="Imports más caros a mostrar")
+    parser.add_argument("--only", nargs="*", choices=sorted(SCENARIOS), help="Escenarios a medir")
+    parser.add_argument("--json", help="Escribe el informe JSON en esta ruta")
+    parser.add_argument("--budget-ms", type=float, help="Presupuesto para first_request (mediana)")
+    args = parser.parse_args()
+
+    names = args.only or list(SCENARIOS)
+    report = [bench(n, SCENARIOS[n], max(1, args.repeat), args.top) for n in names]
+
+    for r in report:
+        print(
+            f"\n{r['scenario']}: wall {r['wall_ms_median']} ms (min {r['wall_ms_min']}), "
+            f"imports {r['import_ms']} ms, {r['modules']} módulos"
+        )
+        for t in r["top"]:
+            print(f"  {t['self_ms']:>8.1f} ms  {t['package']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "scenarios": report}, f, indent=2)
+
+    first = next((r for r in report if r["scenario"] == "first_request"), None)
+    if args.budget_ms and first and first["wall_ms_median"] > args.budget_ms:
+        print(f"\nfirst_request {first['wall_ms_median']} ms > presupuesto {args.budget_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
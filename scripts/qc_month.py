@@ -12,6 +12,11 @@ Notas:
     - Si el mes no existe se imprime NO_EXISTE y se sale con código 0 (gracia) para no marcar Job como fallo temprano.
     - Para detectar duplicados se usan claves heurísticas si están presentes.
     - Requiere fsspec/gcsfs instalados para modo GCS.
+    - Se leen los ficheros vivos del mes según ``_manifest.json`` (compact publicados +
+      micro-files aún no plegados, ver ``manifest.live_dataset``), así cada fila se cuenta
+      una sola vez antes y después de compactar, también en días reescritos tras plegarlos.
+    - Con el catálogo de la tabla (``_catalog.json`` completo) no se lista el mes: los
+      micro-files salen del shard del mes y se imprime ``CATALOG_ROWS`` para cruzarlo con lo leído.
 """
 from __future__ import annotations
 
@@ -19,6 +24,7 @@ import argparse
 import os
 import sys
 from collections import defaultdict
+from pathlib import Path
 from typing import Iterable
 
 try:  # fsspec es opcional; sólo necesario en modo gcs
@@ -33,9 +39,29 @@ except ImportError as e:  # pragma: no cover
     sys.exit(1)
 
 try:
-    import pyarrow.parquet as pq
-except ImportError:
-    pq = None  # type: ignore
+    import pyarrow as pa
+except ImportError as e:  # pragma: no cover
+    print(f"ERROR: requiere pyarrow: {e}")
+    sys.exit(1)
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from pipelines.ingest.catalog import (  # noqa: E402
+    catalog_months,
+    month_mtimes,
+    read_catalog,
+    read_month,
+)
+from pipelines.ingest.manifest import (  # noqa: E402
+    TS_COLUMNS,
+    live_dataset,
+    live_files,
+    local_days,
+    month_file_mtimes,
+    month_relpath,
+)
 
 
 def pick_pk(cols: set[str]) -> list[str]:
@@ -61,89 +87,81 @@ def main():
     ap.add_argument("--gcs-root", default="", help="Raíz GCS gs://bucket (si se indica se ignora --local-root)")
     args = ap.parse_args()
     use_gcs = bool(args.gcs_root)
-    parquet_files: list[str] = []
-
-    if use_gcs:
-        if fsspec is None:
-            print("ERROR: fsspec/gcsfs no disponibles para modo GCS", file=sys.stderr)
-            sys.exit(1)
-        fs = fsspec.filesystem("gcs")  # rely on ADC or env creds
-        # Construimos prefijo
-        month_prefix = f"{args.gcs_root.rstrip('/')}/curated/{args.table}/year={args.year}/month={args.month}/"
-        if not fs.exists(month_prefix):
-            print(f"NO_EXISTE: {month_prefix}")
+
+    if use_gcs and fsspec is None:
+        print("ERROR: fsspec/gcsfs no disponibles para modo GCS", file=sys.stderr)
+        sys.exit(1)
+    root = args.gcs_root.rstrip('/') if use_gcs else args.local_root
+    table_root = f"{root}/curated/{args.table}"
+    month_path = f"{table_root}/year={args.year}/month={args.month}"
+    catalog = read_catalog(table_root)
+    if catalog and catalog.get("complete"):
+        # Catálogo completo: ficheros del mes sin listar el bucket
+        source = "catalog"
+        year, month = int(args.year), int(args.month)
+        if (year, month) not in catalog_months(catalog):
+            print(f"NO_EXISTE: {month_path}")
+            sys.exit(0)
+        shard = read_month(month_path) or {}
+        mtimes = month_mtimes(shard)
+        parquet_files = live_files(month_path, mtimes)
+    else:
+        source = "listing"
+        if use_gcs:
+            fs = fsspec.filesystem("gcs")  # rely on ADC or env creds
+            exists = fs.exists(month_path + "/")
+        else:
+            exists = os.path.isdir(month_path)
+        if not exists:
+            print(f"NO_EXISTE: {month_path}")
             sys.exit(0)
-        # Listado recursivo
+        # Ficheros vivos: compact del manifest + micro-files pendientes (sin contar dos veces)
         try:
-            for path in fs.find(month_prefix):  # devuelve lista de todos los paths
-                if path.endswith('.parquet') and not path.endswith('compact.parquet'):
-                    parquet_files.append(f"gs://{path}" if not path.startswith('gs://') else path)
+            mtimes = month_file_mtimes(month_path)
+            parquet_files = live_files(month_path, mtimes)
         except FileNotFoundError:
-            print(f"NO_EXISTE: {month_prefix}")
-            sys.exit(0)
-    else:
-        month_path = os.path.join(args.local_root, "curated", args.table, f"year={args.year}", f"month={args.month}")
-        if not os.path.isdir(month_path):
             print(f"NO_EXISTE: {month_path}")
             sys.exit(0)
-        for root, _dirs, files in os.walk(month_path):
-            for f in files:
-                if f.endswith('.parquet') and f != 'compact.parquet':
-                    parquet_files.append(os.path.join(root, f))
 
     if not parquet_files:
         print("SIN_FICHEROS")
         sys.exit(0)
 
+    # Filas vivas del mes una sola vez (días reescritos tras plegar incluidos)
+    dataset = live_dataset(month_path, mtimes=mtimes)
     day_counts = defaultdict(int)
     pk_dupes = 0
     pk_total = 0
     total_rows = 0
 
-    # Determinar primary key dinámica una sola vez con el primer fichero
-    first_df = pd.read_parquet(parquet_files[0])
-    pk = pick_pk(set(first_df.columns))
-    if pk:
-        # Construir set de keys ya vistas
-        seen = set()
-        for file in parquet_files:
-            df = pd.read_parquet(file, columns=pk)
-            total_rows += len(df)  # este total provisional si solo columnas pk
-            for row in df.itertuples(index=False):
-                pk_total += 1
-                key = tuple(row)
-                if key in seen:
-                    pk_dupes += 1
-                else:
-                    seen.add(key)
-        # Necesitamos total real de filas, no sólo PK (pero ya contamos len(df) que == filas)
-    else:
-        # Releer con filas completas agrupando por día y contando
-        total_rows = 0
-        pk_total = 0
-        for file in parquet_files:
-            df = pd.read_parquet(file)
-            total_rows += len(df)
-            # Intento extraer day del path: .../day=DD/
-            parts = file.replace('\\', '/').split('/')
-            day = next((p.split('=')[1] for p in parts if p.startswith('day=')), None)
-            if day:
-                day_counts[day] += len(df)
+    pk = pick_pk(set(dataset.schema.names))
+    ts_col = next((c for c in TS_COLUMNS if c in dataset.schema.names), None)
+    columns = list(dict.fromkeys(pk + ([ts_col] if ts_col else [])))
+    seen = set()
+    for batch in dataset.to_batches(columns=columns or None):
+        total_rows += batch.num_rows
+        days = local_days(pa.Table.from_batches([batch]), ts_col) if ts_col else None
+        if days is not None:
+            for day, n in pd.Series(days.to_pylist()).value_counts().items():
+                day_counts[day] += int(n)
+        if not pk:
+            continue
+        for row in batch.select(pk).to_pandas().itertuples(index=False):
+            pk_total += 1
+            key = tuple(row)
+            if key in seen:
+                pk_dupes += 1
+            else:
+                seen.add(key)
+    if not pk:
         pk_dupes = -1  # señal de 'no calculado'
 
-    # Si calculamos pk con sólo columnas pk, obtener day_counts ahora
-    if pk:
-        for file in parquet_files:
-            parts = file.replace('\\', '/').split('/')
-            day = next((p.split('=')[1] for p in parts if p.startswith('day=')), None)
-            if day:
-                # necesitamos leer cantidad real de filas; usamos el truco de contar con pk ya leído (mismo len)
-                # sumamos de nuevo separadamente para day_counts
-                df_rows = len(pd.read_parquet(file, columns=pk))
-                day_counts[day] += df_rows
-
     print(f"TABLE={args.table} YEAR={args.year} MONTH={args.month}")
-    print(f"FILES={len(parquet_files)} ROWS_TOTAL={total_rows}")
+    print(f"FILES={len(parquet_files)} ROWS_TOTAL={total_rows} SOURCE={source}")
+    if source == "catalog":
+        entries = [(shard.get("files") or {}).get(month_relpath(f)) for f in parquet_files]
+        catalog_rows = sum(e["rows"] for e in entries if e) if all(entries) else "NA"
+        print(f"CATALOG_ROWS={catalog_rows}")
     if pk:
         pct = (pk_dupes / pk_total * 100) if pk_total else 0
         print(f"PK={'+'.join(pk)} DUPES={pk_dupes} ({pct:.3f}% de {pk_total})")
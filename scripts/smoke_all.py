@@ -1,41 +1,15 @@
 import argparse
 import os
-import subprocess
 import sys
+from datetime import date
 from pathlib import Path
 
-import yaml
-
 ROOT = Path(__file__).resolve().parents[1]
-MAIN = ROOT / "pipelines" / "ingest" / "main.py"
 CFG = ROOT / "config" / "ingest.yaml"
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-
-def load_cfg():
-    with open(CFG, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-
-
-def run_dataset(ds_name: str, target_date: str | None, extra_env: dict | None) -> tuple[str, int, str]:
-    cmd = [sys.executable, str(MAIN), ds_name, "--local"]
-    if target_date:
-        cmd += ["--target-date", target_date]
-    env = os.environ.copy()
-    if extra_env:
-        env.update(extra_env)
-    try:
-        print(f"\n=== Running {ds_name} ===")
-        proc = subprocess.run(cmd, capture_output=True, text=True, env=env, cwd=str(ROOT))
-        print(proc.stdout)
-        if proc.returncode != 0:
-            print(proc.stderr, file=sys.stderr)
-        tail = ""
-        if proc.stdout:
-            lines = [l for l in proc.stdout.splitlines() if l.strip()]
-            tail = lines[-1] if lines else ""
-        return ds_name, proc.returncode, tail
-    except Exception as e:
-        return ds_name, 1, str(e)
+from pipelines.ingest.main import load_cfg, run_datasets, schedule_datasets  # noqa: E402
 
 
 def main():
@@ -45,28 +19,29 @@ def main():
     parser.add_argument("--auth-mode", choices=["x-api-key", "authorization", "both"], help="Forzar cabeceras ESIOS")
     args = parser.parse_args()
 
-    cfg = load_cfg()
-    datasets = [name for name, ds in cfg.get("datasets", {}).items() if ds.get("enabled", True)]
+    # Antes de construir el cliente: lo lee EsiosClient
+    if args.auth_mode:
+        os.environ["ESIOS_AUTH_MODE"] = args.auth_mode
+
+    # Un único proceso: config, cliente HTTP y fsspec compartidos entre datasets.
+    # paths_local es relativo a la raíz del repo
+    os.chdir(ROOT)
+    cfg = load_cfg(str(CFG))
+    datasets = schedule_datasets(cfg)
     if args.only:
         allow = set(args.only)
         datasets = [d for d in datasets if d in allow]
 
-    extra_env = {}
-    if args.auth_mode:
-        extra_env["ESIOS_AUTH_MODE"] = args.auth_mode
-
-    results = []
-    for ds_name in datasets:
-        ds, rc, tail = run_dataset(ds_name, args.target_date, extra_env)
-        results.append((ds, rc, tail))
+    td = date.fromisoformat(args.target_date) if args.target_date else None
+    results = run_datasets(datasets, "local", cfg=cfg, target_date=td)
 
     print("\n===== RESUMEN =====")
-    for ds, rc, tail in results:
-        status = "OK" if rc == 0 else f"FAIL({rc})"
-        print(f"- {ds}: {status} | {tail}")
+    for r in results:
+        status = "OK" if r["status"] != "error" else "FAIL"
+        detail = r.get("error") or f"{r['status']} raw={r['raw_rows']} curated={r['curated_rows']}"
+        print(f"- {r['dataset']}: {status} | {detail}")
 
-    any_fail = any(rc != 0 for _, rc, _ in results)
-    sys.exit(1 if any_fail else 0)
+    sys.exit(1 if any(r["status"] == "error" for r in results) else 0)
 
 
 if __name__ == "__main__":
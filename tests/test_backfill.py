@@ -0,0 +1,104 @@
+import glob
+from datetime import date
+
+import pandas as pd
+
+from pipelines.ingest.main import load_cfg, run_backfill_range
+from pipelines.ingest.planner import plan_backfill
+
+
+class HourlyFakeClient:
+    """Genera un valor por hora (UTC) dentro de la ventana pedida."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_indicator(self, ind, start, end, base_url, time_trunc="hour"):
+        self.calls += 1
+        freq = "min" if time_trunc == "minute" else "h"
+        idx = pd.date_range(start, end, freq=freq, inclusive="left")
+        values = [
+            {"datetime": ts.isoformat(), "value": float(i), "geo_name": "España", "geo_id": 3}
+            for i, ts in enumerate(idx)
+        ]
+        return {"indicator": {"values": values}}
+
+
+def local_cfg(tmp_path):
+    cfg = load_cfg()
+    cfg["paths_local"]["root"] = str(tmp_path)
+    cfg["defaults"]["backoff_seconds"] = 0
+    return cfg
+
+
+def test_plan_backfill_respects_month_and_caps():
+    chunks = plan_backfill(date(2024, 1, 20), date(2024, 3, 5), "hour")
+    assert [(c.first_day, c.last_day) for c in chunks] == [
+        (date(2024, 1, 20), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 3, 1), date(2024, 3, 5)),
+    ]
+    minute = plan_backfill(date(2024, 1, 1), date(2024, 1, 31), "minute")
+    assert max(c.days for c in minute) <= 7
+
+
+def test_backfill_range_splits_by_local_day(tmp_path):
+    cfg = local_cfg(tmp_path)
+    client = HourlyFakeClient()
+    # Incluye el cambio de hora de marzo (23h) en Europe/Madrid
+    stats = run_backfill_range(
+        client, cfg, "prices_spot", date(2024, 3, 29), date(2024, 4, 2), local=True
+    )
+    assert stats["days"] == 5 and stats["chunks"] == 2
+    assert client.calls == 2
+    files = sorted(glob.glob(f"{tmp_path}/curated/prices/**/*.parquet", recursive=True))
+    assert len(files) == 5
+    rows = {f.split("day=")[1][:2]: len(pd.read_parquet(f)) for f in files}
+    assert rows == {"29": 24, "30": 24, "31": 23, "01": 24, "02": 24}
+
+
+def test_parallel_backfill_resumes_from_checkpoint(tmp_path, monkeypatch):
+    from pipelines.ingest import backfill
+
+    cfg = local_cfg(tmp_path)
+    clients = []
+
+    def fake_build_client(_cfg):
+        clients.append(HourlyFakeClient())
+        clients[-1].close = lambda: None
+        return clients[-1]
+
+    monkeypatch.setattr(backfill, "build_client", fake_build_client)
+    stats = backfill.run_backfill_parallel(
+        cfg, "prices_spot", date(2024, 1, 30), date(2024, 2, 2), local=True, workers=1
+    )
+    assert stats["days"] == 4 and stats["skipped_days"] == 0
+    ckpt = backfill.BackfillCheckpoint(backfill.checkpoint_path(cfg, "prices_spot", True), "prices_spot")
+    assert len(ckpt.load()) == 4
+    # Relanzar con un rango más amplio solo procesa los días nuevos
+    stats = backfill.run_backfill_parallel(
+        cfg, "prices_spot", date(2024, 1, 30), date(2024, 2, 4), local=True, workers=1
+    )
+    assert stats["skipped_days"] == 4 and stats["days"] == 2
+
+
+def test_resumed_chunk_skips_completed_days_in_between(tmp_path, monkeypatch):
+    from pipelines.ingest import backfill
+
+    cfg = local_cfg(tmp_path)
+    clients = []
+
+    def fake_build_client(_cfg):
+        clients.append(HourlyFakeClient())
+        clients[-1].close = lambda: None
+        return clients[-1]
+
+    monkeypatch.setattr(backfill, "build_client", fake_build_client)
+    ckpt = backfill.BackfillCheckpoint(backfill.checkpoint_path(cfg, "prices_spot", True), "prices_spot")
+    ckpt.mark([date(2024, 2, 2), date(2024, 2, 3)])
+    stats = backfill.run_backfill_parallel(
+        cfg, "prices_spot", date(2024, 2, 1), date(2024, 2, 5), local=True, workers=1
+    )
+    # Un chunk del planner con días hechos en medio: dos shards, sin repetir el 2 y el 3
+    assert (stats["days"], stats["skipped_days"], len(clients)) == (3, 2, 2)
+    assert len(ckpt.load()) == 5
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from pipelines.ingest.cache import ResponseCache, local_day_start_utc
+from pipelines.ingest.utils import now_utc
+
+
+def _iso(dt):
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def test_cache_skips_open_windows_and_serves_closed(tmp_path):
+    cache = ResponseCache(str(tmp_path), recent_days=3)
+    today = local_day_start_utc()
+    open_end = _iso(now_utc() + timedelta(hours=1))
+    old_end = _iso(today - timedelta(days=30))
+    payload = {"indicator": {"values": [{"value": 1}]}}
+    assert cache.put(600, "s", open_end, "hour", "es", payload) is False
+    assert cache.get(600, "s", open_end, "hour", "es") is None
+    assert cache.put(600, "s", old_end, "hour", "es", payload) is True
+    assert cache.get(600, "s", old_end, "hour", "es") == payload
+    assert cache.get(600, "s", old_end, "minute", "es") is None
+    assert cache.expires_at(old_end) is None
+    assert cache.expires_at(_iso(today - timedelta(hours=2))) is not None
+
+
+def test_cache_lru_eviction(tmp_path):
+    import os
+    import time
+
+    cache = ResponseCache(str(tmp_path), max_bytes=1)
+    end = _iso(local_day_start_utc() - timedelta(days=30))
+    cache.put(1, "a", end, "hour", "es", {"v": "x" * 100})
+    time.sleep(0.01)
+    cache.put(2, "a", end, "hour", "es", {"v": "y" * 100})
+    left = [f for _r, _d, fs in os.walk(tmp_path) for f in fs]
+    assert len(left) <= 1
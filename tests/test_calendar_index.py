@@ -0,0 +1,38 @@
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from pipelines.ingest.calendar_index import (
+    day_bounds_utc,
+    dst_days,
+    expected_hours,
+    expected_minutes,
+    local_day_mask,
+    local_day_ordinals,
+)
+
+
+def test_dst_days_and_expected_counts():
+    assert dst_days(2025) == [date(2025, 3, 30), date(2025, 10, 26)]
+    assert expected_hours(date(2025, 3, 30)) == 23
+    assert expected_hours(date(2025, 10, 26)) == 25
+    assert expected_minutes(date(2025, 6, 1)) == 1440
+    assert day_bounds_utc(date(2025, 3, 30)) == (
+        datetime(2025, 3, 29, 23, tzinfo=timezone.utc),
+        datetime(2025, 3, 30, 22, tzinfo=timezone.utc),
+    )
+
+
+def test_day_mask_and_ordinals_across_years():
+    ts = pd.Series(
+        pd.to_datetime(["2024-12-31T22:59Z", "2024-12-31T23:00Z", None, "2025-10-26T22:59Z"], utc=True)
+    ).dt.tz_convert("Europe/Madrid")
+    assert local_day_mask(ts, date(2025, 1, 1)).tolist() == [False, True, False, False]
+    assert [date.fromordinal(o) if o > 0 else None for o in local_day_ordinals(ts)] == [
+        date(2024, 12, 31),
+        date(2025, 1, 1),
+        None,
+        date(2025, 10, 26),
+    ]
+    naive = ts.dt.tz_localize(None)
+    assert local_day_mask(naive, date(2025, 1, 1)).tolist() == [False, True, False, False]
@@ -0,0 +1,477 @@
+import pandas as pd
+
+from pipelines.ingest.compact import read_month_dataset
+from pipelines.ingest.utils import to_storage_frame
+
+
+def _frame(mw):
+    ts = pd.date_range("2025-01-01", periods=2, freq="min", tz="Europe/Madrid")
+    return pd.DataFrame({"minute_ts": ts, "zone": ["Península"] * 2, "tech": ["eolica", "solar"], "mw": mw})
+
+
+def test_compact_unifies_legacy_and_typed_files(tmp_path):
+    dtypes = {"categorical": ["zone", "tech"], "float32": ["mw"], "epoch_ts": True}
+    day = tmp_path / "day=01"
+    day.mkdir()
+    _frame([1.0, 2.0]).to_parquet(day / "part-legacy.parquet", index=False)
+    to_storage_frame(_frame([3.0, 4.0]), dtypes).to_parquet(day / "part-typed.parquet", index=False)
+
+    table, rows, files = read_month_dataset(str(tmp_path), dtypes)
+    assert (rows, files) == (4, 2)
+    assert str(table.schema.field("mw").type) == "float"
+    assert str(table.schema.field("minute_ts").type) == "int64"
+    assert str(table.schema.field("tech").type).startswith("dictionary")
+    assert sorted(table.column("mw").to_pylist()) == [1.0, 2.0, 3.0, 4.0]
+    assert len(set(table.column("minute_ts").to_pylist())) == 2
+
+
+def test_writer_enforces_registry_schema_and_compaction_concats(tmp_path):
+    import pyarrow.parquet as pq
+
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    cfg = load_cfg()
+    schema = table_schema(cfg, "gen_mix")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    legacy = _frame([1.0, 2.0])  # sin mw_total/pct, strings y ns
+    legacy["minute_ts"] = legacy["minute_ts"].dt.as_unit("ns")
+    p1 = write_parquet_partitioned(legacy, tpl, "gen_mix", pd.Timestamp("2025-01-01").date(), {}, "local", schema)
+    typed = _frame([3.0, 4.0]).astype({"zone": "category", "tech": "category"})
+    typed["mw_total"], typed["pct"] = 7.0, typed["mw"] / 7.0
+    p2 = write_parquet_partitioned(typed, tpl, "gen_mix", pd.Timestamp("2025-01-02").date(), {}, "local", schema)
+
+    for p in (p1, p2):
+        assert pq.read_schema(p).remove_metadata().equals(schema)
+        assert pq.ParquetFile(p).metadata.row_group(0).column(0).compression == "ZSTD"
+    table, rows, files = read_month_dataset(str(tmp_path / "gen_mix/year=2025/month=01"), schema=schema)
+    assert (rows, files) == (4, 2) and table.schema.equals(schema)
+
+
+def test_streaming_compaction_matches_in_memory(tmp_path):
+    import glob
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from pipelines.ingest.compact import compact_month_streaming, sort_and_dedupe, split_by_day
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    schema = table_schema(load_cfg(), "gen_mix")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    for day in (3, 1, 2):
+        for mw in ([1.0, 2.0], [5.0, 6.0]):  # dos ficheros por día con las mismas claves
+            df = _frame(mw)
+            df["minute_ts"] += pd.Timedelta(days=day - 1)
+            write_parquet_partitioned(df, tpl, "gen_mix", df["minute_ts"][0].date(), {}, "local", schema)
+    month = str(tmp_path / "gen_mix/year=2025/month=01")
+
+    stats = compact_month_streaming(month, schema=schema, row_group_size=10)
+    assert (stats["days"], stats["micro_files"], stats["rows_final"], stats["dedup_removed"]) == (3, 6, 6, 6)
+    streamed = pq.read_table(stats["path"])
+    assert streamed.schema.remove_metadata().equals(schema)
+    assert pq.ParquetFile(stats["path"]).metadata.num_row_groups == 3  # un row group por día
+    assert not glob.glob(f"{month}/.compact*")
+
+    in_memory = [sort_and_dedupe(t)[0] for _day, t in split_by_day(read_month_dataset(month, schema=schema)[0])]
+    assert streamed.to_pandas().equals(pa.concat_tables(in_memory).to_pandas())
+    keys = streamed.select(["minute_ts", "tech"]).to_pylist()
+    assert len(keys) == len({tuple(k.values()) for k in keys}) == 6
+    # Dentro de cada día: primero la dimensión y después el timestamp
+    assert streamed.column("tech").to_pylist()[:2] == ["eolica", "solar"]
+
+
+def test_scheduler_caps_concurrency_per_filesystem():
+    import threading
+    import time
+
+    from pipelines.ingest.compact import run_scheduled
+
+    lock = threading.Lock()
+    active, peak = {}, {}
+
+    def job(fs, i):
+        with lock:
+            active[fs] = active.get(fs, 0) + 1
+            peak[fs] = max(peak.get(fs, 0), active[fs])
+        time.sleep(0.02)
+        with lock:
+            active[fs] -= 1
+        return i
+
+    jobs = [(f"gs://b/t/month={i}", ("gs", i)) for i in range(6)]
+    jobs += [(f"/data/t/month={i}", ("file", i)) for i in range(6)]
+    results = run_scheduled(jobs, job, workers=5, fs_limits={"gs": 3, "file": 1})
+    assert results == list(range(6)) * 2
+    assert peak == {"gs": 3, "file": 1}
+
+
+def test_parallel_compaction_merges_run_summary(tmp_path, monkeypatch, capfd):
+    import json
+    import sys
+
+    from pipelines.ingest import compact
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    cfg = load_cfg()
+    cfg["paths_local"]["root"] = str(tmp_path)
+    schema = table_schema(cfg, "gen_mix")
+    tpl = str(tmp_path) + "/curated/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    for month in ("2025-01", "2025-02", "2025-03"):
+        for _ in range(2):  # dos ficheros con las mismas claves
+            df = _frame([1.0, 2.0])
+            df["minute_ts"] = pd.date_range(f"{month}-01", periods=2, freq="min", tz="Europe/Madrid")
+            write_parquet_partitioned(df, tpl, "gen_mix", df["minute_ts"][0].date(), {}, "local", schema)
+    monkeypatch.setattr(compact, "load_cfg", lambda: cfg)
+    monkeypatch.setattr(sys, "argv", ["compact.py", "gen_mix", "--local", "--workers", "3", "--executor", "process"])
+    compact.main()
+
+    records = [json.loads(line) for line in capfd.readouterr().out.splitlines()]
+    assert sum(r["action"] == "post_stats" for r in records) == 3
+    summary = records[-1]
+    assert summary["action"] == "run_summary" and summary["executor"] == "process"
+    assert (summary["months_processed"], summary["months_failed"]) == (3, 0)
+    assert (summary["rows_final_total"], summary["dedup_removed_total"]) == (6, 6)
+    assert summary["tables"] == {"gen_mix": {"months": 3, "rows_final": 6, "dedup_removed": 6}}
+    assert len(list(tmp_path.glob("curated/gen_mix/year=2025/month=*/compact-*.parquet"))) == 3
+    assert len(list(tmp_path.glob("curated/gen_mix/year=2025/month=*/_manifest.json"))) == 3
+
+
+def test_incremental_compaction_folds_only_new_days(tmp_path):
+    import os
+
+    import pyarrow.parquet as pq
+
+    from pipelines.ingest.compact import compact_month_streaming, delete_micro_files
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.manifest import read_watermark
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    schema = table_schema(load_cfg(), "gen_mix")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    month = str(tmp_path / "gen_mix/year=2025/month=01")
+
+    def write_day(day, mw):
+        df = _frame(mw)
+        df["minute_ts"] += pd.Timedelta(days=day - 1)
+        path = write_parquet_partitioned(df, tpl, "gen_mix", df["minute_ts"][0].date(), {}, "local", schema)
+        wm = read_watermark(month) or 0
+        os.utime(path, (wm + 10, wm + 10))  # posterior al watermark aunque el reloj no avance
+
+    write_day(1, [1.0, 2.0])
+    write_day(2, [1.0, 2.0])
+    first = compact_month_streaming(month, schema=schema, incremental=True)
+    assert (first["days"], first["days_copied"], first["rows_final"]) == (2, 0, 4)
+    delete_micro_files(month)  # originales borrados: el compact es la única copia
+
+    write_day(2, [5.0, 6.0])  # re-ingesta del día 2
+    write_day(3, [7.0, 8.0])  # día nuevo
+    second = compact_month_streaming(month, schema=schema, incremental=True)
+    assert (second["micro_files"], second["days"], second["days_copied"]) == (2, 3, 1)
+    assert (second["rows_final"], second["dedup_removed"]) == (6, 2)
+    assert pq.read_table(second["path"]).column("mw").to_pylist() == [1.0, 2.0, 5.0, 6.0, 7.0, 8.0]
+
+    assert compact_month_streaming(month, schema=schema, incremental=True)["up_to_date"]
+    forced = compact_month_streaming(month, schema=schema, incremental=True, force=True)
+    assert forced["rows_final"] == 6  # --force no pierde los días ya plegados
+
+
+def test_compact_layout_splits_files_on_day_boundaries(tmp_path):
+    import pyarrow.parquet as pq
+
+    from pipelines.ingest.compact import compact_month_streaming, read_month_dataset
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.manifest import compact_paths, read_manifest
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    schema = table_schema(load_cfg(), "gen_mix")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    for day in (1, 2, 3):
+        ts = pd.date_range(f"2025-01-0{day}", periods=60, freq="min", tz="Europe/Madrid")
+        techs = ["eolica", "solar", "hidraulica"] * 60
+        df = pd.DataFrame({"minute_ts": ts.repeat(3), "zone": "Península", "tech": techs})
+        df["mw"] = range(len(df))
+        write_parquet_partitioned(df, tpl, "gen_mix", ts[0].date(), {}, "local", schema)
+    month = str(tmp_path / "gen_mix/year=2025/month=01")
+    layout = {"target_file_mb": 1e-6, "max_rows_per_page": 60, "bloom_filter_columns": ["tech"]}
+
+    stats = compact_month_streaming(month, schema=schema, layout=layout)
+    names = [p.rsplit("/", 1)[-1] for p in stats["paths"]]
+    assert [n[-14:] for n in names] == [f"-0000{i}.parquet" for i in range(3)]
+    assert read_manifest(month)["compact"] == names
+    for path in stats["paths"]:
+        md = pq.ParquetFile(path).metadata
+        rg = md.row_group(0)
+        assert (md.num_row_groups, rg.num_rows) == (1, 180)  # un día por fichero/row group
+        assert [schema.names[c.column_index] for c in rg.sorting_columns] == ["zone", "tech", "minute_ts"]
+        tech = rg.column(schema.names.index("tech"))
+        assert tech.has_column_index and tech.has_offset_index and tech.bloom_filter_length
+    assert read_month_dataset(month, schema=schema)[1:] == (540, 3)  # los compact no cuentan como micro-files
+
+    stats = compact_month_streaming(month, schema=schema, force=True)  # sin límite: un solo fichero
+    assert compact_paths(month) == stats["paths"] and len(stats["paths"]) == 1  # los tres anteriores, borrados
+
+
+def test_manifest_publishes_live_files_without_double_counting(tmp_path, monkeypatch):
+    import os
+
+    import pytest
+
+    from pipelines.ingest import compact
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.manifest import compact_paths, live_dataset, live_files, read_manifest
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    schema = table_schema(load_cfg(), "gen_mix")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    month = str(tmp_path / "gen_mix/year=2025/month=01")
+
+    def write_day(day, mw):
+        df = _frame(mw)
+        df["minute_ts"] += pd.Timedelta(days=day - 1)
+        path = write_parquet_partitioned(df, tpl, "gen_mix", df["minute_ts"][0].date(), {}, "local", schema)
+        os.utime(path, (2e9 + day, 2e9 + day))
+        return path
+
+    write_day(1, [1.0, 2.0])
+    write_day(2, [3.0, 4.0])
+    first = compact.compact_month_streaming(month, schema=schema)
+    manifest = read_manifest(month)
+    assert (manifest["generation"], manifest["rows"], len(manifest["folded"])) == (1, 4, 2)
+    # Originales aún presentes: los lectores del manifest solo leen el compact
+    assert live_files(month) == first["paths"]
+    assert live_dataset(month, schema).count_rows() == 4
+
+    pending = write_day(3, [5.0, 6.0])
+    assert live_files(month) == first["paths"] + [pending]
+    assert live_dataset(month, schema).count_rows() == 6
+    assert compact.delete_micro_files(month)["micro_files_deleted"] == 2  # el pendiente se conserva
+    assert os.path.exists(pending)
+
+    # Fallo a mitad: ni el manifest ni el compact publicado cambian
+    write_day_ok = compact.CompactWriter.write_day
+
+    def write_day_then_fail(self, table):
+        if self.rows:  # segundo día: ya hay un temporal a medio escribir
+            raise RuntimeError("boom")
+        write_day_ok(self, table)
+
+    monkeypatch.setattr(compact.CompactWriter, "write_day", write_day_then_fail)
+    with pytest.raises(RuntimeError):
+        compact.compact_month_streaming(month, schema=schema, incremental=True)
+    assert read_manifest(month) == manifest and compact_paths(month) == first["paths"]
+    assert not [n for n in os.listdir(month) if n.startswith(".")]
+
+
+def test_catalog_plans_compaction_and_prunes_without_listing(tmp_path, monkeypatch, capfd):
+    import json
+    import sys
+
+    from pipelines.ingest import catalog as catalog_mod
+    from pipelines.ingest import compact
+    from pipelines.ingest.catalog import read_catalog, read_month, select_files
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    cfg = load_cfg()
+    cfg["paths_local"]["root"] = str(tmp_path)
+    cfg["defaults"]["catalog"] = {"enabled": True}
+    schema = table_schema(cfg, "gen_mix")
+    tpl = str(tmp_path) + "/curated/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    table_root = str(tmp_path / "curated/gen_mix")
+    feb_month = f"{table_root}/year=2025/month=02"
+
+    def write(day, techs):
+        df = _frame([1.0, 2.0]).assign(tech=techs)
+        df["minute_ts"] = pd.date_range(day, periods=2, freq="min", tz="Europe/Madrid")
+        return write_parquet_partitioned(
+            df, tpl, "gen_mix", df["minute_ts"][0].date(), {}, "local", schema, catalog=True
+        )
+
+    def run_compact():
+        compact.main()
+        return [json.loads(line) for line in capfd.readouterr().out.splitlines()]
+
+    write("2025-01-01", ["eolica", "solar"])
+    feb = write("2025-02-01", ["eolica", "eolica"])
+    catalog = read_catalog(table_root)
+    entry = read_month(feb_month)["files"]["day=01/" + feb.rsplit("/", 1)[-1]]
+    assert catalog["months"] == ["2025-01", "2025-02"]
+    assert not catalog["complete"]  # lo creó el writer: no conoce ficheros anteriores
+    assert (entry["rows"], entry["min_ts"], entry["max_ts"]) == (2, "2025-01-31T23:00:00Z", "2025-01-31T23:01:00Z")
+    assert entry["dims"] == {"zone": ["Península"], "tech": ["eolica"]}
+
+    monkeypatch.setattr(compact, "load_cfg", lambda: cfg)
+    monkeypatch.setattr(sys, "argv", ["compact.py", "gen_mix", "--local", "--workers", "1"])
+    records = run_compact()
+    assert [r["files"] for r in records if r["action"] == "catalog_rebuilt"] == [2]
+    assert records[-1]["months_processed"] == 2
+    assert read_catalog(table_root)["complete"]
+    shard = read_month(feb_month)
+    assert [rel.startswith("compact-") for rel in shard["files"]] == [True]  # plegados: solo su mtime
+    assert list(shard["folded"]) == ["day=01/" + feb.rsplit("/", 1)[-1]]
+
+    # Con catálogo completo ni la planificación ni la compactación listan el bucket
+    def no_listing(*_a, **_k):
+        raise AssertionError("no debería listarse")
+
+    monkeypatch.setattr(compact, "list_month_paths", no_listing)
+    monkeypatch.setattr(compact, "month_file_mtimes", no_listing)
+    monkeypatch.setattr(catalog_mod, "_parquet_files", no_listing)
+    write("2025-02-02", ["solar", "solar"])
+    summary = run_compact()[-1]
+    assert (summary["months_processed"], summary["months_up_to_date"]) == (1, 1)
+    shards = [read_month(f"{table_root}/year=2025/month={m}") for m in ("01", "02")]
+    files = {rel: e for shard in shards for rel, e in shard["files"].items()}
+    assert sum(e["rows"] for rel, e in files.items() if "compact-" in rel) == 6  # sin compact sustituidos
+    assert len(shards[1]["files"]) == 1 and len(shards[1]["folded"]) == 2
+
+    jan_compact = select_files(table_root, tech="solar", end="2025-01-31T12:00:00Z")
+    assert [p.split("/")[-2] for p in jan_compact] == ["month=01"]
+    assert len(select_files(table_root, start="2025-02-01T00:00:00Z")) == 1  # solo el compact de febrero
+    assert select_files(table_root, start="2025-03-01T00:00:00Z") == []
+
+
+def _upsert_many(month_path: str, prefix: str, count: int):
+    from pipelines.ingest.catalog import update_month
+
+    for i in range(count):
+        update_month(month_path, {f"day=01/{prefix}-{i}.parquet": {"rows": 1, "mtime": 1.0}})
+
+
+def test_catalog_reconciles_only_on_request_and_serializes_writers(tmp_path, monkeypatch, capfd):
+    import json
+    import multiprocessing
+    import sys
+    import time
+
+    from pipelines.ingest import catalog as catalog_mod
+    from pipelines.ingest import compact
+    from pipelines.ingest.catalog import apply_writes, collect_writes, read_catalog, read_month, rebuild_catalog
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    cfg = load_cfg()
+    cfg["paths_local"]["root"] = str(tmp_path)
+    cfg["defaults"]["catalog"] = {"enabled": True}
+    schema = table_schema(cfg, "gen_mix")
+    tpl = str(tmp_path) + "/curated/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    table_root = str(tmp_path / "curated/gen_mix")
+
+    def write(day, catalog=True):
+        df = _frame([1.0, 2.0]).assign(tech=["eolica", "solar"])
+        df["minute_ts"] = pd.date_range(day, periods=2, freq="min", tz="Europe/Madrid")
+        return write_parquet_partitioned(
+            df, tpl, "gen_mix", df["minute_ts"][0].date(), {}, "local", schema, catalog=catalog
+        )
+
+    def run_compact(*extra):
+        monkeypatch.setattr(sys, "argv", ["compact.py", "gen_mix", "--local", "--workers", "1", *extra])
+        compact.main()
+        return [json.loads(line) for line in capfd.readouterr().out.splitlines()]
+
+    write("2025-01-02")
+    rebuild_catalog(table_root)
+    # Marzo se escribe sin pasar por el catálogo: no se ve hasta reconciliar
+    write("2025-03-02", catalog=False)
+    monkeypatch.setattr(compact, "load_cfg", lambda: cfg)
+    assert [r["path"][-8:] for r in run_compact() if r["action"] == "processing_month"] == ["month=01"]
+    records = run_compact("--reconcile")
+    assert [r["files"] for r in records if r["action"] == "catalog_rebuilt"] == [3]  # compact + plegado + marzo
+    assert read_catalog(table_root)["months"] == ["2025-01", "2025-03"]
+    assert read_month(f"{table_root}/year=2025/month=03")["files"]
+
+    # Dos procesos escribiendo el mismo mes a la vez: no se pierde ninguna entrada
+    month = f"{table_root}/year=2025/month=05"
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_upsert_many, args=(month, name, 15)) for name in ("a", "b")]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    assert len(read_month(month)["files"]) == 30
+    assert "2025-05" in read_catalog(table_root)["months"]
+    # Un lock abandonado por un proceso caído caduca
+    lock = catalog_mod.month_catalog_path(month) + ".lock"
+    with open(lock, "w") as f:
+        json.dump({"token": "x", "at": time.time() - catalog_mod.LOCK_STALE_S - 1}, f)
+    _upsert_many(month, "c", 1)
+    assert len(read_month(month)["files"]) == 31
+
+    # Si apuntar un fichero falla el catálogo deja de ser complete (también desde un worker)
+    def broken(*_a, **_k):
+        raise OSError("boom")
+
+    entry = catalog_mod._entry
+    monkeypatch.setattr(catalog_mod, "_entry", broken)
+    with collect_writes() as pending:
+        write("2025-04-02")
+    assert read_catalog(table_root)["complete"]
+    apply_writes(pending)
+    assert not read_catalog(table_root)["complete"]
+    monkeypatch.setattr(catalog_mod, "_entry", entry)
+    rebuild_catalog(table_root)
+    monkeypatch.setattr(catalog_mod, "_entry", broken)
+    write("2025-04-03")
+    assert not read_catalog(table_root)["complete"]
+
+
+def test_live_view_counts_rewritten_folded_day_once(tmp_path):
+    import os
+
+    from pipelines.ingest import compact
+    from pipelines.ingest.main import load_cfg
+    from pipelines.ingest.manifest import live_dataset, live_files
+    from pipelines.ingest.schemas import table_schema
+    from pipelines.ingest.utils import write_parquet_partitioned
+
+    schema = table_schema(load_cfg(), "gen_mix")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    month = str(tmp_path / "gen_mix/year=2025/month=01")
+    key = ["minute_ts", "zone", "tech"]
+
+    def write(df, mode, stamp):
+        path = write_parquet_partitioned(
+            df, tpl, "gen_mix", df["minute_ts"][0].date(), {}, "local", schema,
+            mode=mode, dedupe_key=key, file_id="merged-gen_mix",
+        )
+        os.utime(path, (stamp, stamp))
+        return path
+
+    day2 = _frame([7.0, 8.0])
+    day2["minute_ts"] += pd.Timedelta(days=1)
+    write(_frame([1.0, 2.0]), "merge", 2e9)
+    write(day2, "merge", 2e9)
+    compact.compact_month_streaming(month, schema=schema)
+    assert live_dataset(month, schema).count_rows() == 4
+
+    # Día 1 plegado y reescrito en merge con una fila más: 3 filas, no 2 + 3
+    extra = _frame([5.0, 9.0])
+    extra["minute_ts"] += pd.Timedelta(minutes=2)
+    merged = write(pd.concat([_frame([1.5, 2.0]), extra.iloc[:1]], ignore_index=True), "merge", 2e9 + 10)
+    assert merged in live_files(month)
+    live = live_dataset(month, schema).to_table()
+    assert live.num_rows == 5
+    assert sorted(live.column("mw").to_pylist()) == [1.5, 2.0, 5.0, 7.0, 8.0]
+
+    # replay (replace) con menos filas: el día es exactamente el fichero nuevo
+    write(_frame([4.0, 4.0]).iloc[:1], "replace", 2e9 + 20)
+    assert live_dataset(month, schema).count_rows() == 3
+    st = compact.compact_month_streaming(month, schema=schema, incremental=True)
+    assert st["rows_final"] == 3
+    assert live_dataset(month, schema).count_rows() == 3
+
+    # Originales borrados: el compact es la base del día y gana lo nuevo por clave
+    compact.delete_micro_files(month)
+    write(_frame([6.0, 6.5]), "merge", 2e9 + 30)
+    assert sorted(live_dataset(month, schema).to_table().column("mw").to_pylist()) == [6.0, 6.5, 7.0, 8.0]
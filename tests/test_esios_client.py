@@ -0,0 +1,81 @@
+from pipelines.ingest import esios_client
+from pipelines.ingest.esios_client import EsiosClient
+
+
+class _Resp:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.reason = "OK" if self.ok else "Forbidden"
+        self.url = "https://api.test/indicators/1"
+        self.text = ""
+        self._payload = payload or {}
+
+    def json(self):
+        return self._payload
+
+
+def test_auth_mode_remembered_and_persisted(tmp_path, monkeypatch):
+    monkeypatch.setattr(esios_client, "_winning_auth_mode", None)
+    monkeypatch.delenv("ESIOS_AUTH_MODE", raising=False)
+    cache = tmp_path / "auth.json"
+    client = EsiosClient(api_key="k", rate_limit_per_sec=100, auth_cache_path=str(cache))
+    seen = []
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        mode = "both" if ("x-api-key" in headers and "Authorization" in headers) else "other"
+        seen.append(mode)
+        return _Resp(403) if mode == "both" else _Resp(200, {"indicator": {"values": []}})
+
+    monkeypatch.setattr(client.session, "get", fake_get)
+    client.get_indicator(1, "a", "b", "https://api.test/indicators")
+    client.get_indicator(1, "a", "b", "https://api.test/indicators")
+    # 1ª llamada: both (403) + x-api-key; 2ª llamada: directamente la ganadora
+    assert seen == ["both", "other", "other"]
+    assert "x-api-key" in cache.read_text()
+
+
+def test_async_client_and_fetch(monkeypatch):
+    import asyncio
+
+    from aiohttp import web
+
+    from pipelines.ingest.esios_async import AsyncEsiosClient
+    from pipelines.ingest.main import afetch_datasets
+
+    monkeypatch.setattr(esios_client, "_winning_auth_mode", None)
+    monkeypatch.delenv("ESIOS_AUTH_MODE", raising=False)
+    hits = []
+
+    async def handler(request):
+        both = "x-api-key" in request.headers and "Authorization" in request.headers
+        hits.append(both)
+        if both:
+            return web.json_response({"message": "forbidden"}, status=403)
+        ind = int(request.match_info["ind"])
+        values = [{"datetime": "2025-01-01T00:00:00Z", "value": ind, "geo_name": "ES"}]
+        return web.json_response({"indicator": {"values": values}})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/indicators/{ind}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        base = f"http://127.0.0.1:{port}/indicators"
+        cfg = {"retries": 1, "backoff_seconds": 0}
+        try:
+            async with AsyncEsiosClient(api_key="k", rate_limit_per_sec=100) as client:
+                return await afetch_datasets(
+                    client, base, {"a": ([1, 2], "s", "e", "hour"), "b": ([3], "s", "e", "minute")}, cfg
+                )
+        finally:
+            await runner.cleanup()
+
+    out = asyncio.run(run())
+    assert list(out["a"]) == [1, 2] and list(out["b"]) == [3]
+    assert out["b"][3]["value"].iloc[0] == 3
+    # Solo la primera petición paga el fallback 403
+    assert hits.count(True) <= 3 and hits[-1] is False
@@ -0,0 +1,37 @@
+import threading
+import time
+
+from pipelines.ingest.main import fetch_dataset
+
+
+class _FakeClient:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = {}
+
+    def get_indicator(self, ind, start, end, base_url, time_trunc="hour"):
+        with self.lock:
+            self.calls[ind] = self.calls.get(ind, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = ind == 3 and self.calls[ind] == 1
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        if fail:
+            raise RuntimeError("transitorio")
+        return {"indicator": {"values": [{"datetime": "2025-01-01T00:00:00Z", "value": ind, "geo_name": "ES"}]}}
+
+
+def test_fetch_dataset_parallel_keeps_contract():
+    client = _FakeClient()
+    ids = [5, 1, 3, 2]
+    cfg = {"retries": 2, "backoff_seconds": 0, "fetch_workers": 4}
+    out = fetch_dataset(client, "https://api.test", ids, "a", "b", cfg)
+    assert list(out) == ids
+    assert all(out[i]["indicator_id"].iloc[0] == i for i in ids)
+    # el reintento del indicador 3 no afecta al resto
+    assert client.calls == {5: 1, 1: 1, 3: 2, 2: 1}
+    assert client.max_in_flight > 1
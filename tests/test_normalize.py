@@ -0,0 +1,102 @@
+import pandas as pd
+
+from pipelines.ingest.normalize import parse_values_to_df
+
+
+def test_parse_values_projects_and_types_columns():
+    payload = {
+        "indicator": {
+            "values": [
+                {"value": 1, "datetime": "2025-03-30T01:00:00.000+01:00", "geo_name": "Península", "geo_id": 8741},
+                {"value": 2.5, "datetime": "2025-03-30T03:00:00.000+02:00", "geo_name": "Península", "geo_id": 8741},
+                {"value": None, "datetime": "no-fecha", "geo_name": "Baleares", "geo_id": 8742},
+            ]
+        }
+    }
+    df = parse_values_to_df(payload, columns=["datetime", "value", "geo_name", "missing"])
+    assert list(df.columns) == ["datetime", "value", "geo_name"]
+    assert str(df["datetime"].dt.tz) == "UTC"
+    assert df["datetime"].iloc[0] == pd.Timestamp("2025-03-30T00:00Z")
+    assert df["datetime"].iloc[1] == pd.Timestamp("2025-03-30T01:00Z")
+    assert pd.isna(df["datetime"].iloc[2]) and pd.isna(df["value"].iloc[2])
+    assert parse_values_to_df({"indicator": {"values": []}}).empty
+
+
+def test_parse_values_keeps_keys_missing_from_first_row():
+    payload = {
+        "indicator": {
+            "values": [
+                {"value": 1, "datetime": "2025-03-30T01:00:00.000+01:00"},
+                {"value": 2, "datetime": "2025-03-30T02:00:00.000+01:00", "geo_name": "Baleares"},
+            ]
+        }
+    }
+    df = parse_values_to_df(payload)
+    assert list(df.columns) == ["value", "datetime", "geo_name"]
+    assert pd.isna(df["geo_name"].iloc[0]) and df["geo_name"].iloc[1] == "Baleares"
+    assert list(parse_values_to_df(payload, columns=["datetime", "geo_name"]).columns) == ["datetime", "geo_name"]
+
+
+def _frames():
+    ts = pd.to_datetime(
+        ["2025-03-30T00:00Z", "2025-03-30T00:30Z", "2025-03-30T01:00Z", "2025-03-30T01:00Z"], utc=True
+    )
+    base = {"datetime": ts, "geo_name": ["Península", "Península", "Península", "Baleares"]}
+    return {
+        1293: pd.DataFrame({**base, "value": [1.0, 2.0, None, 4.0], "indicator_id": 1293}),
+        544: pd.DataFrame({**base, "value": [5.0, 6.0, 7.0, 8.0], "indicator_id": 544}),
+        2037: pd.DataFrame({**base, "value": [9.0, None, 3.0, None], "indicator_id": 2037}),
+    }
+
+
+def test_arrow_engine_matches_pandas_for_every_kind():
+    from pipelines.ingest.main import normalize_dataset
+
+    cases = {
+        "prices": {"column_map": {"ts": "hour_ts", "value": "price_eur_mwh", "zone": "zone", "source": "PVPC"}},
+        "wide_by_indicator": {
+            "column_map": {"ts": "minute_ts", "zone": "zone"},
+            "id_rename": {"544": "fc", "2037": "gen_mw"},
+        },
+        "long_tech": {"tech_map": {"1293": "wind"}, "column_map": {"ts": "hour_ts"}},
+        "interconn_pairs": {
+            "to_pairs": {"1293": ["FR", "export_mw"], "544": ["FR", "import_mw"], "2037": ["PT", "export_mw"]},
+            "column_map": {"ts": "hour_ts", "country": "country"},
+        },
+    }
+    for kind, ncfg in cases.items():
+        expected = normalize_dataset(kind, _frames(), {"normalize": ncfg})
+        got = normalize_dataset(kind, _frames(), {"normalize": {**ncfg, "engine": "arrow"}})
+        assert list(got.columns) == list(expected.columns), kind
+        for c in expected.columns:
+            left, right = expected[c], got[c]
+            if isinstance(left.dtype, pd.DatetimeTZDtype):
+                left, right = left.dt.tz_convert("UTC").astype("int64"), right.dt.tz_convert("UTC").astype("int64")
+            assert left.tolist() == right.tolist() or (left.isna() == right.isna()).all() and (
+                left.dropna().tolist() == right.dropna().tolist()
+            ), (kind, c)
+
+
+def test_hooks_ignore_unobserved_zone_categories():
+    import warnings
+
+    from pipelines.ingest.hooks import ZONES, compute_mix_pct, validate_pvpc_complete_day
+
+    zone = pd.Categorical(["Península"] * 4, categories=ZONES)
+    mix = pd.DataFrame(
+        {
+            "minute_ts": pd.to_datetime(["2025-01-01T00:00Z"] * 2 + ["2025-01-01T00:01Z"] * 2),
+            "zone": zone,
+            "tech": ["eolica", "solar"] * 2,
+            "mw": [1.0, 3.0, 2.0, 2.0],
+        }
+    )
+    hours = pd.date_range("2025-01-02", periods=24, freq="h", tz="Europe/Madrid")
+    pvpc = pd.DataFrame(
+        {"hour_ts": hours, "zone": pd.Categorical(["Península"] * 24, categories=ZONES), "price_eur_mwh": 1.0}
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        out = compute_mix_pct(mix)
+        validate_pvpc_complete_day(pvpc)
+    assert len(out) == 4 and out["pct"].tolist() == [0.25, 0.75, 0.5, 0.5]
@@ -4,3 +4,36 @@ def test_package_import():
 
     assert hasattr(ingest, "load_cfg")
     assert hasattr(ingest, "EsiosClient")
+
+
+def test_submodule_import_is_lazy():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, pipelines.ingest.utils, pipelines.ingest.main; "
+        "heavy = {'aiohttp', 'requests', 'pipelines.ingest.esios_async', 'pipelines.ingest.normalize'}; "
+        "print(sorted(heavy & set(sys.modules)))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+    from pipelines.ingest import run_ingest
+
+    assert callable(run_ingest)
+
+
+def test_ingest_help_does_not_load_pandas():
+    import subprocess
+    import sys
+
+    code = (
+        "import runpy, sys; sys.argv = ['main.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('pipelines/ingest/main.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(sorted({'pandas', 'pyarrow', 'yaml'} & set(sys.modules)), file=sys.stderr)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stderr.strip().splitlines()[-1] == "[]"
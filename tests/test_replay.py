@@ -0,0 +1,55 @@
+import glob
+import shutil
+from datetime import date
+
+import pandas as pd
+
+from pipelines.ingest.main import load_cfg, run_backfill_range
+from pipelines.ingest.replay import run_replay
+
+
+class HourlyFakeClient:
+    def get_indicator(self, ind, start, end, base_url, time_trunc="hour"):
+        idx = pd.date_range(start, end, freq="h", inclusive="left")
+        # Valor función del instante: ventanas solapadas devuelven lo mismo
+        values = [
+            {"datetime": ts.isoformat(), "value": float(ts.hour), "geo_name": "España", "geo_id": 3}
+            for ts in idx
+        ]
+        return {"indicator": {"values": values}}
+
+
+def test_replay_rebuilds_curated_from_raw(tmp_path):
+    cfg = load_cfg()
+    cfg["paths_local"]["root"] = str(tmp_path)
+    cfg["defaults"]["backoff_seconds"] = 0
+    run_backfill_range(
+        HourlyFakeClient(), cfg, "prices_spot", date(2024, 3, 30), date(2024, 4, 1), local=True
+    )
+    pattern = f"{tmp_path}/curated/prices/**/*.parquet"
+    before = {f.split("curated/")[1]: pd.read_parquet(f) for f in glob.glob(pattern, recursive=True)}
+    shutil.rmtree(tmp_path / "curated")
+
+    stats = run_replay(cfg, "prices_spot", date(2024, 3, 30), date(2024, 4, 1), local=True, workers=2)
+    assert stats["days"] == 3 and stats["raw_files"] >= 1
+    after = {f.split("curated/")[1]: pd.read_parquet(f) for f in glob.glob(pattern, recursive=True)}
+    assert sorted(after) == sorted(before)
+    for path, df in before.items():
+        pd.testing.assert_frame_equal(after[path], df)
+    # Cambio de hora de marzo: 23 horas
+    assert {p.split("day=")[1][:2]: len(df) for p, df in after.items()} == {"30": 24, "31": 23, "01": 24}
+
+
+def test_replay_reads_each_raw_file_only_for_overlapping_windows(tmp_path):
+    cfg = load_cfg()
+    cfg["paths_local"]["root"] = str(tmp_path)
+    cfg["defaults"]["backoff_seconds"] = 0
+    # Tres chunks del planner (no cruzan mes) -> tres ficheros RAW, todos en la partición de hoy
+    run_backfill_range(
+        HourlyFakeClient(), cfg, "prices_spot", date(2024, 2, 27), date(2024, 4, 2), local=True
+    )
+    stats = run_replay(cfg, "prices_spot", date(2024, 2, 27), date(2024, 4, 2), local=True, workers=2)
+    assert (stats["chunks"], stats["raw_files"], stats["days"]) == (3, 3, 36)
+    # Cada ventana lee su fichero y, como mucho, el vecino que la solapa por el padding
+    assert stats["raw_reads"] < stats["chunks"] * stats["raw_files"]
+    assert stats["curated_rows"] == stats["raw_rows"]
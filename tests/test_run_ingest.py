@@ -0,0 +1,80 @@
+import glob
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from pipelines.ingest import main, run_datasets, run_ingest, schedule_datasets
+from pipelines.ingest.main import fetch_dataset, load_cfg
+
+
+class FakeClient:
+    """Un valor por paso (hora/minuto) dentro de la ventana pedida."""
+
+    def __init__(self):
+        self.indicators = []
+
+    def get_indicator(self, ind, start, end, base_url, time_trunc="hour"):
+        self.indicators.append(ind)
+        freq = "min" if time_trunc == "minute" else "h"
+        idx = pd.date_range(start, end, freq=freq, inclusive="left")
+        values = [
+            {"datetime": ts.isoformat(), "value": 1.0, "geo_name": "España", "geo_id": 3}
+            for ts in idx
+        ]
+        return {"indicator": {"values": values}}
+
+
+def local_cfg(tmp_path):
+    cfg = load_cfg()
+    cfg["paths_local"]["root"] = str(tmp_path)
+    cfg["defaults"]["backoff_seconds"] = 0
+    return cfg
+
+
+def test_schedule_datasets_filters_by_schedule_ref():
+    cfg = load_cfg()
+    assert schedule_datasets(cfg, "hourly") == ["prices_spot"]
+    assert schedule_datasets(cfg, "minute_complete_20") == ["demand", "gen_mix", "interconn"]
+    assert len(schedule_datasets(cfg)) == 5
+
+
+def test_run_ingest_explicit_window(tmp_path):
+    cfg = local_cfg(tmp_path)
+    end = datetime(2024, 5, 10, 12, tzinfo=timezone.utc)
+    window = (end - timedelta(hours=3), end, end.date())
+    stats = run_ingest("prices_spot", window, "local", cfg=cfg, client=FakeClient())
+    assert stats["status"] == "ok" and stats["curated_rows"] == 3
+    assert glob.glob(f"{tmp_path}/curated/prices/year=2024/month=05/day=10/*.parquet")
+
+
+def test_run_datasets_shares_client_and_isolates_failures(tmp_path):
+    cfg = local_cfg(tmp_path)
+    client = FakeClient()
+    results = run_datasets(["prices_spot", "missing", "demand"], "local", cfg=cfg, client=client)
+    assert [r["status"] for r in results] == ["ok", "error", "ok"]
+    assert sorted(client.indicators) == [600, 2037, 2052, 2053]
+    assert glob.glob(f"{tmp_path}/state/watermarks/*.json")
+
+
+def test_run_datasets_async_fetch_prefetches_all_windows(tmp_path, monkeypatch):
+    cfg = local_cfg(tmp_path)
+    cfg["defaults"]["async_fetch"] = True
+    client = FakeClient()
+    seen = []
+
+    def fake_prefetch(cfg, jobs):
+        seen.append(sorted(jobs))
+        out = {
+            name: fetch_dataset(client, "", ids, s, e, cfg["defaults"], time_trunc=tt)
+            for name, (ids, s, e, tt) in jobs.items()
+        }
+        out["gen_mix"] = RuntimeError("boom")
+        return out
+
+    monkeypatch.setattr(main, "prefetch_datasets", fake_prefetch)
+    monkeypatch.setattr(main, "build_client", lambda cfg: (_ for _ in ()).throw(AssertionError("sync")))
+    results = run_datasets(["prices_spot", "demand", "gen_mix"], "local", cfg=cfg)
+    # Una sola descarga conjunta; el fallo de un dataset no detiene al resto
+    assert seen == [["demand", "gen_mix", "prices_spot"]]
+    assert [r["status"] for r in results] == ["ok", "ok", "error"]
+    assert results[0]["curated_rows"] > 0
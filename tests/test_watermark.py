@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+import pandas as pd
+
+from pipelines.ingest.utils import now_utc, resolve_window
+from pipelines.ingest.watermark import WatermarkStore
+
+STRATEGY = {"type": "watermark", "overlap_hours": 1, "max_hours": 72, "fallback": {"type": "last_hours", "hours": 6}}
+
+
+def test_resolve_window_from_watermark():
+    wm = now_utc() - timedelta(hours=3)
+    start, end, _ = resolve_window(STRATEGY, watermark=wm)
+    assert abs((start - (wm - timedelta(hours=1))).total_seconds()) < 1
+    # Sin marca: fallback a últimas 6h
+    start, end, _ = resolve_window(STRATEGY)
+    assert abs((end - start) - timedelta(hours=6)) < timedelta(seconds=1)
+    # Caída larga: se acota a max_hours
+    start, end, _ = resolve_window(STRATEGY, watermark=wm - timedelta(days=30))
+    assert abs((end - start) - timedelta(hours=72)) < timedelta(seconds=1)
+
+
+def test_watermark_store_advances_per_indicator(tmp_path):
+    path = str(tmp_path / "state" / "wm.json")
+    store = WatermarkStore(path, "demand")
+    dfs = {
+        1: pd.DataFrame({"datetime": pd.to_datetime(["2025-01-01T10:00Z", "2025-01-01T11:00Z"])}),
+        2: pd.DataFrame({"datetime": pd.to_datetime(["2025-01-01T09:00Z"])}),
+        3: pd.DataFrame(),
+    }
+    store.advance(dfs)
+    reloaded = WatermarkStore(path, "demand")
+    reloaded.load()
+    assert reloaded.window_start([1, 2]) == pd.Timestamp("2025-01-01T09:00Z")
+    # Indicador sin marca: no bloquea la ventana de los demás
+    assert reloaded.window_start([1, 2, 3]) == pd.Timestamp("2025-01-01T09:00Z")
+    assert reloaded.window_start([3]) is None
+    # Nunca retrocede
+    reloaded.advance({1: pd.DataFrame({"datetime": pd.to_datetime(["2024-01-01T00:00Z"])})})
+    assert reloaded.marks["1"] == pd.Timestamp("2025-01-01T11:00Z")
+
+
+def test_window_start_ignores_unmarked_and_stale_indicators(tmp_path):
+    store = WatermarkStore(str(tmp_path / "wm.json"), "demand")
+    now = now_utc()
+    store.marks = {"1": now - timedelta(hours=2), "2": now - timedelta(hours=1), "3": now - timedelta(days=10)}
+    stale_before = now - timedelta(hours=STRATEGY["max_hours"])
+    # 4 no tiene marca y 3 lleva días sin publicar: la ventana sale de 1 y 2
+    wm = store.window_start([1, 2, 3, 4], stale_before=stale_before)
+    assert wm == store.marks["1"]
+    start, end, _ = resolve_window(STRATEGY, watermark=wm)
+    assert end - start < timedelta(hours=4)
+    # Si todas son antiguas se usa la más antigua (resolve_window la acota a max_hours)
+    assert store.window_start([3], stale_before=stale_before) == store.marks["3"]
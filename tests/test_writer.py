@@ -0,0 +1,98 @@
+import os
+from datetime import date
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from pipelines.ingest.main import load_cfg
+from pipelines.ingest.schemas import table_schema
+from pipelines.ingest.utils import write_parquet_partitioned
+
+
+def _prices(values, hours):
+    ts = pd.date_range("2025-01-01", periods=hours, freq="h", tz="Europe/Madrid")
+    return pd.DataFrame(
+        {"hour_ts": ts, "price_eur_mwh": values, "zone": "España", "source": "SPOT_ES", "indicator_id": 600}
+    )
+
+
+def test_merge_mode_keeps_one_file_per_day_and_upserts(tmp_path):
+    schema = table_schema(load_cfg(), "prices")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    kw = dict(schema=schema, mode="merge", dedupe_key=["hour_ts", "zone", "source"], file_id="merged-spot")
+    p1 = write_parquet_partitioned(_prices([1.0, 2.0], 2), tpl, "prices", date(2025, 1, 1), {}, "local", **kw)
+    p2 = write_parquet_partitioned(_prices([10.0, 20.0, 30.0], 3), tpl, "prices", date(2025, 1, 1), {}, "local", **kw)
+
+    assert p1 == p2 and p1.endswith("part-merged-spot.parquet")
+    assert os.listdir(os.path.dirname(p1)) == ["part-merged-spot.parquet"]
+    table = pq.read_table(p1)
+    assert table.schema.remove_metadata().equals(schema)
+    assert table.column("price_eur_mwh").to_pylist() == [10.0, 20.0, 30.0]
+
+
+def test_raw_formats_roundtrip_with_types(tmp_path):
+    from datetime import datetime, timezone
+
+    from pipelines.ingest.utils import read_raw, write_raw
+
+    raw = pd.DataFrame(
+        {
+            "indicator_id": [1001, 1001],
+            "datetime": pd.to_datetime(["2025-03-30T00:00Z", "2025-03-30T01:00Z"], utc=True),
+            "geo_name": ["Península", "Baleares"],
+            "value": [101.5, None],
+        }
+    )
+    tpl = str(tmp_path) + "/raw/{dataset}/{dataset}_{iso_run}.csv"
+    run_ts = datetime(2025, 3, 30, tzinfo=timezone.utc)
+    for fmt, ext in [("csv", ".csv"), ("ndjson.zst", ".ndjson.zst"), ("parquet", ".parquet")]:
+        path = write_raw(raw, tpl, "prices_pvpc", run_ts, {}, "local", raw_format=fmt)
+        assert path.endswith(ext) and not path.endswith(".csv" + ext)
+        back = read_raw(path)
+        assert str(back["datetime"].dt.tz) == "UTC"
+        assert back["datetime"].tolist() == raw["datetime"].tolist()
+        assert back["value"].iloc[0] == 101.5 and pd.isna(back["value"].iloc[1])
+        assert back["geo_name"].tolist() == ["Península", "Baleares"]
+
+
+def test_dedupe_table_matches_pandas_dedupe():
+    import pyarrow as pa
+
+    from pipelines.ingest.utils import dedupe, dedupe_table
+
+    ts = pd.to_datetime(["2025-01-01 02:00", "2025-01-01 01:00", "2025-01-01 02:00", None, None], utc=True)
+    chunks = [
+        pa.table({"ts": ts[:3], "zone": pa.array(["b", "a", "b"]).dictionary_encode(), "v": [1.0, 2.0, 3.0]}),
+        pa.table({"ts": ts[3:], "zone": pa.array(["a", None]).dictionary_encode(), "v": [4.0, 5.0]}),
+    ]
+    table = pa.concat_tables(chunks)  # diccionarios distintos por chunk, nulos en ambas claves
+    key = ["ts", "zone"]
+
+    out = dedupe_table(table, key, sort=True)
+    expected = dedupe(table.to_pandas().astype({"zone": "object"}), key)
+    assert out.schema.equals(table.schema)
+    assert out.column("v").to_pylist() == expected["v"].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert dedupe_table(table, key).column("v").to_pylist() == [2.0, 3.0, 4.0, 5.0]  # orden original
+    assert dedupe_table(out, key) is out  # sin duplicados: misma tabla
+
+
+def test_replace_mode_supersedes_append_files_of_the_day(tmp_path):
+    schema = table_schema(load_cfg(), "prices")
+    tpl = str(tmp_path) + "/{table}/year={year}/month={month}/day={day}/part-{uuid}.parquet"
+    key = ["hour_ts", "zone", "source"]
+    day = date(2025, 1, 1)
+    spot = write_parquet_partitioned(_prices([1.0, 2.0, 3.0], 3), tpl, "prices", day, {}, "local", schema)
+    pvpc = write_parquet_partitioned(_prices([7.0], 1).assign(source="PVPC"), tpl, "prices", day, {}, "local", schema)
+    mixed = _prices([4.0, 5.0, 6.0, 8.0], 4)  # horas 0-3: solo la 3 queda fuera del replay
+    mixed = write_parquet_partitioned(mixed, tpl, "prices", day, {}, "local", schema)
+
+    merged = write_parquet_partitioned(
+        _prices([10.0, 20.0, 30.0], 3), tpl, "prices", day, {}, "local", schema,
+        mode="replace", dedupe_key=key, file_id="merged-spot",
+    )
+    assert not os.path.exists(spot)  # todas sus claves reescritas
+    assert pq.read_table(pvpc).column("price_eur_mwh").to_pylist() == [7.0]  # otra clave: intacto
+    assert pq.read_table(mixed).column("price_eur_mwh").to_pylist() == [8.0]
+    assert pq.read_table(mixed).schema.remove_metadata().equals(schema)
+    day_rows = pd.concat([pd.read_parquet(p) for p in (merged, pvpc, mixed)])
+    assert not day_rows.duplicated(key).any() and len(day_rows) == 5